@@ -0,0 +1,347 @@
+"""
+Measure aggregation check: a report's exported grid against the source facts.
+
+The Technical Validation slide asks for SUM, AVG, MIN, MAX, COUNT and
+DISTINCT COUNT to be validated, and the Functional one for "Grand Totals vs.
+SUM of Rows". Both sides are loaded as columns (pyarrow's CSV reader when it
+is installed, the csv module otherwise), the source facts are grouped once
+with np.unique, and every measure is computed for all groups in one
+vectorised step (bincount for sums and counts, reduceat over the group sort
+order for MIN/MAX, unique (group, value) pairs for DISTINCT COUNT). Grid
+rows are then matched to the source groups with searchsorted.
+
+A grid row whose group columns read "Total"/"Grand Total" is taken as the
+grand total and checked twice: against the detail rows of the grid (for the
+additive measures and MIN/MAX) and against the same aggregate over all
+source facts. Blank group values, and Power BI's "(Blank)", are a group of
+their own, matched against the source rows where the column is NULL.
+
+    python aggregation_check.py top10_grid.csv --source-csv ap_invoices.csv \\
+        --group "Supplier=vendor_name" \\
+        --measure "Total Amount=SUM(invoice_amount)" \\
+        --measure "Invoices=COUNT(invoice_id)" \\
+        --measure "Invoice Dates=DISTINCT_COUNT(invoice_date)"
+
+The source can also be a query: --source sqlite:///ebs.db --query "SELECT ...".
+"""
+
+import argparse
+import csv
+import re
+import sys
+
+import numpy as np
+
+from validation_engine import MAX_SAMPLES, bind_params, connect, query_rows
+
+AGGREGATES = ('SUM', 'AVG', 'MIN', 'MAX', 'COUNT', 'DISTINCT_COUNT')
+TOLERANCE = 0.005
+KEY_SEPARATOR = '\x1f'
+TOTAL_LABELS = ('total', 'grand total', 'totals')
+BLANK_LABELS = ('(blank)',)
+
+MEASURE_RE = re.compile(r"^\s*(.+?)\s*=\s*(\w+)\s*\(\s*(DISTINCT\s+)?(.*?)\s*\)\s*$", re.I)
+NUMBER_JUNK_RE = re.compile(r"[^\d.eE+\-]")
+# Accounting formats show zero as a dash: "$ -", "-", "–"
+DASH_ZERO_RE = re.compile(r"^[^\w]*[-\u2013\u2014][^\w]*$")
+
+def parse_measure(text):
+    """'Grid Column=FUNC(source_column)' -> measure dict; COUNT(DISTINCT x) is DISTINCT_COUNT(x)"""
+    match = MEASURE_RE.match(text)
+    if not match:
+        raise ValueError(f"Measure must look like 'Name=SUM(column)': {text!r}")
+    name, func, distinct, column = match.groups()
+    func = func.upper()
+    if distinct and func == 'COUNT':
+        func = 'DISTINCT_COUNT'
+    if func not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate {func} (expected one of {', '.join(AGGREGATES)})")
+    return {'name': name, 'func': func, 'column': None if column in ('', '*') else column}
+
+def parse_group(text):
+    """'Grid Column[=source_column]' -> (grid column, source column)"""
+    grid, _, source = text.partition('=')
+    return grid.strip(), (source or grid).strip()
+
+def read_csv_columns(path, columns):
+    """{column: numpy array} for the named CSV columns"""
+    try:
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        pa_csv = None
+    if pa_csv is not None:
+        table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(include_columns=list(columns)))
+        return {name: table.column(name).to_numpy(zero_copy_only=False) for name in columns}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise ValueError(f"{path}: no column {', '.join(missing)}")
+        positions = [header.index(name) for name in columns]
+        values = [[] for _ in columns]
+        for row in reader:
+            for out, position in zip(values, positions):
+                out.append(row[position] if position < len(row) else '')
+    return {name: np.array(column, dtype=object) for name, column in zip(columns, values)}
+
+def read_query_columns(connection, sql, params, columns):
+    """{column: numpy array} for the named columns of a query result, streamed with fetchmany()"""
+    sql, values = bind_params(sql, params)
+    names, rows = query_rows(connection, sql, values)
+    lower = [name.lower() for name in names]
+    missing = [name for name in columns if name.lower() not in lower]
+    if missing:
+        raise ValueError(f"Query has no column {', '.join(missing)} (columns: {', '.join(names)})")
+    positions = [lower.index(name.lower()) for name in columns]
+    values = [[] for _ in columns]
+    for row in rows:
+        for out, position in zip(values, positions):
+            out.append(row[position])
+    return {name: np.array(column, dtype=object) for name, column in zip(columns, values)}
+
+def to_numbers(values):
+    """Float array from numbers or report-formatted text ('$1,234.50', '(12.00)', '$ -' for zero)
+
+    Blanks and cells that are not numbers ('None', 'Pending') are NaN.
+    """
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    numbers = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            try:
+                numbers[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+            continue
+        text = value.strip()
+        if DASH_ZERO_RE.match(text):
+            numbers[i] = 0.0
+            continue
+        negative = text.startswith('(') and text.endswith(')')
+        text = NUMBER_JUNK_RE.sub('', text)
+        if not any(c.isdigit() for c in text):
+            continue
+        try:
+            numbers[i] = -float(text) if negative else float(text)
+        except ValueError:
+            pass
+    return numbers
+
+def present(values):
+    """Mask of non-null values (None, NaN and blank strings are null)"""
+    if values.dtype.kind == 'f':
+        return ~np.isnan(values)
+    mask = np.array([v is not None and not (isinstance(v, float) and v != v) for v in values], dtype=bool)
+    if values.dtype.kind in 'OUS':
+        mask &= np.array([not (isinstance(v, str) and not v.strip()) for v in values], dtype=bool)
+    return mask
+
+def key_strings(values):
+    """Group values as comparable strings: integral numbers lose their '.0', text is stripped"""
+    if values.dtype.kind in 'iu':
+        return values.astype(str)
+    if values.dtype.kind == 'f' and np.all(np.isnan(values) | (values == np.round(values))):
+        return np.where(np.isnan(values), '', np.nan_to_num(values).astype(np.int64).astype(str))
+    return np.char.strip(np.array(['' if v is None else str(v) for v in values], dtype=str))
+
+def blanks_as_null(values):
+    """Grid group values with BLANK_LABELS read as NULL"""
+    if values.dtype.kind not in 'OUS':
+        return values
+    return np.array([None if isinstance(v, str) and v.strip().lower() in BLANK_LABELS else v for v in values],
+                    dtype=object)
+
+def group_keys(columns):
+    """One string key per row from one or more group columns"""
+    keys = key_strings(columns[0])
+    for column in columns[1:]:
+        keys = np.char.add(np.char.add(keys, KEY_SEPARATOR), key_strings(column))
+    return keys
+
+def grouped_aggregates(keys, columns, measures):
+    """Sorted unique keys and {measure name: per-group array}, sharing one grouping of the rows"""
+    unique, codes = np.unique(keys, return_inverse=True)
+    n = len(unique)
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]]) if len(codes) else np.array([], int)
+    counts = {}
+    results = {}
+    for measure in measures:
+        func, column = measure['func'], measure['column']
+        if column is None:
+            if func != 'COUNT':
+                raise ValueError(f"{func} needs a column")
+            results[measure['name']] = np.bincount(codes, minlength=n).astype(float)
+            continue
+        raw = columns[column]
+        if func == 'DISTINCT_COUNT':
+            mask = present(raw)
+            distinct, value_codes = np.unique(key_strings(raw[mask]), return_inverse=True)
+            width = max(len(distinct), 1)
+            pairs = np.unique(codes[mask].astype(np.int64) * width + value_codes)
+            results[measure['name']] = np.bincount(pairs // width, minlength=n).astype(float)
+            continue
+        if func == 'COUNT' and raw.dtype.kind != 'f':
+            results[measure['name']] = np.bincount(codes[present(raw)], minlength=n).astype(float)
+            continue
+        values = to_numbers(raw)
+        if column not in counts:
+            counts[column] = np.bincount(codes[~np.isnan(values)], minlength=n).astype(float)
+        if func == 'COUNT':
+            results[measure['name']] = counts[column]
+        elif func in ('SUM', 'AVG'):
+            sums = np.bincount(codes, weights=np.nan_to_num(values), minlength=n)
+            if func == 'SUM':
+                results[measure['name']] = sums
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    results[measure['name']] = np.where(counts[column] > 0, sums / counts[column], np.nan)
+        else:
+            reduce = np.fmin if func == 'MIN' else np.fmax
+            results[measure['name']] = reduce.reduceat(values[order], starts) if n else np.array([])
+    return unique, results
+
+def close(a, b, tolerance):
+    """Element-wise equality within `tolerance` (absolute) or 1e-9 (relative); NaN equals NaN"""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    with np.errstate(invalid='ignore'):
+        return (np.abs(a - b) <= tolerance + 1e-9 * np.abs(b)) | (np.isnan(a) & np.isnan(b))
+
+def rows_total(func, values):
+    """What a grand total should show given the detail rows, or None for non-additive measures"""
+    if func in ('SUM', 'COUNT'):
+        return float(np.nansum(values))
+    if func in ('MIN', 'MAX') and np.any(~np.isnan(values)):
+        return float(np.nanmin(values) if func == 'MIN' else np.nanmax(values))
+    return None
+
+def check_aggregations(grid, groups, source, measures, tolerance=TOLERANCE, max_samples=MAX_SAMPLES):
+    """Compare grid measures with source aggregates per group and check the grand totals
+
+    `grid` and `source` are {column: array}; `groups` is a list of
+    (grid column, source column) pairs.
+    """
+    grid_keys = group_keys([blanks_as_null(grid[g]) for g, _ in groups])
+    total_rows = np.isin(np.char.lower(np.char.replace(grid_keys, KEY_SEPARATOR, '')), TOTAL_LABELS)
+    detail_keys = grid_keys[~total_rows]
+    source_keys, aggregates = grouped_aggregates(group_keys([source[s] for _, s in groups]), source, measures)
+    source_rows = len(source[groups[0][1]])
+    # The whole source as a single group gives the grand total of every measure
+    overall = grouped_aggregates(np.full(source_rows, ''), source, measures)[1] if source_rows else {}
+
+    index = np.searchsorted(source_keys, detail_keys)
+    index = np.minimum(index, max(len(source_keys) - 1, 0))
+    found = (source_keys[index] == detail_keys) if len(source_keys) else np.zeros(len(detail_keys), bool)
+    matched = np.zeros(len(source_keys), bool)
+    matched[index[found]] = True
+
+    result = {
+        'status': 'passed',
+        'groups': {'grid': int(len(detail_keys)), 'source': int(len(source_keys)),
+                   'missing_in_source': detail_keys[~found].tolist()[:max_samples],
+                   'missing_in_grid': source_keys[~matched].tolist()[:max_samples]},
+        'measures': [],
+        'totals': []
+    }
+    if not found.all():
+        result['status'] = 'failed'
+
+    for measure in measures:
+        name = measure['name']
+        shown = to_numbers(grid[name])
+        detail = shown[~total_rows]
+        expected = aggregates[name][index[found]]
+        ok = close(detail[found], expected, tolerance)
+        bad = np.flatnonzero(~ok)
+        result['measures'].append({
+            'name': name, 'func': measure['func'], 'column': measure['column'],
+            'compared': int(found.sum()), 'mismatched': int(len(bad)),
+            'samples': [
+                {'group': detail_keys[found][i].replace(KEY_SEPARATOR, ' | '),
+                 'grid': float(detail[found][i]), 'source': float(expected[i])}
+                for i in bad[:max_samples]
+            ]
+        })
+        if len(bad):
+            result['status'] = 'failed'
+
+        for total in shown[total_rows][~np.isnan(shown[total_rows])]:
+            from_rows = rows_total(measure['func'], detail)
+            from_source = float(overall[name][0]) if name in overall else None
+            check = {
+                'name': name, 'func': measure['func'], 'grid': float(total),
+                'rows': from_rows, 'source': from_source,
+                'rows_ok': from_rows is None or bool(close(total, from_rows, tolerance)),
+                'source_ok': from_source is None or bool(close(total, from_source, tolerance))
+            }
+            result['totals'].append(check)
+            if not (check['rows_ok'] and check['source_ok']):
+                result['status'] = 'failed'
+    return result
+
+def _number(value):
+    return 'n/a' if value is None else f"{round(value, 6):,}"
+
+def print_report(result):
+    groups = result['groups']
+    print(f"  groups: {groups['grid']} in grid, {groups['source']} in source")
+    for key in groups['missing_in_source']:
+        print(f"    only in grid: {key.replace(KEY_SEPARATOR, ' | ')}")
+    for key in groups['missing_in_grid']:
+        print(f"    only in source: {key.replace(KEY_SEPARATOR, ' | ')}")
+    for measure in result['measures']:
+        icon = '✓' if not measure['mismatched'] else '✗'
+        print(f"{icon} {measure['name']} = {measure['func']}({measure['column'] or '*'}): "
+              f"{measure['compared'] - measure['mismatched']}/{measure['compared']} groups match")
+        for sample in measure['samples']:
+            print(f"    {sample['group']}: grid {_number(sample['grid'])} vs source {_number(sample['source'])}")
+    for total in result['totals']:
+        icon = '✓' if total['rows_ok'] and total['source_ok'] else '✗'
+        print(f"{icon} Grand total {total['name']}: {_number(total['grid'])} "
+              f"(from rows {_number(total['rows'])}, source {_number(total['source'])})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a report grid's measures and grand totals against source facts")
+    parser.add_argument('grid', help="CSV exported from the report")
+    parser.add_argument('--source-csv', help="source facts as CSV")
+    parser.add_argument('--source', help="source database (sqlite:///path, duckdb:///path)")
+    parser.add_argument('--query', help="query returning the source facts (with --source)")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--group', action='append', required=True, metavar='GRID[=SOURCE]',
+                        help="group column in the grid, and in the source if named differently (repeatable)")
+    parser.add_argument('--measure', action='append', required=True, metavar='NAME=FUNC(COLUMN)',
+                        help=f"grid measure column and its source aggregate, FUNC one of {', '.join(AGGREGATES)}")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed absolute difference")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="mismatches to report per measure")
+    args = parser.parse_args()
+
+    groups = [parse_group(g) for g in args.group]
+    measures = [parse_measure(m) for m in args.measure]
+    grid = read_csv_columns(args.grid, [g for g, _ in groups] + [m['name'] for m in measures])
+    source_columns = list(dict.fromkeys([s for _, s in groups] + [m['column'] for m in measures if m['column']]))
+    if args.source_csv:
+        source = read_csv_columns(args.source_csv, source_columns)
+    elif args.source and args.query:
+        params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+        connection = connect(args.source)
+        try:
+            source = read_query_columns(connection, args.query, params, source_columns)
+        finally:
+            connection.close()
+    else:
+        parser.error("give --source-csv, or --source with --query")
+
+    result = check_aggregations(grid, groups, source, measures, args.tolerance, args.max_samples)
+    print_report(result)
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
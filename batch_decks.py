@@ -0,0 +1,198 @@
+"""
+Batch deck generation from exported checklist JSON files.
+
+Renders one results deck per Validation_Checklist_*.json in a directory,
+spreading the files over a process pool. Each worker keeps its own
+DeckRenderer, so slide skeletons are built once per process rather than once
+per deck. Decks are written atomically, and a file that fails to load or
+render is reported without stopping the rest of the batch.
+
+Image evidence attached to a test case gets its own slide. The images are
+written to a scratch directory and streamed into the package at save time
+(see pptx_stream.py), so a deck's memory use does not depend on how many
+screenshots it holds. Checklists migrated to an evidence store (see
+evidence_store.py) have their images read straight from the store, and each
+image is embedded as its pre-sized 'pptx' variant (see evidence_images.py).
+
+Usage:
+    python batch_decks.py exports/ -o decks/ [-j 8] [--pattern "*.json"] [--incremental]
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from checklist import PHASE_LABELS, STATUS_LABELS, evidence_image_path, load_checklist, status_counts
+from evidence_images import prepare_variants
+from evidence_store import open_store
+
+PHASE_COLORS = {
+    'technical': 'primary',
+    'functional': 'secondary',
+    'integrity': 'accent',
+    'accuracy': '#993399'
+}
+TOOL_LABELS = {'powerbi': 'Power BI', 'oac': 'Oracle Analytics Cloud'}
+TEST_CASES_PER_SLIDE = 7
+MAX_LINE = 95
+MAX_TITLE = 45
+
+_renderer = None
+
+def _shorten(text, limit=MAX_LINE):
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+def checklist_deck_spec(checklist, evidence_dir=None, store=None):
+    """Build a deck spec (see DECK_SPEC) summarising one checklist export
+
+    With `evidence_dir`, image evidence embedded as data: URLs is written
+    there so it can get evidence slides; otherwise only evidence that
+    already points at a file on disk, or into `store`, does.
+    """
+    test_cases = checklist['testCases']
+    tool = TOOL_LABELS.get(checklist.get('reportingTool'), checklist.get('reportingTool') or '')
+    subtitle = ' – '.join(part for part in (
+        f"{tool} Validation" if tool else "Validation",
+        checklist.get('validationDate') or '',
+        checklist.get('validator') or ''
+    ) if part)
+    counts = status_counts(test_cases)
+
+    spec = [
+        {"kind": "title", "title": checklist.get('reportName') or "Report Validation", "subtitle": subtitle},
+        {
+            "kind": "list",
+            "title": "Validation Summary",
+            "top": 1.6,
+            "spacing": 0.85,
+            "height": 0.7,
+            "font_size": 22,
+            "items": [
+                f"📋 Total Test Cases: {counts['total']}",
+                f"{STATUS_LABELS['passed']}: {counts['passed']}",
+                f"{STATUS_LABELS['failed']}: {counts['failed']}",
+                f"{STATUS_LABELS['pending']}: {counts['pending']}",
+                f"📈 Completion: {counts['completion']}%"
+            ]
+        }
+    ]
+
+    for phase, label in PHASE_LABELS.items():
+        phase_cases = [tc for tc in test_cases if tc.get('phase') == phase]
+        for start in range(0, len(phase_cases), TEST_CASES_PER_SLIDE):
+            chunk = phase_cases[start:start + TEST_CASES_PER_SLIDE]
+            items = []
+            for tc in chunk:
+                status = STATUS_LABELS.get(tc.get('status'), tc.get('status') or '')
+                items.append(_shorten(f"{tc.get('id', '')}: {tc.get('title', '')}"))
+                items.append(_shorten(f"   • {status} – {tc.get('expectedResult') or tc.get('description') or ''}"))
+            spec.append({
+                "kind": "content",
+                "title": label,
+                "color": PHASE_COLORS[phase],
+                "description": f"Test cases {start + 1}–{start + len(chunk)} of {len(phase_cases)}",
+                "items": items
+            })
+
+    for index, tc in enumerate(test_cases):
+        for number, evidence in enumerate(tc.get('evidence') or []):
+            image = evidence_image_path(evidence, evidence_dir, f"tc{index}-{number}", store)
+            if image:
+                spec.append({
+                    "kind": "evidence",
+                    "title": _shorten(f"{tc.get('id', '')}: {tc.get('title', '')}", MAX_TITLE),
+                    "color": PHASE_COLORS.get(tc.get('phase'), 'primary'),
+                    "caption": _shorten(evidence.get('name') or '', MAX_LINE),
+                    "image": image
+                })
+    return spec
+
+def _init_worker(colors, slide_width, slide_height, consolidated, fonts):
+    global _renderer
+    from deck_renderer import DeckRenderer
+    _renderer = DeckRenderer(colors, slide_width, slide_height, consolidated, fonts)
+
+def render_checklist(input_path, output_path, incremental=False):
+    """Render one checklist export to `output_path`; runs inside a pool worker
+
+    With `incremental`, only slides that changed since the last run are
+    rendered (see incremental_deck.py); returns (slides, slides rendered, seconds).
+    """
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as evidence_dir:
+        checklist = load_checklist(input_path)
+        spec = checklist_deck_spec(checklist, evidence_dir, open_store(checklist, input_path))
+        # The batch already runs one checklist per process, so the images are sized in this one
+        evidence = [slide for slide in spec if slide['kind'] == 'evidence']
+        variants = prepare_variants([slide['image'] for slide in evidence], 'pptx', workers=1)
+        for slide in evidence:
+            slide['image'] = variants.get(slide['image'], slide['image'])
+        if incremental:
+            from incremental_deck import render_incremental
+            stats = render_incremental(_renderer, spec, output_path)
+            count, rendered = stats['slides'], stats['rendered']
+        else:
+            count = rendered = _renderer.render(spec, output_path)
+    return count, rendered, time.perf_counter() - start
+
+def find_checklists(input_dir, pattern):
+    return sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if fnmatch.fnmatch(name, pattern) and os.path.isfile(os.path.join(input_dir, name))
+    )
+
+def run_batch(inputs, output_dir, workers=None, consolidated=False, incremental=False):
+    """Render every input in a process pool; returns {input_path: error} for failures"""
+    from create_presentation_enhanced import new_presentation
+    from template_theme import theme_fonts
+
+    os.makedirs(output_dir, exist_ok=True)
+    prs, colors = new_presentation()
+    failures = {}
+    total = len(inputs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(colors, prs.slide_width, prs.slide_height, consolidated,
+                                       theme_fonts(prs))) as pool:
+        futures = {}
+        for path in inputs:
+            output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + '.pptx')
+            futures[pool.submit(render_checklist, path, output_path, incremental)] = (path, output_path)
+        for done, future in enumerate(as_completed(futures), 1):
+            path, output_path = futures[future]
+            try:
+                slides, rendered, seconds = future.result()
+                changed = f", {rendered} rendered" if incremental else ''
+                print(f"[{done}/{total}] ✓ {path} -> {output_path} ({slides} slides{changed}, {seconds:.2f}s)")
+            except Exception as e:
+                failures[path] = f"{type(e).__name__}: {e}"
+                print(f"[{done}/{total}] ✗ {path}: {failures[path]}", file=sys.stderr)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Render one deck per exported checklist JSON")
+    parser.add_argument('input_dir', help="directory containing checklist exports")
+    parser.add_argument('-o', '--output-dir', default='decks', help="directory for the rendered decks")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--pattern', default='Validation_Checklist_*.json', help="file name pattern to pick up")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="one text frame per block of lines instead of one text box per line")
+    parser.add_argument('--incremental', action='store_true',
+                        help="re-render only the slides that changed since the last run")
+    args = parser.parse_args()
+
+    inputs = find_checklists(args.input_dir, args.pattern)
+    if not inputs:
+        print(f"No files matching {args.pattern} in {args.input_dir}")
+        return 0
+    start = time.perf_counter()
+    failures = run_batch(inputs, args.output_dir, args.jobs, args.consolidated, args.incremental)
+    print(f"✓ {len(inputs) - len(failures)}/{len(inputs)} decks rendered in {time.perf_counter() - start:.1f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""
+Deck generation and validation throughput benchmarks on synthetic data.
+
+Cases:
+
+  deck[N]                 create_validation_presentation() for a deck of N
+                          slides (DECK_SPEC repeated), in slides/s
+  diff[ENGINE,ROWS]       compare_queries() of the AP invoice fact against a
+                          "report" query that changes one amount in 10007
+  aggregation[ENGINE,ROWS]
+                          check_aggregations() of a per-supplier grid (SUM of
+                          invoice_amount, COUNT of invoice_id) against the facts
+  orphans[ENGINE,ROWS]    check_orphans() of ap_invoices_fact.supplier_key
+                          against supplier_dim (one fact row in 9973 is an orphan)
+
+ENGINE is sqlite, plus duckdb when it is installed. The synthetic tables
+are generated in SQL from the row number alone, so both engines hold the
+same values, and cached in --data-dir; generating 100M rows takes a while
+and several GB of disk, so only 1M rows are benchmarked unless --rows says
+otherwise.
+
+Every run of a case is a fresh process, so imports and caches from other
+cases do not leak into its timing or its peak memory (ru_maxrss). The
+fastest of --repeat runs is kept. Results are written as JSON named after
+the commit:
+
+    benchmark-results/<commit>.json
+    {"commit", "date", "python", "platform", "cpus", "thresholds",
+     "results": {case: {"seconds", "peak_mb", "units", "unit", "per_second"}},
+     "regressions": [...]}
+
+and with --baseline compared against an earlier results file. A case
+regresses when it is more than --max-slowdown slower or its peak memory
+more than --max-memory-growth higher (beyond a small absolute noise floor);
+the exit status is 1 when any case does.
+
+    python benchmarks.py
+    python benchmarks.py --rows 1000000 --rows 10000000 --rows 100000000 -k orphans
+    python benchmarks.py --baseline benchmark-results/3f2a9c1.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from checklist import write_atomic
+
+DATA_DIR = os.environ.get(
+    'REPORT_BENCHMARK_DATA',
+    os.path.join(os.path.expanduser('~'), '.cache', 'report-validation-standards', 'benchmarks')
+)
+RESULTS_DIR = 'benchmark-results'
+SLIDES = (10, 100, 1000)
+ROWS = (1000000,)
+REPEAT = 3
+MAX_SLOWDOWN = 0.20
+MAX_MEMORY_GROWTH = 0.20
+NOISE_SECONDS = 0.05        # differences below these are never regressions
+NOISE_MB = 5.0
+
+ROWS_PER_SUPPLIER = 1000
+ORPHAN_EVERY = 9973
+CHANGED_EVERY = 10007
+
+# Column values are functions of the row number i only, so every engine gets the same data
+SQLITE_TABLES = """
+CREATE TABLE supplier_dim (supplier_key INTEGER PRIMARY KEY, supplier_name TEXT);
+WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < {suppliers})
+INSERT INTO supplier_dim SELECT i, 'Supplier ' || i FROM r;
+CREATE TABLE ap_invoices_fact (
+    invoice_id INTEGER PRIMARY KEY, supplier_key INTEGER, invoice_date TEXT, invoice_amount REAL
+);
+WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < {rows})
+INSERT INTO ap_invoices_fact SELECT
+    i,
+    CASE WHEN i % {orphan_every} = 0 THEN {suppliers} + 1 + i % 7 ELSE 1 + (i * 2654435761) % {suppliers} END,
+    date('2024-01-01', '+' || ((i * 40503) % 366) || ' days'),
+    ((i * 48271) % 1000003) / 100.0
+FROM r;
+"""
+DUCKDB_TABLES = """
+CREATE TABLE supplier_dim AS
+SELECT i AS supplier_key, 'Supplier ' || i AS supplier_name FROM range(1, {suppliers} + 1) t(i);
+CREATE TABLE ap_invoices_fact AS SELECT
+    i AS invoice_id,
+    CASE WHEN i % {orphan_every} = 0 THEN {suppliers} + 1 + i % 7 ELSE 1 + (i * 2654435761) % {suppliers} END
+        AS supplier_key,
+    DATE '2024-01-01' + CAST((i * 40503) % 366 AS INTEGER) AS invoice_date,
+    ((i * 48271) % 1000003) / 100.0 AS invoice_amount
+FROM range(1, {rows} + 1) t(i);
+"""
+SOURCE_SQL = "SELECT invoice_id, supplier_key, invoice_date, invoice_amount FROM ap_invoices_fact"
+TARGET_SQL = f"""SELECT invoice_id, supplier_key, invoice_date,
+    CASE WHEN invoice_id % {CHANGED_EVERY} = 0 THEN invoice_amount + 0.01 ELSE invoice_amount END
+FROM ap_invoices_fact"""
+GRID_SQL = """SELECT supplier_key, SUM(invoice_amount) AS total_amount, COUNT(invoice_id) AS invoices
+FROM ap_invoices_fact GROUP BY supplier_key"""
+FACT_COLUMNS_SQL = "SELECT supplier_key, invoice_amount, invoice_id FROM ap_invoices_fact"
+FACT_KEYS_SQL = "SELECT supplier_key FROM ap_invoices_fact"
+DIMENSION_KEYS_SQL = "SELECT supplier_key FROM supplier_dim"
+
+def engines():
+    return ['sqlite'] + (['duckdb'] if importlib.util.find_spec('duckdb') else [])
+
+def data_path(data_dir, engine, rows):
+    return os.path.join(data_dir, f"ap_invoices_{rows}.{'db' if engine == 'sqlite' else 'duckdb'}")
+
+def generate(path, engine, rows):
+    """Create the synthetic supplier_dim / ap_invoices_fact database at `path` unless it exists"""
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    sql = SQLITE_TABLES if engine == 'sqlite' else DUCKDB_TABLES
+    sql = sql.format(rows=rows, suppliers=max(rows // ROWS_PER_SUPPLIER, 1), orphan_every=ORPHAN_EVERY)
+    try:
+        if engine == 'sqlite':
+            import sqlite3
+            connection = sqlite3.connect(tmp_path)
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.executescript(sql)
+        else:
+            import duckdb
+            connection = duckdb.connect(tmp_path)
+            for statement in sql.split(';'):
+                if statement.strip():
+                    connection.execute(statement)
+        connection.commit()
+        connection.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+def deck_case(slides, directory):
+    from create_presentation_enhanced import DECK_SPEC, create_validation_presentation
+    spec = [DECK_SPEC[i % len(DECK_SPEC)] for i in range(slides)]
+    output_file = os.path.join(directory, 'deck.pptx')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        create_validation_presentation(spec, output_file)
+        return time.perf_counter() - start
+
+def diff_case(connection):
+    from validation_engine import compare_queries
+    start = time.perf_counter()
+    result = compare_queries(connection, connection, SOURCE_SQL, TARGET_SQL, {})
+    seconds = time.perf_counter() - start
+    assert result['mismatched'] == result['source_rows'] // CHANGED_EVERY, result['message']
+    return seconds
+
+def aggregation_case(connection):
+    from aggregation_check import check_aggregations, parse_measure, read_query_columns
+    measures = [parse_measure('total_amount=SUM(invoice_amount)'), parse_measure('invoices=COUNT(invoice_id)')]
+    start = time.perf_counter()
+    grid = read_query_columns(connection, GRID_SQL, {}, ['supplier_key', 'total_amount', 'invoices'])
+    source = read_query_columns(connection, FACT_COLUMNS_SQL, {}, ['supplier_key', 'invoice_amount', 'invoice_id'])
+    result = check_aggregations(grid, [('supplier_key', 'supplier_key')], source, measures)
+    seconds = time.perf_counter() - start
+    assert result['status'] == 'passed', result['measures']
+    return seconds
+
+def orphans_case(connection):
+    from orphan_check import check_orphans, key_batches
+    start = time.perf_counter()
+    result = check_orphans(lambda: key_batches(connection, FACT_KEYS_SQL, {}),
+                           lambda: key_batches(connection, DIMENSION_KEYS_SQL, {}))
+    seconds = time.perf_counter() - start
+    assert result['orphan_rows'] == result['fact_rows'] // ORPHAN_EVERY, result['orphan_rows']
+    return seconds
+
+CHECKS = {'diff': diff_case, 'aggregation': aggregation_case, 'orphans': orphans_case}
+
+def peak_mb():
+    """Peak resident memory of this process in MB, or None where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+def run_case(case, data_dir):
+    """Run one case in this (fresh) process; returns its measurements"""
+    if case['kind'] == 'deck':
+        with tempfile.TemporaryDirectory(prefix='benchmark-') as directory:
+            seconds = deck_case(case['size'], directory)
+        units, unit = case['size'], 'slides'
+    else:
+        from validation_engine import connect
+        connection = connect(f"{case['engine']}:///{data_path(data_dir, case['engine'], case['size'])}")
+        try:
+            seconds = CHECKS[case['kind']](connection)
+        finally:
+            connection.close()
+        units, unit = case['size'], 'rows'
+    return {'seconds': round(seconds, 4), 'peak_mb': peak_mb(), 'units': units, 'unit': unit,
+            'per_second': round(units / seconds, 1) if seconds else None}
+
+def case_name(case):
+    if case['kind'] == 'deck':
+        return f"deck[{case['size']}]"
+    return f"{case['kind']}[{case['engine']},{case['size']}]"
+
+def cases(slides, rows):
+    out = [{'kind': 'deck', 'size': n} for n in slides]
+    for engine in engines():
+        for n in rows:
+            out += [{'kind': kind, 'engine': engine, 'size': n} for kind in CHECKS]
+    return out
+
+def measure(case, data_dir, repeat):
+    """Fastest of `repeat` runs, each in a new process; peak memory is the highest seen"""
+    runs = []
+    context = multiprocessing.get_context('spawn')
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(run_case, case, data_dir).result())
+    best = min(runs, key=lambda run: run['seconds'])
+    peaks = [run['peak_mb'] for run in runs if run['peak_mb'] is not None]
+    return dict(best, peak_mb=round(max(peaks), 1) if peaks else None, runs=[run['seconds'] for run in runs])
+
+def commit_id():
+    """Short commit hash of the working tree, with -dirty for uncommitted changes; 'unknown' outside git"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if status else '')
+
+def compare(results, baseline, max_slowdown, max_memory_growth):
+    """Regressions of `results` against the baseline results, one dict per exceeded threshold"""
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if (new['seconds'] > old['seconds'] * (1 + max_slowdown)
+                and new['seconds'] - old['seconds'] > NOISE_SECONDS):
+            regressions.append({'case': name, 'metric': 'seconds', 'baseline': old['seconds'],
+                                'value': new['seconds'], 'ratio': round(new['seconds'] / old['seconds'], 3)})
+        if (new.get('peak_mb') and old.get('peak_mb')
+                and new['peak_mb'] > old['peak_mb'] * (1 + max_memory_growth)
+                and new['peak_mb'] - old['peak_mb'] > NOISE_MB):
+            regressions.append({'case': name, 'metric': 'peak_mb', 'baseline': old['peak_mb'],
+                                'value': new['peak_mb'], 'ratio': round(new['peak_mb'] / old['peak_mb'], 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deck generation and validation checks on synthetic data")
+    parser.add_argument('--slides', type=int, action='append', help=f"deck sizes (repeatable; default: {SLIDES})")
+    parser.add_argument('--rows', type=int, action='append', help=f"fact table sizes (repeatable; default: {ROWS})")
+    parser.add_argument('-k', '--only', action='append', help="only run cases whose name contains this (repeatable)")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="runs per case; the fastest is kept")
+    parser.add_argument('--data-dir', default=DATA_DIR, help=f"synthetic database cache (default: {DATA_DIR})")
+    parser.add_argument('-o', '--output', help=f"results file (default: {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument('--baseline', help="earlier results file to check for regressions")
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN,
+                        help="allowed relative increase in seconds per case")
+    parser.add_argument('--max-memory-growth', type=float, default=MAX_MEMORY_GROWTH,
+                        help="allowed relative increase in peak memory per case")
+    args = parser.parse_args()
+
+    selected = [case for case in cases(args.slides or SLIDES, args.rows or ROWS)
+                if not args.only or any(part in case_name(case) for part in args.only)]
+    if not selected:
+        parser.error("no benchmark case matches -k")
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    for engine, rows in dict.fromkeys((case['engine'], case['size']) for case in selected if 'engine' in case):
+        path = data_path(args.data_dir, engine, rows)
+        start = time.perf_counter()
+        if generate(path, engine, rows):
+            print(f"  – generated {rows:,} {engine} fact rows in {time.perf_counter() - start:.1f}s: {path}")
+
+    results = {}
+    for case in selected:
+        name = case_name(case)
+        result = results[name] = measure(case, args.data_dir, max(args.repeat, 1))
+        memory = f"{result['peak_mb']:.0f} MB peak" if result['peak_mb'] is not None else "peak memory n/a"
+        line = (f"{name}: {result['seconds']:.3f}s, {result['per_second']:,.0f} {result['unit']}/s, {memory}")
+        old = baseline.get(name)
+        if old is not None:
+            line += f" (baseline {old['seconds']:.3f}s)"
+        print(f"  {line}")
+
+    thresholds = {'max_slowdown': args.max_slowdown, 'max_memory_growth': args.max_memory_growth,
+                  'noise_seconds': NOISE_SECONDS, 'noise_mb': NOISE_MB}
+    regressions = compare(results, baseline, args.max_slowdown, args.max_memory_growth)
+    commit = commit_id()
+    report = {
+        'commit': commit,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'baseline': args.baseline,
+        'thresholds': thresholds,
+        'results': results,
+        'regressions': regressions
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    data = json.dumps(report, indent=2).encode('utf-8')
+    write_atomic(output, lambda f: f.write(data))
+
+    for regression in regressions:
+        print(f"✗ {regression['case']}: {regression['metric']} {regression['baseline']} -> "
+              f"{regression['value']} ({regression['ratio']:.2f}x)")
+    if args.baseline:
+        icon = '✓' if not regressions else '✗'
+        print(f"{icon} {len(results)} cases, {len(regressions)} regressions against {args.baseline}")
+    print(f"✓ Results written to {output}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -569,6 +569,8 @@ function createTestCaseCard(testCase, index) {
         </div>
         ` : ''}
         
+        ${testCase.metrics ? renderMetrics(testCase.metrics) : ''}
+        
         ${testCase.expectedResult ? `
         <div class="expected-result" style="background: #E3F2FD; padding: 15px; border-radius: 8px; margin-bottom: 15px;">
             <strong>Expected Result:</strong> ${testCase.expectedResult}
@@ -602,13 +604,30 @@ function createTestCaseCard(testCase, index) {
     return card;
 }
 
+// Timings and row counts of the last instrumented run (validation_engine.py / checklist_runner.py --update --trace/--metrics)
+function renderMetrics(metrics) {
+    const seconds = value => `${Number(value).toFixed(2)}s`;
+    const spans = Object.entries(metrics.spans || {})
+        .filter(([name]) => ['connect', 'execute', 'fetch', 'cache', 'compare'].includes(name))
+        .map(([name, value]) => `${name} ${seconds(value)}`);
+    const parts = [`⏱️ ${seconds(metrics.seconds || 0)}`, ...spans];
+    parts.push(`${(metrics.rowsFetched || 0).toLocaleString()} rows fetched`);
+    if (metrics.bytesFetched) {
+        parts.push(`~${(metrics.bytesFetched / 1048576).toFixed(1)} MB`);
+    }
+    if (metrics.cacheHits || metrics.cacheMisses) {
+        parts.push(`cache ${metrics.cacheHits}/${metrics.cacheHits + metrics.cacheMisses} hits`);
+    }
+    return `<div class="test-metrics">${parts.join(' · ')}</div>`;
+}
+
 function renderEvidence(evidence, index) {
     if (!evidence || evidence.length === 0) {
         return '<span style="color: #999; font-size: 0.85rem;">No evidence uploaded</span>';
     }
     
     return evidence.map((file, i) => {
-        if (file.type && file.type.startsWith('image/')) {
+        if (file.url && file.type && file.type.startsWith('image/')) {
             return `
                 <div class="evidence-item">
                     <img src="${file.url}" alt="${file.name}">
@@ -818,6 +837,36 @@ function exportChecklist() {
     URL.revokeObjectURL(url);
 }
 
+function importChecklist(input) {
+    const file = input.files[0];
+    if (!file) {
+        return;
+    }
+    const reader = new FileReader();
+    reader.onload = function(e) {
+        try {
+            const data = JSON.parse(e.target.result);
+            testCases = data.testCases || [];
+            testCaseCounter = testCases.length + 1;
+            if (data.reportingTool) {
+                document.getElementById('reporting-tool').value = data.reportingTool;
+            }
+            if (data.validationDate) {
+                document.getElementById('validation-date').value = data.validationDate;
+            }
+            document.getElementById('validator-name').value = data.validator || '';
+            reportDescription = data.reportDescription || '';
+            document.getElementById('report-description').value = reportDescription;
+            renderTestCases();
+            updateSummary();
+        } catch (error) {
+            alert(`Could not import ${file.name}: ${error.message}`);
+        }
+        input.value = '';
+    };
+    reader.readAsText(file);
+}
+
 function printChecklist() {
     window.print();
 }
@@ -0,0 +1,115 @@
+"""
+Helpers for the checklist JSON written by exportChecklist() in checklist-script.js.
+
+An export looks like:
+    {"reportName": ..., "reportingTool": "powerbi" | "oac", "validationDate": ...,
+     "validator": ..., "reportDescription": ..., "testCases": [...]}
+and every test case carries id, title, phase, description, sourceQuery,
+targetQueryPowerBI / targetQueryOAC (or the older targetQuery),
+expectedResult, status and evidence.
+"""
+
+import base64
+import json
+import os
+import stat
+import tempfile
+
+PHASE_LABELS = {
+    'technical': '🔧 Technical Validation',
+    'functional': '🧭 Functional Validation',
+    'integrity': '🧱 Data Integrity Validation',
+    'accuracy': '🎯 Data Accuracy Validation'
+}
+
+IMAGE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/bmp': 'bmp'
+}
+
+STATUS_LABELS = {
+    'pending': '⏳ Pending',
+    'passed': '✅ Passed',
+    'failed': '❌ Failed'
+}
+
+# Read once: os.umask() can only be queried by setting it
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+def load_checklist(path):
+    """Load an exported checklist and check it has the fields the tools rely on"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('testCases'), list):
+        raise ValueError(f"{path}: not a checklist export (missing testCases list)")
+    return data
+
+def save_checklist(data, path):
+    """Write a checklist JSON atomically (temp file in the same directory + rename)"""
+    write_atomic(path, lambda f: f.write(json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')))
+
+def file_mode(path):
+    """Permissions for a file written to `path`: those of the file it replaces, else 0666 less the umask"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+def write_atomic(path, write):
+    """Call write(file) on a temp file next to `path`, then rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        # mkstemp() creates the file 0600; give it the mode a plain open() would have
+        os.chmod(tmp_path, file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def target_query(test_case, tool):
+    """Mirror getTargetQuery(): pick the target query for the reporting tool"""
+    if tool == 'powerbi':
+        return test_case.get('targetQueryPowerBI') or test_case.get('targetQuery') or ''
+    return test_case.get('targetQueryOAC') or test_case.get('targetQuery') or ''
+
+def status_counts(test_cases):
+    """Return the same totals updateSummary() shows in the checklist header"""
+    counts = {'total': len(test_cases), 'passed': 0, 'failed': 0, 'pending': 0}
+    for test_case in test_cases:
+        status = test_case.get('status', 'pending')
+        if status in counts:
+            counts[status] += 1
+    total = counts['total']
+    counts['completion'] = round((counts['passed'] + counts['failed']) / total * 100) if total else 0
+    return counts
+
+def evidence_image_path(evidence, directory, name, store=None):
+    """Path of an evidence image on disk, decoding a data: URL into `directory` if one is given
+
+    Evidence moved into an evidence_store.EvidenceStore is referenced by its
+    sha256; with `store`, the stored object file is used as it is.
+    """
+    if evidence.get('path') and os.path.exists(evidence['path']):
+        return evidence['path']
+    if store is not None and evidence.get('sha256'):
+        path = store.path(evidence['sha256'])
+        if path is None or os.path.splitext(path)[1][1:] not in IMAGE_EXTENSIONS.values():
+            return None
+        return path
+    url = evidence.get('url') or ''
+    if directory is None or not url.startswith('data:image/') or ',' not in url:
+        return None
+    header, data = url.split(',', 1)
+    ext = IMAGE_EXTENSIONS.get(header[5:].split(';')[0])
+    if ext is None or ';base64' not in header:
+        return None
+    path = os.path.join(directory, f"{name}.{ext}")
+    with open(path, 'wb') as f:
+        f.write(base64.b64decode(data))
+    return path
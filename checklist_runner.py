@@ -0,0 +1,271 @@
+"""
+Concurrent runner for the test cases of a checklist export.
+
+validation_engine.py runs test cases one after another, and most of that
+time is spent waiting on the databases. This runner executes them on a pool
+of worker threads instead. Every system (EBS, Fusion, Lakehouse, ADW) gets
+its own connection pool whose size is also the cap on concurrent queries
+against it, so a wide run cannot overload an OLTP source. With --cache,
+result sets are reused across runs (see result_cache.py).
+
+Test cases are started in priority order (the optional `priority` field,
+lowest first, then checklist order). Once more test cases have failed than
+the failure budget allows, nothing new is started and the remaining test
+cases are reported as cancelled.
+
+With --trace / --metrics, spans are labelled with the test case and the
+systems it runs against, pool connects included (see instrumentation.py).
+
+The source system of a test case is its `sourceSystem` field (default
+'ebs'); the target system is its `targetSystem` field or the warehouse
+behind the reporting tool ('lakehouse' for Power BI, 'adw' for OAC).
+Systems are given as a JSON file:
+
+    {"ebs": {"connection": "sqlite:///ebs.db", "max_connections": 2},
+     "lakehouse": {"connection": "duckdb:///lakehouse.duckdb", "max_connections": 8}}
+
+or on the command line:
+
+    python checklist_runner.py Validation_Checklist_Top10.json \\
+        --system ebs=sqlite:///ebs.db:2 --system lakehouse=sqlite:///lake.db:8 \\
+        -j 8 --failure-budget 3 --start-date 2024-01-01 --end-date 2024-12-31
+"""
+
+import argparse
+import contextlib
+import heapq
+import json
+import sys
+import threading
+import time
+
+import instrumentation
+from checklist import load_checklist, target_query
+from result_cache import add_cache_arguments, open_cache, snapshot_tokens
+from validation_engine import (
+    BATCH_SIZE, PARTITIONS, MAX_SAMPLES, DEFAULT_SOURCE_SYSTEM, TARGET_SYSTEMS,
+    connect, print_result, run_test_case, update_statuses
+)
+
+DEFAULT_MAX_CONNECTIONS = 4
+DEFAULT_PRIORITY = 100
+
+class ConnectionPool:
+    """At most `size` connections to one system, created on first use and reused"""
+
+    def __init__(self, name, url, size=DEFAULT_MAX_CONNECTIONS):
+        self.name = name
+        self.url = url
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            with instrumentation.labels(system=self.name):
+                return connect(self.url)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+        self._slots.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle.clear()
+
+def load_systems(path):
+    """{name: ConnectionPool} from a systems JSON file"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return {
+        name: ConnectionPool(name, system['connection'], system.get('max_connections', DEFAULT_MAX_CONNECTIONS))
+        for name, system in config.items()
+    }
+
+def parse_system(value):
+    """NAME=URL[:MAX_CONNECTIONS] from the command line"""
+    name, url = value.split('=', 1)
+    size = DEFAULT_MAX_CONNECTIONS
+    head, _, tail = url.rpartition(':')
+    if head and tail.isdigit():
+        url, size = head, int(tail)
+    return ConnectionPool(name, url, size)
+
+def test_case_systems(test_case, tool):
+    """(source system, target system) names a test case runs against"""
+    source = test_case.get('sourceSystem') or DEFAULT_SOURCE_SYSTEM
+    target = test_case.get('targetSystem') or TARGET_SYSTEMS.get(tool, tool)
+    return source, target
+
+@contextlib.contextmanager
+def checkout(pools, source, target):
+    """Hold a source and a target connection; pools are always entered in name order"""
+    with contextlib.ExitStack() as stack:
+        connections = {}
+        for name in sorted({source, target}):
+            if name not in pools:
+                raise KeyError(f"No connection configured for system {name!r}")
+            connections[name] = stack.enter_context(pools[name].connection())
+        yield connections[source], connections[target]
+
+def priority(test_case):
+    """The test case's `priority` as an int; missing or non-numeric values get DEFAULT_PRIORITY"""
+    try:
+        return int(test_case.get('priority', DEFAULT_PRIORITY))
+    except (TypeError, ValueError):
+        return DEFAULT_PRIORITY
+
+def run_concurrent(checklist, pools, params, tool=None, workers=8, failure_budget=None,
+                   on_result=None, cache=None, snapshots=None, **options):
+    """Run the checklist's test cases on `workers` threads; returns results in checklist order
+
+    `failure_budget` is the number of failed/errored test cases tolerated
+    before the rest are cancelled (None for no limit). With a ResultCache,
+    results are cached per system under its token in `snapshots`.
+    """
+    snapshots = snapshots or {}
+    tool = tool or checklist.get('reportingTool') or 'powerbi'
+    test_cases = checklist['testCases']
+    queue = [(priority(tc), index) for index, tc in enumerate(test_cases)]
+    heapq.heapify(queue)
+    results = [None] * len(test_cases)
+    lock = threading.Lock()
+    stop = threading.Event()
+    failures = [0]
+
+    def worker():
+        while not stop.is_set():
+            with lock:
+                if not queue:
+                    return
+                _, index = heapq.heappop(queue)
+            test_case = test_cases[index]
+            source, target = test_case_systems(test_case, tool)
+            start = time.perf_counter()
+            labels = instrumentation.labels(test_case=test_case.get('id') or None,
+                                            sides={'source': source, 'target': target})
+            try:
+                if not (test_case.get('sourceQuery') or '').strip() or not target_query(test_case, tool).strip():
+                    # Nothing to run; don't tie up connections just to be told so
+                    result = run_test_case(test_case, tool, None, None, params, **options)
+                else:
+                    case_options = options
+                    if cache is not None:
+                        case_options = dict(options, source_cache=cache.view(source, snapshots.get(source, '')),
+                                            target_cache=cache.view(target, snapshots.get(target, '')))
+                    with labels, checkout(pools, source, target) as (source_conn, target_conn):
+                        result = run_test_case(test_case, tool, source_conn, target_conn, params, **case_options)
+            except Exception as e:
+                result = {'id': test_case.get('id', ''), 'title': test_case.get('title', ''),
+                          'status': 'error', 'message': f"{type(e).__name__}: {e}",
+                          'seconds': round(time.perf_counter() - start, 3)}
+            result['systems'] = [source, target]
+            with lock:
+                results[index] = result
+                if result['status'] in ('failed', 'error'):
+                    failures[0] += 1
+                    if failure_budget is not None and failures[0] > failure_budget:
+                        stop.set()
+                if on_result:
+                    on_result(result)
+
+    threads = [threading.Thread(target=worker, name=f"checklist-runner-{i}", daemon=True)
+               for i in range(max(1, min(workers, len(test_cases))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for index, test_case in enumerate(test_cases):
+        if results[index] is None:
+            results[index] = {'id': test_case.get('id', ''), 'title': test_case.get('title', ''),
+                              'status': 'cancelled', 'message': 'failure budget exceeded', 'seconds': 0}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run checklist test cases concurrently")
+    parser.add_argument('checklist', help="exported checklist JSON")
+    parser.add_argument('--systems', help="JSON file mapping system names to connections and limits")
+    parser.add_argument('--system', action='append', default=[], metavar='NAME=URL[:N]',
+                        help="system connection with an optional max connection count (repeatable)")
+    parser.add_argument('-j', '--jobs', type=int, default=8, help="test cases run at the same time")
+    parser.add_argument('--failure-budget', type=int, default=None,
+                        help="cancel remaining test cases after this many failures")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--tool', choices=['powerbi', 'oac'], help="target query to run (default: from the export)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows per fetchmany() call")
+    parser.add_argument('--partitions', type=int, default=PARTITIONS, help="hash partitions for the diff")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="mismatched rows to report per test")
+    parser.add_argument('--update', action='store_true', help="write passed/failed back into the checklist")
+    add_cache_arguments(parser)
+    instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    pools = load_systems(args.systems) if args.systems else {}
+    for value in args.system:
+        pool = parse_system(value)
+        pools[pool.name] = pool
+    if not pools:
+        parser.error("configure at least one system with --systems or --system")
+    params = {name: value for name, value in (('start_date', args.start_date), ('end_date', args.end_date)) if value}
+
+    checklist = load_checklist(args.checklist)
+    total = len(checklist['testCases'])
+    done = [0]
+
+    def report(result):
+        done[0] += 1
+        print(f"[{done[0]}/{total}] ", end='')
+        print_result(result)
+
+    start = time.perf_counter()
+    recorder = instrumentation.open_recorder(args)
+    cache = open_cache(args)
+    try:
+        snapshots = snapshot_tokens(args, lambda system: pools[system].connection()) if cache is not None else {}
+        results = run_concurrent(
+            checklist, pools, params, args.tool, args.jobs, args.failure_budget, on_result=report,
+            cache=cache, snapshots=snapshots,
+            batch_size=args.batch_size, partitions=args.partitions, max_samples=args.max_samples
+        )
+    finally:
+        for pool in pools.values():
+            pool.close()
+        if cache is not None:
+            print(f"Result cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items()))
+    failed = counts.get('failed') or counts.get('error') or counts.get('cancelled')
+    print(f"{'✗' if failed else '✓'} {total} test cases in {time.perf_counter() - start:.1f}s: {summary}")
+    instrumentation.close_recorder(recorder, args)
+    if args.update:
+        updated = update_statuses(args.checklist, results)
+        print(f"✓ Updated {updated} test case statuses in {args.checklist}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,122 @@
 """
 Script to create a PowerPoint presentation on Report Validation Standards
 based on the template from SamplePPT.pptx
+
+python-pptx is imported when the deck is built, so `--dry-run` (which only
+checks that the item lists fit the slide) starts without loading it.
 """
 
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.dml.color import RGBColor
-from pptx.enum.shapes import MSO_SHAPE
+import argparse
+import sys
+
+TECHNICAL_ITEMS = [
+    "1. Report Navigation",
+    "   • Validate object-to-object navigation paths",
+    "   • Ensure links, breadcrumbs, menu entries work correctly",
+    "   • Confirm no circular or dead-end navigation loops",
+    "",
+    "2. Drill Through / Drill Down",
+    "   • Drill Down: Hierarchical expansion validation",
+    "   • Drill Through: Parameter passing to downstream reports",
+    "   • Ensure filters persist correctly",
+    "",
+    "3. Measure Aggregations",
+    "   • Validate SUM, AVG, MIN, MAX, COUNT, DISTINCT COUNT",
+    "   • Confirm aggregation rules match business logic",
+    "   • Ensure consistency across dashboards and exports"
+]
+
+FUNCTIONAL_ITEMS = [
+    "1. Responsiveness to Dashboard Prompts / Filters",
+    "   • Validate slicer behavior (multi-select, default values)",
+    "   • Ensure filters update all dependent visuals and KPIs",
+    "   • Confirm performance under typical filter combinations",
+    "",
+    "2. Measure Value Validation (Summary vs. Drill Reports)",
+    "   • Verify totals in summary match drill report roll-ups",
+    "   • Confirm subtotals obey business hierarchies",
+    "   • Check Grand Totals vs. SUM of Rows (common trap!)"
+]
+
+INTEGRITY_ITEMS = [
+    "1. Validity of Data Based on Report Definition",
+    "   • Check column-level definitions against business metadata",
+    "   • Validate joins between subject areas or datasets",
+    "   • Ensure orphaned records are excluded unless expected",
+    "   • Confirm proper handling of nulls, effective dates, primary keys"
+]
+
+ACCURACY_ITEMS = [
+    "1. Comparison with Source Database",
+    "   • Choose fixed set of common parameters",
+    "   • Pull equivalent query from EBS/Fusion Cloud tables",
+    "   • Validate fact values at transaction, daily/monthly, ledger levels",
+    "   • Validate dimensional conformance",
+    "",
+    "2. Edge Cases",
+    "   • Canceled transactions",
+    "   • Backdated entries",
+    "   • Effective-date based changes",
+    "   • Multi-currency conversions",
+    "   • Transaction corrections and reversals"
+]
+
+# Item lists of the four validation slides: (title, items, line pitch, bullet font size)
+VALIDATION_SLIDES = [
+    ("🔧 Technical Validation", TECHNICAL_ITEMS, 0.35, 14),
+    ("🧭 Functional Validation", FUNCTIONAL_ITEMS, 0.4, 14),
+    ("🧱 Data Integrity Validation", INTEGRITY_ITEMS, 0.4, 14),
+    ("🎯 Data Accuracy Validation", ACCURACY_ITEMS, 0.35, 13)
+]
+
+def layout_report():
+    """Lay out the validation slides' item lists for --dry-run, without python-pptx"""
+    from deck_layout import box, check_boxes
+
+    report = []
+    for index, (title, items, pitch, bullet_size) in enumerate(VALIDATION_SLIDES, 4):
+        boxes = [
+            box('item', 0.5, 2.2 + i * pitch, 9, 0.4, item, bullet_size if item.startswith("   •") else 16)
+            for i, item in enumerate(items)
+        ]
+        report.append({'slide': index, 'kind': 'content', 'title': title,
+                       'boxes': boxes, 'issues': check_boxes(boxes)})
+    return report
+
+def add_lines(slide, left, top, width, height, pitch, lines, consolidated=False):
+    """Add text_frames.line() dicts one per `pitch`: a textbox each, or one consolidated text frame"""
+    from pptx.util import Pt
+    from text_frames import add_text_block
+
+    if consolidated:
+        return add_text_block(slide, left, top, width, pitch, lines)
+    for i, l in enumerate(lines):
+        txBox = slide.shapes.add_textbox(left, top + i * pitch, width, height)
+        tf = txBox.text_frame
+        tf.text = l['text']
+        p = tf.paragraphs[0]
+        p.font.size = Pt(l['size'])
+        p.font.color.rgb = l['color']
+        if l['bold']:
+            p.font.bold = True
+
+def item_lines(items, bullet_size, color):
+    """Lines for a validation slide's item list"""
+    from text_frames import line
+    return [
+        line(item, bullet_size if item.startswith("   •") else 16,
+             bold=bool(item) and not item.startswith("   "), color=color)
+        for item in items
+    ]
+
+def create_validation_presentation(output_file='Report_Validation_Standards.pptx', consolidated=False):
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    from text_frames import line
 
-def create_validation_presentation():
     # Try to load template, if it fails, create new with modern design
     try:
         prs = Presentation('SamplePPT.pptx')
@@ -87,14 +194,8 @@ def create_validation_presentation():
     ]
     
     top = Inches(1.5)
-    for i, item in enumerate(content_items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(1.2), width, Inches(0.8))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(24)
-        p.font.color.rgb = dark_text
-        p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.8), Inches(1.2),
+              [line(item, 24, bold=True, color=dark_text) for item in content_items], consolidated)
     
     # Slide 3: Scope
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -120,13 +221,8 @@ def create_validation_presentation():
     
     top = Inches(2.2)
     tools = ["• Oracle Analytics Cloud", "• Power BI"]
-    for i, tool in enumerate(tools):
-        txBox = slide.shapes.add_textbox(left + Inches(0.3), top + i * Inches(0.6), width, Inches(0.5))
-        tf = txBox.text_frame
-        tf.text = tool
-        p = tf.paragraphs[0]
-        p.font.size = Pt(18)
-        p.font.color.rgb = dark_text
+    add_lines(slide, left + Inches(0.3), top, width, Inches(0.5), Inches(0.6),
+              [line(tool, 18, color=dark_text) for tool in tools], consolidated)
     
     # Source Systems
     top = Inches(3.8)
@@ -140,13 +236,8 @@ def create_validation_presentation():
     
     top = Inches(4.5)
     systems = ["• Oracle E-Business Suite", "• Oracle Fusion Cloud"]
-    for i, system in enumerate(systems):
-        txBox = slide.shapes.add_textbox(left + Inches(0.3), top + i * Inches(0.6), width, Inches(0.5))
-        tf = txBox.text_frame
-        tf.text = system
-        p = tf.paragraphs[0]
-        p.font.size = Pt(18)
-        p.font.color.rgb = dark_text
+    add_lines(slide, left + Inches(0.3), top, width, Inches(0.5), Inches(0.6),
+              [line(system, 18, color=dark_text) for system in systems], consolidated)
     
     # Slide 4: Technical Validation
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -175,33 +266,9 @@ def create_validation_presentation():
     p.font.color.rgb = dark_text
     
     # Items
-    items = [
-        "1. Report Navigation",
-        "   • Validate object-to-object navigation paths",
-        "   • Ensure links, breadcrumbs, menu entries work correctly",
-        "   • Confirm no circular or dead-end navigation loops",
-        "",
-        "2. Drill Through / Drill Down",
-        "   • Drill Down: Hierarchical expansion validation",
-        "   • Drill Through: Parameter passing to downstream reports",
-        "   • Ensure filters persist correctly",
-        "",
-        "3. Measure Aggregations",
-        "   • Validate SUM, AVG, MIN, MAX, COUNT, DISTINCT COUNT",
-        "   • Confirm aggregation rules match business logic",
-        "   • Ensure consistency across dashboards and exports"
-    ]
-    
     top = Inches(2.2)
-    for i, item in enumerate(items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.35), width, Inches(0.4))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(14) if item.startswith("   •") else Pt(16)
-        p.font.color.rgb = dark_text
-        if item and not item.startswith("   "):
-            p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.4), Inches(0.35),
+              item_lines(TECHNICAL_ITEMS, 14, dark_text), consolidated)
     
     # Slide 5: Functional Validation
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -230,28 +297,9 @@ def create_validation_presentation():
     p.font.color.rgb = dark_text
     
     # Items
-    items = [
-        "1. Responsiveness to Dashboard Prompts / Filters",
-        "   • Validate slicer behavior (multi-select, default values)",
-        "   • Ensure filters update all dependent visuals and KPIs",
-        "   • Confirm performance under typical filter combinations",
-        "",
-        "2. Measure Value Validation (Summary vs. Drill Reports)",
-        "   • Verify totals in summary match drill report roll-ups",
-        "   • Confirm subtotals obey business hierarchies",
-        "   • Check Grand Totals vs. SUM of Rows (common trap!)"
-    ]
-    
     top = Inches(2.2)
-    for i, item in enumerate(items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.4), width, Inches(0.4))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(14) if item.startswith("   •") else Pt(16)
-        p.font.color.rgb = dark_text
-        if item and not item.startswith("   "):
-            p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.4), Inches(0.4),
+              item_lines(FUNCTIONAL_ITEMS, 14, dark_text), consolidated)
     
     # Slide 6: Data Integrity Validation
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -280,24 +328,9 @@ def create_validation_presentation():
     p.font.color.rgb = dark_text
     
     # Items
-    items = [
-        "1. Validity of Data Based on Report Definition",
-        "   • Check column-level definitions against business metadata",
-        "   • Validate joins between subject areas or datasets",
-        "   • Ensure orphaned records are excluded unless expected",
-        "   • Confirm proper handling of nulls, effective dates, primary keys"
-    ]
-    
     top = Inches(2.2)
-    for i, item in enumerate(items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.4), width, Inches(0.4))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(14) if item.startswith("   •") else Pt(16)
-        p.font.color.rgb = dark_text
-        if item and not item.startswith("   "):
-            p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.4), Inches(0.4),
+              item_lines(INTEGRITY_ITEMS, 14, dark_text), consolidated)
     
     # Slide 7: Data Accuracy Validation
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -326,31 +359,9 @@ def create_validation_presentation():
     p.font.color.rgb = dark_text
     
     # Items
-    items = [
-        "1. Comparison with Source Database",
-        "   • Choose fixed set of common parameters",
-        "   • Pull equivalent query from EBS/Fusion Cloud tables",
-        "   • Validate fact values at transaction, daily/monthly, ledger levels",
-        "   • Validate dimensional conformance",
-        "",
-        "2. Edge Cases",
-        "   • Canceled transactions",
-        "   • Backdated entries",
-        "   • Effective-date based changes",
-        "   • Multi-currency conversions",
-        "   • Transaction corrections and reversals"
-    ]
-    
     top = Inches(2.2)
-    for i, item in enumerate(items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.35), width, Inches(0.4))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(13) if item.startswith("   •") else Pt(16)
-        p.font.color.rgb = dark_text
-        if item and not item.startswith("   "):
-            p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.4), Inches(0.35),
+              item_lines(ACCURACY_ITEMS, 13, dark_text), consolidated)
     
     # Slide 8: Validation Checklist
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -372,14 +383,8 @@ def create_validation_presentation():
     ]
     
     top = Inches(2)
-    for i, item in enumerate(checklist):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(1.2), width, Inches(0.8))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(22)
-        p.font.color.rgb = dark_text
-        p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.8), Inches(1.2),
+              [line(item, 22, bold=True, color=dark_text) for item in checklist], consolidated)
     
     # Slide 9: Next Steps / Standards
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -402,14 +407,8 @@ def create_validation_presentation():
     ]
     
     top = Inches(2)
-    for i, item in enumerate(standards):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.9), width, Inches(0.7))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(24)
-        p.font.color.rgb = dark_text
-        p.font.bold = True
+    add_lines(slide, left, top, width, Inches(0.7), Inches(0.9),
+              [line(item, 24, bold=True, color=dark_text) for item in standards], consolidated)
     
     # Slide 10: Thank You
     slide = prs.slides.add_slide(prs.slide_layouts[6])
@@ -434,9 +433,23 @@ def create_validation_presentation():
     p.alignment = PP_ALIGN.CENTER
     
     # Save presentation
-    prs.save('Report_Validation_Standards.pptx')
-    print("Presentation created successfully: Report_Validation_Standards.pptx")
+    prs.save(output_file)
+    print(f"Presentation created successfully: {output_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the Report Validation Standards deck")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only lay out the item lists and report overflow; python-pptx is not imported")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="one text frame per block of lines instead of one text box per line")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        from deck_layout import print_report
+        return 1 if print_report(layout_report(), 'Report_Validation_Standards.pptx') else 0
+    create_validation_presentation(consolidated=args.consolidated)
+    return 0
 
 if __name__ == "__main__":
-    create_validation_presentation()
+    sys.exit(main())
 
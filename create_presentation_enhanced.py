@@ -1,229 +1,68 @@
 """
 Enhanced script to create a PowerPoint presentation on Report Validation Standards
 This version better extracts design elements from the template
+
+The deck content lives in DECK_SPEC: one dict per slide with a `kind`
+(title, content, list, sections, evidence) plus the text for that kind. Colours are
+either a theme name ('primary', 'secondary', 'accent', 'dark_text') or a
+'#RRGGBB' hex string, so the same spec can be stored as JSON/YAML and fed to
+deck_renderer.py.
+
+python-pptx is imported inside the functions that draw, so `--dry-run`
+(layout and overflow check only, see deck_layout.py) never loads it.
 """
 
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.dml.color import RGBColor
-from pptx.enum.shapes import MSO_SHAPE
+import argparse
+import sys
 
-def extract_template_design(prs):
-    """Extract color scheme and design elements from template"""
-    colors = {
-        'primary': RGBColor(0, 102, 204),  # Default vibrant blue
-        'secondary': RGBColor(255, 102, 0),  # Default vibrant orange
-        'accent': RGBColor(0, 153, 76),  # Default vibrant green
-        'dark_text': RGBColor(33, 33, 33),
-        'light_bg': RGBColor(245, 245, 250)
-    }
-    
-    # Try to extract colors from template if available
-    if len(prs.slides) > 0:
-        try:
-            # Check first slide for color scheme
-            slide = prs.slides[0]
-            for shape in slide.shapes:
-                if hasattr(shape, 'fill'):
-                    if hasattr(shape.fill, 'fore_color') and hasattr(shape.fill.fore_color, 'rgb'):
-                        # Extract color if found
-                        pass
-        except:
-            pass
-    
-    return colors
+OUTPUT_FILE = 'Report_Validation_Standards.pptx'
+TEMPLATE_FILE = 'SamplePPT.pptx'
+THEME_COLOR_SLOTS = {
+    'primary': 'accent1',
+    'secondary': 'accent2',
+    'accent': 'accent6',
+    'dark_text': 'dk1',
+    'light_bg': 'lt2'
+}
 
-def create_validation_presentation():
-    # Load template
-    try:
-        template_prs = Presentation('SamplePPT.pptx')
-        colors = extract_template_design(template_prs)
-        # Create new presentation using template's slide dimensions
-        prs = Presentation()
-        prs.slide_width = template_prs.slide_width
-        prs.slide_height = template_prs.slide_height
-        print(f"Template loaded - Slide size: {prs.slide_width/Inches(1):.1f}\" x {prs.slide_height/Inches(1):.1f}\"")
-    except Exception as e:
-        # Create new presentation with standard dimensions
-        prs = Presentation()
-        prs.slide_width = Inches(10)
-        prs.slide_height = Inches(7.5)
-        colors = extract_template_design(None)
-        print(f"Creating new presentation - {e}")
-    
-    # Use extracted or default colors
-    primary = colors['primary']
-    secondary = colors['secondary']
-    accent = colors['accent']
-    dark_text = colors['dark_text']
-    white = RGBColor(255, 255, 255)
-    
-    def add_title_slide(title, subtitle=""):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        # Background
-        background = slide.background
-        fill = background.fill
-        fill.solid()
-        fill.fore_color.rgb = primary
-        
-        # Title
-        left = Inches(0.5)
-        top = Inches(2.5)
-        width = Inches(9)
-        height = Inches(1.2)
-        txBox = slide.shapes.add_textbox(left, top, width, height)
-        tf = txBox.text_frame
-        tf.text = title
-        p = tf.paragraphs[0]
-        p.font.size = Pt(48)
-        p.font.bold = True
-        p.font.color.rgb = white
-        p.alignment = PP_ALIGN.CENTER
-        
-        if subtitle:
-            top = Inches(4.2)
-            height = Inches(0.8)
-            txBox2 = slide.shapes.add_textbox(left, top, width, height)
-            tf2 = txBox2.text_frame
-            tf2.text = subtitle
-            p2 = tf2.paragraphs[0]
-            p2.font.size = Pt(24)
-            p2.font.color.rgb = white
-            p2.alignment = PP_ALIGN.CENTER
-        return slide
-    
-    def add_content_slide(title, title_color, description, items):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        left = Inches(0.5)
-        top = Inches(0.3)
-        width = Inches(9)
-        
-        # Title with colored background
-        title_height = Inches(0.8)
-        shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, title_height)
-        shape.fill.solid()
-        shape.fill.fore_color.rgb = title_color
-        shape.line.fill.background()
-        
-        txBox = slide.shapes.add_textbox(left + Inches(0.2), top + Inches(0.1), width, title_height)
-        tf = txBox.text_frame
-        tf.text = title
-        p = tf.paragraphs[0]
-        p.font.size = Pt(32)
-        p.font.bold = True
-        p.font.color.rgb = white
-        
-        # Description
-        top = Inches(1.4)
-        if description:
-            txBox = slide.shapes.add_textbox(left, top, width, Inches(0.4))
-            tf = txBox.text_frame
-            tf.text = description
-            p = tf.paragraphs[0]
-            p.font.size = Pt(16)
-            p.font.italic = True
-            p.font.color.rgb = dark_text
-            top = Inches(1.9)
-        
-        # Items
-        for i, item in enumerate(items):
-            if not item.strip():
-                continue
-            item_top = top + i * Inches(0.35)
-            txBox = slide.shapes.add_textbox(left, item_top, width, Inches(0.35))
-            tf = txBox.text_frame
-            tf.text = item
-            p = tf.paragraphs[0]
-            if item.startswith("   •") or item.startswith("  •"):
-                p.font.size = Pt(13)
-            elif item.startswith("•"):
-                p.font.size = Pt(14)
-            else:
-                p.font.size = Pt(15)
-                p.font.bold = True
-            p.font.color.rgb = dark_text
-        return slide
-    
+DECK_SPEC = [
     # Slide 1: Title
-    add_title_slide(
-        "Report Validation Standards",
-        "Setting Standards Across Data Analytics & AI Department"
-    )
-    
+    {
+        "kind": "title",
+        "title": "Report Validation Standards",
+        "subtitle": "Setting Standards Across Data Analytics & AI Department"
+    },
     # Slide 2: Overview
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    left = Inches(0.5)
-    top = Inches(0.3)
-    width = Inches(9)
-    
-    txBox = slide.shapes.add_textbox(left, top, width, Inches(0.6))
-    tf = txBox.text_frame
-    tf.text = "Validation Framework Overview"
-    p = tf.paragraphs[0]
-    p.font.size = Pt(40)
-    p.font.bold = True
-    p.font.color.rgb = primary
-    
-    content_items = [
-        "🔧 Technical Validation",
-        "🧭 Functional Validation",
-        "🧱 Data Integrity Validation",
-        "🎯 Data Accuracy Validation"
-    ]
-    
-    top = Inches(1.8)
-    for i, item in enumerate(content_items):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(1.1), width, Inches(0.8))
-        tf = txBox.text_frame
-        tf.text = item
-        p = tf.paragraphs[0]
-        p.font.size = Pt(22)
-        p.font.color.rgb = dark_text
-        p.font.bold = True
-    
+    {
+        "kind": "list",
+        "title": "Validation Framework Overview",
+        "top": 1.8,
+        "spacing": 1.1,
+        "height": 0.8,
+        "font_size": 22,
+        "items": [
+            "🔧 Technical Validation",
+            "🧭 Functional Validation",
+            "🧱 Data Integrity Validation",
+            "🎯 Data Accuracy Validation"
+        ]
+    },
     # Slide 3: Scope
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    txBox = slide.shapes.add_textbox(left, top - Inches(1.5), width, Inches(0.6))
-    tf = txBox.text_frame
-    tf.text = "Scope & Reporting Tools"
-    p = tf.paragraphs[0]
-    p.font.size = Pt(40)
-    p.font.bold = True
-    p.font.color.rgb = primary
-    
-    top = Inches(1.8)
-    sections = [
-        ("Reporting Tools:", ["• Oracle Analytics Cloud", "• Power BI"]),
-        ("Source Systems (OLTP):", ["• Oracle E-Business Suite", "• Oracle Fusion Cloud"])
-    ]
-    
-    for section_title, items in sections:
-        txBox = slide.shapes.add_textbox(left, top, width, Inches(0.5))
-        tf = txBox.text_frame
-        tf.text = section_title
-        p = tf.paragraphs[0]
-        p.font.size = Pt(20)
-        p.font.bold = True
-        p.font.color.rgb = dark_text
-        
-        top += Inches(0.5)
-        for item in items:
-            txBox = slide.shapes.add_textbox(left + Inches(0.3), top, width, Inches(0.5))
-            tf = txBox.text_frame
-            tf.text = item
-            p = tf.paragraphs[0]
-            p.font.size = Pt(18)
-            p.font.color.rgb = dark_text
-            top += Inches(0.5)
-        top += Inches(0.3)
-    
+    {
+        "kind": "sections",
+        "title": "Scope & Reporting Tools",
+        "sections": [
+            {"title": "Reporting Tools:", "items": ["• Oracle Analytics Cloud", "• Power BI"]},
+            {"title": "Source Systems (OLTP):", "items": ["• Oracle E-Business Suite", "• Oracle Fusion Cloud"]}
+        ]
+    },
     # Slide 4: Technical Validation
-    add_content_slide(
-        "🔧 Technical Validation",
-        primary,
-        "These checks ensure the report behaves like a well-trained instrument, not a rogue drummer.",
-        [
+    {
+        "kind": "content",
+        "title": "🔧 Technical Validation",
+        "color": "primary",
+        "description": "These checks ensure the report behaves like a well-trained instrument, not a rogue drummer.",
+        "items": [
             "1. Report Navigation",
             "   • Validate object-to-object navigation paths",
             "   • Ensure links, breadcrumbs, menu entries, and dashboard flows lead to the right pages",
@@ -239,14 +78,14 @@ def create_validation_presentation():
             "   • Confirm aggregation rules match business logic",
             "   • Ensure aggregation behavior is consistent across dashboards, visuals, and exports"
         ]
-    )
-    
+    },
     # Slide 5: Functional Validation
-    add_content_slide(
-        "🧭 Functional Validation",
-        secondary,
-        "These checks verify that the report behaves as users expect, not as developers wish.",
-        [
+    {
+        "kind": "content",
+        "title": "🧭 Functional Validation",
+        "color": "secondary",
+        "description": "These checks verify that the report behaves as users expect, not as developers wish.",
+        "items": [
             "1. Responsiveness to Dashboard Prompts / Filters",
             "   • Validate slicer behavior for multi-select, default values, cascading prompts",
             "   • Ensure applying filters updates all dependent visuals and KPIs",
@@ -257,28 +96,28 @@ def create_validation_presentation():
             "   • Confirm that subtotals obey business hierarchies and time dimensions",
             "   • Check Grand Totals vs. SUM of Rows (common trap!)"
         ]
-    )
-    
+    },
     # Slide 6: Data Integrity Validation
-    add_content_slide(
-        "🧱 Data Integrity Validation",
-        accent,
-        "This ensures the report's story isn't fiction.",
-        [
+    {
+        "kind": "content",
+        "title": "🧱 Data Integrity Validation",
+        "color": "accent",
+        "description": "This ensures the report's story isn't fiction.",
+        "items": [
             "1. Validity of Data Based on Report Definition",
             "   • Check column-level definitions against business metadata",
             "   • Validate joins between subject areas or datasets",
             "   • Ensure orphaned records are excluded unless explicitly expected",
             "   • Confirm proper handling of nulls, effective dates, primary keys"
         ]
-    )
-    
+    },
     # Slide 7: Data Accuracy Validation
-    add_content_slide(
-        "🎯 Data Accuracy Validation",
-        RGBColor(153, 51, 153),  # Purple
-        "This is the final face-off: the report vs. the source (OLTP).",
-        [
+    {
+        "kind": "content",
+        "title": "🎯 Data Accuracy Validation",
+        "color": "#993399",  # Purple
+        "description": "This is the final face-off: the report vs. the source (OLTP).",
+        "items": [
             "1. Comparison with Source Database",
             "   • Choose a fixed set of common parameters (e.g., date, BU, ledger, customer, supplier)",
             "   • Pull the equivalent query directly from EBS/Fusion Cloud tables",
@@ -295,76 +134,337 @@ def create_validation_presentation():
             "   • Multi-currency conversions",
             "   • Transaction corrections and reversals"
         ]
-    )
-    
+    },
     # Slide 8: Validation Checklist
+    {
+        "kind": "list",
+        "title": "Validation Checklist Summary",
+        "top": 2.2,
+        "spacing": 1.1,
+        "height": 0.8,
+        "font_size": 20,
+        "items": [
+            "✓ Technical: Navigation, Drill-down, Aggregations",
+            "✓ Functional: Filters, Measure Values, Summary vs Drill",
+            "✓ Data Integrity: Column Definitions, Joins, Null Handling",
+            "✓ Data Accuracy: Source Comparison, Edge Cases"
+        ]
+    },
+    # Slide 9: Standards
+    {
+        "kind": "list",
+        "title": "Setting Standards Across Department",
+        "top": 2.0,
+        "spacing": 0.85,
+        "height": 0.7,
+        "font_size": 22,
+        "items": [
+            "📋 Establish Validation Templates",
+            "🔍 Mandatory Pre-Release Validation",
+            "📊 Documentation Requirements",
+            "✅ Sign-off Process",
+            "🔄 Continuous Improvement"
+        ]
+    },
+    # Slide 10: Thank You
+    {
+        "kind": "title",
+        "title": "Thank You",
+        "subtitle": "Questions & Discussion"
+    }
+]
+
+def extract_template_design(theme):
+    """Map the template's theme colours onto the deck colours, falling back to defaults"""
+    from pptx.dml.color import RGBColor
+    colors = {
+        'primary': RGBColor(0, 102, 204),  # Default vibrant blue
+        'secondary': RGBColor(255, 102, 0),  # Default vibrant orange
+        'accent': RGBColor(0, 153, 76),  # Default vibrant green
+        'dark_text': RGBColor(33, 33, 33),
+        'light_bg': RGBColor(245, 245, 250)
+    }
+
+    # Override the defaults with the template's theme colours
+    if theme is not None:
+        for name, slot in THEME_COLOR_SLOTS.items():
+            value = theme['colors'].get(slot)
+            if value:
+                colors[name] = RGBColor.from_string(value)
+
+    return colors
+
+def resolve_color(colors, value):
+    """Map a theme colour name or '#RRGGBB' string from a deck spec to an RGBColor"""
+    from pptx.dml.color import RGBColor
+    if isinstance(value, RGBColor):
+        return value
+    if value in colors:
+        return colors[value]
+    return RGBColor.from_string(value.lstrip('#'))
+
+def add_title_slide(prs, colors, title, subtitle=""):
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+    white = RGBColor(255, 255, 255)
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    # Background
+    background = slide.background
+    fill = background.fill
+    fill.solid()
+    fill.fore_color.rgb = colors['primary']
+
+    # Title
+    left = Inches(0.5)
+    top = Inches(2.5)
+    width = Inches(9)
+    height = Inches(1.2)
+    txBox = slide.shapes.add_textbox(left, top, width, height)
+    tf = txBox.text_frame
+    tf.text = title
+    p = tf.paragraphs[0]
+    p.font.size = Pt(48)
+    p.font.bold = True
+    p.font.color.rgb = white
+    p.alignment = PP_ALIGN.CENTER
+
+    if subtitle:
+        top = Inches(4.2)
+        height = Inches(0.8)
+        txBox2 = slide.shapes.add_textbox(left, top, width, height)
+        tf2 = txBox2.text_frame
+        tf2.text = subtitle
+        p2 = tf2.paragraphs[0]
+        p2.font.size = Pt(24)
+        p2.font.color.rgb = white
+        p2.alignment = PP_ALIGN.CENTER
+    return slide
+
+def add_content_slide(prs, colors, title, title_color, description, items, consolidated=False):
+    from pptx.util import Inches, Pt
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    white = RGBColor(255, 255, 255)
+    dark_text = colors['dark_text']
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     left = Inches(0.5)
     top = Inches(0.3)
     width = Inches(9)
-    
-    txBox = slide.shapes.add_textbox(left, top, width, Inches(0.6))
+
+    # Title with colored background
+    title_height = Inches(0.8)
+    shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, title_height)
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = title_color
+    shape.line.fill.background()
+
+    txBox = slide.shapes.add_textbox(left + Inches(0.2), top + Inches(0.1), width, title_height)
     tf = txBox.text_frame
-    tf.text = "Validation Checklist Summary"
+    tf.text = title
     p = tf.paragraphs[0]
-    p.font.size = Pt(40)
+    p.font.size = Pt(32)
     p.font.bold = True
-    p.font.color.rgb = primary
-    
-    checklist = [
-        "✓ Technical: Navigation, Drill-down, Aggregations",
-        "✓ Functional: Filters, Measure Values, Summary vs Drill",
-        "✓ Data Integrity: Column Definitions, Joins, Null Handling",
-        "✓ Data Accuracy: Source Comparison, Edge Cases"
-    ]
-    
-    top = Inches(2.2)
-    for i, item in enumerate(checklist):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(1.1), width, Inches(0.8))
+    p.font.color.rgb = white
+
+    # Description
+    top = Inches(1.4)
+    if description:
+        txBox = slide.shapes.add_textbox(left, top, width, Inches(0.4))
+        tf = txBox.text_frame
+        tf.text = description
+        p = tf.paragraphs[0]
+        p.font.size = Pt(16)
+        p.font.italic = True
+        p.font.color.rgb = dark_text
+        top = Inches(1.9)
+
+    # Items
+    if consolidated:
+        from deck_layout import content_font_size
+        from text_frames import add_text_block, line
+        lines = [
+            line(item, content_font_size(item), bold=content_font_size(item) == 15, color=dark_text)
+            for item in items
+        ]
+        add_text_block(slide, left, top, width, Inches(0.35), lines)
+        return slide
+    for i, item in enumerate(items):
+        if not item.strip():
+            continue
+        item_top = top + i * Inches(0.35)
+        txBox = slide.shapes.add_textbox(left, item_top, width, Inches(0.35))
         tf = txBox.text_frame
         tf.text = item
         p = tf.paragraphs[0]
-        p.font.size = Pt(20)
+        if item.startswith("   •") or item.startswith("  •"):
+            p.font.size = Pt(13)
+        elif item.startswith("•"):
+            p.font.size = Pt(14)
+        else:
+            p.font.size = Pt(15)
+            p.font.bold = True
         p.font.color.rgb = dark_text
-        p.font.bold = True
-    
-    # Slide 9: Standards
+    return slide
+
+def add_slide_title(prs, colors, title):
+    """Add a blank slide with the plain 40pt heading used by list/section slides"""
+    from pptx.util import Inches, Pt
     slide = prs.slides.add_slide(prs.slide_layouts[6])
-    txBox = slide.shapes.add_textbox(left, top - Inches(1.9), width, Inches(0.6))
+    txBox = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(0.6))
     tf = txBox.text_frame
-    tf.text = "Setting Standards Across Department"
+    tf.text = title
     p = tf.paragraphs[0]
     p.font.size = Pt(40)
     p.font.bold = True
-    p.font.color.rgb = primary
-    
-    standards = [
-        "📋 Establish Validation Templates",
-        "🔍 Mandatory Pre-Release Validation",
-        "📊 Documentation Requirements",
-        "✅ Sign-off Process",
-        "🔄 Continuous Improvement"
-    ]
-    
-    top = Inches(2)
-    for i, item in enumerate(standards):
-        txBox = slide.shapes.add_textbox(left, top + i * Inches(0.85), width, Inches(0.7))
+    p.font.color.rgb = colors['primary']
+    return slide
+
+def add_list_slide(prs, colors, title, items, top=2.0, spacing=1.1, height=0.8, font_size=22,
+                   consolidated=False):
+    from pptx.util import Inches, Pt
+    slide = add_slide_title(prs, colors, title)
+    left = Inches(0.5)
+    width = Inches(9)
+
+    top = Inches(top)
+    if consolidated:
+        from text_frames import add_text_block, line
+        lines = [line(item, font_size, bold=True, color=colors['dark_text']) for item in items]
+        add_text_block(slide, left, top, width, Inches(spacing), lines)
+        return slide
+    for i, item in enumerate(items):
+        txBox = slide.shapes.add_textbox(left, top + i * Inches(spacing), width, Inches(height))
         tf = txBox.text_frame
         tf.text = item
         p = tf.paragraphs[0]
-        p.font.size = Pt(22)
-        p.font.color.rgb = dark_text
+        p.font.size = Pt(font_size)
+        p.font.color.rgb = colors['dark_text']
         p.font.bold = True
-    
-    # Slide 10: Thank You
-    add_title_slide("Thank You", "Questions & Discussion")
-    
+    return slide
+
+def add_sections_slide(prs, colors, title, sections, consolidated=False):
+    from pptx.util import Inches, Pt
+    slide = add_slide_title(prs, colors, title)
+    left = Inches(0.5)
+    width = Inches(9)
+    dark_text = colors['dark_text']
+
+    top = Inches(1.8)
+    for section in sections:
+        if consolidated:
+            from text_frames import add_text_block, line
+            lines = [line(section['title'], 20, bold=True, color=dark_text)]
+            lines += [line(item, 18, color=dark_text, indent=Inches(0.3)) for item in section['items']]
+            add_text_block(slide, left, top, width, Inches(0.5), lines)
+            top += Inches(0.5) * len(lines) + Inches(0.3)
+            continue
+        txBox = slide.shapes.add_textbox(left, top, width, Inches(0.5))
+        tf = txBox.text_frame
+        tf.text = section['title']
+        p = tf.paragraphs[0]
+        p.font.size = Pt(20)
+        p.font.bold = True
+        p.font.color.rgb = dark_text
+
+        top += Inches(0.5)
+        for item in section['items']:
+            txBox = slide.shapes.add_textbox(left + Inches(0.3), top, width, Inches(0.5))
+            tf = txBox.text_frame
+            tf.text = item
+            p = tf.paragraphs[0]
+            p.font.size = Pt(18)
+            p.font.color.rgb = dark_text
+            top += Inches(0.5)
+        top += Inches(0.3)
+    return slide
+
+def add_evidence_slide(prs, colors, title, image, caption="", title_color=None):
+    """Title bar plus one evidence image; the image stays on disk until save_streaming()"""
+    from pptx.util import Inches, Pt
+    from pptx_stream import add_evidence_picture
+    slide = add_content_slide(prs, colors, title, title_color or colors['primary'], "", [])
+    add_evidence_picture(slide, image, Inches(0.5), Inches(1.4), Inches(9), Inches(5.4))
+
+    if caption:
+        txBox = slide.shapes.add_textbox(Inches(0.5), Inches(6.9), Inches(9), Inches(0.4))
+        tf = txBox.text_frame
+        tf.text = caption
+        p = tf.paragraphs[0]
+        p.font.size = Pt(12)
+        p.font.italic = True
+        p.font.color.rgb = colors['dark_text']
+    return slide
+
+def add_spec_slide(prs, colors, spec, consolidated=False):
+    """Add one slide described by a DECK_SPEC entry"""
+    kind = spec['kind']
+    if kind == 'title':
+        return add_title_slide(prs, colors, spec['title'], spec.get('subtitle', ""))
+    if kind == 'content':
+        return add_content_slide(
+            prs, colors, spec['title'], resolve_color(colors, spec.get('color', 'primary')),
+            spec.get('description', ""), spec.get('items', []), consolidated
+        )
+    if kind == 'list':
+        options = {key: spec[key] for key in ('top', 'spacing', 'height', 'font_size') if key in spec}
+        return add_list_slide(prs, colors, spec['title'], spec.get('items', []), consolidated=consolidated, **options)
+    if kind == 'sections':
+        return add_sections_slide(prs, colors, spec['title'], spec.get('sections', []), consolidated)
+    if kind == 'evidence':
+        return add_evidence_slide(
+            prs, colors, spec['title'], spec['image'], spec.get('caption', ""),
+            resolve_color(colors, spec.get('color', 'primary'))
+        )
+    raise ValueError(f"Unknown slide kind: {kind!r}")
+
+def new_presentation(template_file=TEMPLATE_FILE):
+    """Create an empty presentation sized and themed like the template, plus its colours"""
+    from pptx import Presentation
+    from pptx.util import Inches
+    from template_theme import apply_theme_fonts, load_template_theme
+    prs = Presentation()
+    try:
+        theme = load_template_theme(template_file)
+        colors = extract_template_design(theme)
+        # Use template's slide dimensions
+        prs.slide_width = theme['slide_width']
+        prs.slide_height = theme['slide_height']
+        apply_theme_fonts(prs, theme['fonts'])
+        print(f"Template loaded - Slide size: {prs.slide_width/Inches(1):.1f}\" x {prs.slide_height/Inches(1):.1f}\"")
+    except Exception as e:
+        # Create new presentation with standard dimensions
+        prs.slide_width = Inches(10)
+        prs.slide_height = Inches(7.5)
+        colors = extract_template_design(None)
+        print(f"Creating new presentation - {e}")
+    return prs, colors
+
+def create_validation_presentation(spec=DECK_SPEC, output_file=OUTPUT_FILE, consolidated=False):
+    from pptx_stream import save_streaming
+    prs, colors = new_presentation()
+
+    for slide_spec in spec:
+        add_spec_slide(prs, colors, slide_spec, consolidated)
+
     # Save presentation
-    output_file = 'Report_Validation_Standards.pptx'
-    prs.save(output_file)
+    save_streaming(prs, output_file)
     print(f"✓ Presentation created successfully: {output_file}")
     print(f"✓ Total slides: {len(prs.slides)}")
 
-if __name__ == "__main__":
-    create_validation_presentation()
+def main():
+    parser = argparse.ArgumentParser(description="Create the Report Validation Standards deck")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only lay out the deck and report overflow; python-pptx is not imported")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="one text frame per block of lines instead of one text box per line")
+    args = parser.parse_args()
 
+    if args.dry_run:
+        from deck_layout import dry_run
+        return 1 if dry_run(DECK_SPEC, OUTPUT_FILE, TEMPLATE_FILE) else 0
+    create_validation_presentation(consolidated=args.consolidated)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
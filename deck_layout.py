@@ -0,0 +1,191 @@
+"""
+Layout-only dry run for deck specs.
+
+Computes where every shape of a DECK_SPEC-style deck lands, using the same
+geometry as the add_*_slide helpers in create_presentation_enhanced.py, and
+reports shapes that run past the slide. Nothing here imports python-pptx or
+writes a package, so CI can check deck content in a few milliseconds.
+
+Text boxes created by python-pptx do not wrap (wrap="none" + spAutoFit), so
+besides boxes that run off the bottom of the slide we flag lines whose
+estimated width runs past the right edge.
+
+Usage:
+    python deck_layout.py [spec.json ...] [--template SamplePPT.pptx]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+SLIDE_WIDTH = 10.0
+SLIDE_HEIGHT = 7.5
+EMU_PER_INCH = 914400
+TEXT_INSET = 0.1            # default left/right inset of a text frame
+CHAR_WIDTH_EM = 0.45        # average Calibri glyph width, in ems
+CONTENT_LINE = 0.35         # add_content_slide line pitch
+LIST_DEFAULTS = {'top': 2.0, 'spacing': 1.1, 'height': 0.8, 'font_size': 22}
+
+def load_deck_spec(path):
+    """Load a deck spec from a .json/.yaml file (a list of slides or {"slides": [...]})"""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('slides', [])
+    return data
+
+def box(role, left, top, width, height, text='', font_size=None):
+    return {
+        'role': role, 'left': left, 'top': top, 'width': width, 'height': height,
+        'text': text, 'font_size': font_size
+    }
+
+def content_font_size(item):
+    """Font size add_content_slide gives an item line"""
+    if item.startswith("   •") or item.startswith("  •"):
+        return 13
+    if item.startswith("•"):
+        return 14
+    return 15
+
+def layout_title(spec):
+    boxes = [box('title', 0.5, 2.5, 9, 1.2, spec['title'], 48)]
+    if spec.get('subtitle'):
+        boxes.append(box('subtitle', 0.5, 4.2, 9, 0.8, spec['subtitle'], 24))
+    return boxes
+
+def layout_content(spec):
+    boxes = [
+        box('title_bar', 0.5, 0.3, 9, 0.8),
+        box('title', 0.7, 0.4, 9, 0.8, spec['title'], 32)
+    ]
+    top = 1.4
+    if spec.get('description'):
+        boxes.append(box('description', 0.5, top, 9, 0.4, spec['description'], 16))
+        top = 1.9
+    for i, item in enumerate(spec.get('items', [])):
+        if item.strip():
+            boxes.append(box('item', 0.5, top + i * CONTENT_LINE, 9, CONTENT_LINE, item, content_font_size(item)))
+    return boxes
+
+def layout_list(spec):
+    options = {key: spec.get(key, value) for key, value in LIST_DEFAULTS.items()}
+    boxes = [box('title', 0.5, 0.3, 9, 0.6, spec['title'], 40)]
+    for i, item in enumerate(spec.get('items', [])):
+        boxes.append(box('item', 0.5, options['top'] + i * options['spacing'], 9,
+                         options['height'], item, options['font_size']))
+    return boxes
+
+def layout_sections(spec):
+    boxes = [box('title', 0.5, 0.3, 9, 0.6, spec['title'], 40)]
+    top = 1.8
+    for section in spec.get('sections', []):
+        boxes.append(box('heading', 0.5, top, 9, 0.5, section['title'], 20))
+        top += 0.5
+        for item in section['items']:
+            boxes.append(box('item', 0.8, top, 9, 0.5, item, 18))
+            top += 0.5
+        top += 0.3
+    return boxes
+
+def layout_evidence(spec):
+    boxes = [
+        box('title_bar', 0.5, 0.3, 9, 0.8),
+        box('title', 0.7, 0.4, 9, 0.8, spec['title'], 32),
+        box('image', 0.5, 1.4, 9, 5.4)
+    ]
+    if spec.get('caption'):
+        boxes.append(box('caption', 0.5, 6.9, 9, 0.4, spec['caption'], 12))
+    return boxes
+
+LAYOUTS = {
+    'title': layout_title,
+    'content': layout_content,
+    'list': layout_list,
+    'sections': layout_sections,
+    'evidence': layout_evidence
+}
+
+def text_width(text, font_size):
+    """Rough rendered width of one unwrapped line, in inches"""
+    return len(text) * font_size * CHAR_WIDTH_EM / 72
+
+def check_boxes(boxes, slide_width=SLIDE_WIDTH, slide_height=SLIDE_HEIGHT):
+    """Return overflow messages for one slide's boxes"""
+    issues = []
+    for b in boxes:
+        if b['top'] + b['height'] > slide_height + 1e-9:
+            issues.append(f"{b['role']} ends at {b['top'] + b['height']:.2f}\" past slide height "
+                          f"{slide_height:.2f}\": {b['text'][:60]!r}")
+        if b['text'] and b['font_size']:
+            right = b['left'] + TEXT_INSET + text_width(b['text'], b['font_size'])
+            if right > slide_width:
+                issues.append(f"{b['role']} text runs to ~{right:.2f}\" past slide width "
+                              f"{slide_width:.2f}\": {b['text'][:60]!r}")
+    return issues
+
+def layout_deck(spec, slide_width=SLIDE_WIDTH, slide_height=SLIDE_HEIGHT):
+    """Lay out every slide of a spec and collect its overflow issues"""
+    report = []
+    for index, slide_spec in enumerate(spec, 1):
+        kind = slide_spec['kind']
+        if kind not in LAYOUTS:
+            report.append({'slide': index, 'kind': kind, 'title': slide_spec.get('title', ''),
+                           'boxes': [], 'issues': [f"unknown slide kind {kind!r}"]})
+            continue
+        boxes = LAYOUTS[kind](slide_spec)
+        report.append({
+            'slide': index,
+            'kind': kind,
+            'title': slide_spec.get('title', ''),
+            'boxes': boxes,
+            'issues': check_boxes(boxes, slide_width, slide_height)
+        })
+    return report
+
+def print_report(report, name='deck'):
+    """Print a dry-run report; returns the number of issues found"""
+    issues = sum(len(slide['issues']) for slide in report)
+    for slide in report:
+        for issue in slide['issues']:
+            print(f"{name}: slide {slide['slide']} ({slide['kind']} {slide['title']!r}): {issue}")
+    status = "✓" if not issues else "✗"
+    print(f"{status} {name}: {len(report)} slides laid out, {issues} overflow issue(s)")
+    return issues
+
+def slide_size(template_file):
+    """Slide size in inches from the template theme, or the 10\" x 7.5\" default"""
+    if not os.path.exists(template_file):
+        return SLIDE_WIDTH, SLIDE_HEIGHT
+    try:
+        from template_theme import load_template_theme
+        theme = load_template_theme(template_file)
+        return theme['slide_width'] / EMU_PER_INCH, theme['slide_height'] / EMU_PER_INCH
+    except Exception:
+        return SLIDE_WIDTH, SLIDE_HEIGHT
+
+def dry_run(spec, name='deck', template_file='SamplePPT.pptx'):
+    width, height = slide_size(template_file)
+    return print_report(layout_deck(spec, width, height), name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check deck spec layout without rendering")
+    parser.add_argument('specs', nargs='*', help="deck spec files; checks the built-in deck if omitted")
+    parser.add_argument('--template', default='SamplePPT.pptx', help="template used for the slide size")
+    args = parser.parse_args()
+
+    if not args.specs:
+        from create_presentation_enhanced import DECK_SPEC
+        return 1 if dry_run(DECK_SPEC, 'built-in deck', args.template) else 0
+    issues = 0
+    for path in args.specs:
+        issues += dry_run(load_deck_spec(path), path, args.template)
+    return 1 if issues else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
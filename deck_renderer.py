@@ -0,0 +1,251 @@
+"""
+Data-driven deck renderer for Report Validation Standards style decks.
+
+Takes a declarative deck spec (the same shape as DECK_SPEC in
+create_presentation_enhanced.py, stored as JSON or YAML) and renders it.
+Each slide kind is built once through the regular add_*_slide helpers to get
+its XML skeleton; every later slide of that kind is a deep copy of the cached
+shapes with the text and offsets filled in, so the output matches what the
+helpers produce while skipping the per-shape python-pptx work.
+
+With consolidated=True (one text frame per block of lines, see
+text_frames.py) only title slides are cloned; the other kinds are down to a
+handful of shapes each and go through the helpers directly.
+
+Usage:
+    python deck_renderer.py                      # renders DECK_SPEC
+    python deck_renderer.py deck1.json deck2.yaml -o out/
+    python deck_renderer.py deck.json -o - > deck.pptx   # stream to stdout
+    python deck_renderer.py deck.json -o out/ --incremental   # re-render changed slides only
+"""
+
+import argparse
+import contextlib
+import copy
+import os
+import sys
+
+from pptx import Presentation
+from pptx.util import Inches
+
+from pptx_stream import save_streaming
+from template_theme import apply_theme_fonts, theme_fonts
+
+from deck_layout import LIST_DEFAULTS, load_deck_spec
+from create_presentation_enhanced import (
+    DECK_SPEC, OUTPUT_FILE, new_presentation, resolve_color, add_spec_slide,
+    add_title_slide, add_content_slide, add_list_slide, add_sections_slide
+)
+
+NS = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'
+}
+
+def item_style(item):
+    """Return which add_content_slide text style an item line gets"""
+    if item.startswith("   •") or item.startswith("  •"):
+        return 'sub'
+    if item.startswith("•"):
+        return 'bullet'
+    return 'heading'
+
+def _set_text(element, text):
+    element.find('.//a:t', NS).text = text
+
+def _set_top(element, top):
+    element.find('.//a:xfrm/a:off', NS).set('y', str(int(top)))
+
+def _clonable(spec):
+    """Skeleton cloning only covers single-run, single-paragraph text"""
+    texts = [spec.get('title', ''), spec.get('subtitle', ''), spec.get('description', '')]
+    texts += spec.get('items', [])
+    for section in spec.get('sections', []):
+        texts.append(section['title'])
+        texts += section['items']
+    return bool(spec.get('title')) and not any('\n' in t or '\v' in t for t in texts)
+
+class DeckRenderer:
+    """Render deck specs from cached per-kind slide skeletons"""
+
+    def __init__(self, colors, slide_width=Inches(10), slide_height=Inches(7.5), consolidated=False, fonts=None):
+        self.colors = colors
+        self.fonts = fonts or {}
+        self.consolidated = consolidated
+        self.slide_width = slide_width
+        self.slide_height = slide_height
+        self._scratch = None
+        self._skeletons = {}
+
+    def new_deck(self):
+        prs = Presentation()
+        prs.slide_width = self.slide_width
+        prs.slide_height = self.slide_height
+        apply_theme_fonts(prs, self.fonts)
+        return prs
+
+    def _skeleton(self, key, build):
+        """Return cached (background, shapes) for `key`, building it on first use"""
+        if key not in self._skeletons:
+            if self._scratch is None:
+                self._scratch = self.new_deck()
+            slide = build(self._scratch)
+            bg = slide._element.cSld.bg
+            shapes = [copy.deepcopy(sp) for sp in slide.shapes._spTree.iter_shape_elms()]
+            self._skeletons[key] = (copy.deepcopy(bg) if bg is not None else None, shapes)
+        return self._skeletons[key]
+
+    def _emit(self, prs, background, shapes):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        if background is not None:
+            slide._element.cSld.insert(0, copy.deepcopy(background))
+        spTree = slide.shapes._spTree
+        for i, sp in enumerate(shapes):
+            cNvPr = sp.find('.//p:cNvPr', NS)
+            cNvPr.set('id', str(i + 2))
+            cNvPr.set('name', "%s %d" % (cNvPr.get('name').rsplit(' ', 1)[0], i + 1))
+            spTree.append(sp)
+        return slide
+
+    def _title_slide(self, prs, spec):
+        bg, (title, subtitle) = self._skeleton(
+            ('title',), lambda s: add_title_slide(s, self.colors, "T", "S")
+        )
+        shapes = [copy.deepcopy(title)]
+        _set_text(shapes[0], spec['title'])
+        if spec.get('subtitle'):
+            shapes.append(copy.deepcopy(subtitle))
+            _set_text(shapes[1], spec['subtitle'])
+        return self._emit(prs, bg, shapes)
+
+    def _content_slide(self, prs, spec):
+        color = resolve_color(self.colors, spec.get('color', 'primary'))
+        bg, (rect, title, desc, heading, sub, bullet) = self._skeleton(
+            ('content', str(color)),
+            lambda s: add_content_slide(s, self.colors, "T", color, "D", ["H", "   •S", "•B"])
+        )
+        protos = {'heading': heading, 'sub': sub, 'bullet': bullet}
+        shapes = [copy.deepcopy(rect), copy.deepcopy(title)]
+        _set_text(shapes[1], spec['title'])
+        top = Inches(1.4)
+        if spec.get('description'):
+            shapes.append(copy.deepcopy(desc))
+            _set_text(shapes[-1], spec['description'])
+            top = Inches(1.9)
+        for i, item in enumerate(spec.get('items', [])):
+            if not item.strip():
+                continue
+            sp = copy.deepcopy(protos[item_style(item)])
+            _set_text(sp, item)
+            _set_top(sp, top + i * Inches(0.35))
+            shapes.append(sp)
+        return self._emit(prs, bg, shapes)
+
+    def _list_slide(self, prs, spec):
+        options = {key: spec.get(key, value) for key, value in LIST_DEFAULTS.items()}
+        bg, (title, item_proto) = self._skeleton(
+            ('list', options['height'], options['font_size']),
+            lambda s: add_list_slide(s, self.colors, "T", ["I"], **options)
+        )
+        shapes = [copy.deepcopy(title)]
+        _set_text(shapes[0], spec['title'])
+        top = Inches(options['top'])
+        for i, item in enumerate(spec.get('items', [])):
+            sp = copy.deepcopy(item_proto)
+            _set_text(sp, item)
+            _set_top(sp, top + i * Inches(options['spacing']))
+            shapes.append(sp)
+        return self._emit(prs, bg, shapes)
+
+    def _sections_slide(self, prs, spec):
+        bg, (title, heading, item_proto) = self._skeleton(
+            ('sections',),
+            lambda s: add_sections_slide(s, self.colors, "T", [{'title': "H", 'items': ["I"]}])
+        )
+        shapes = [copy.deepcopy(title)]
+        _set_text(shapes[0], spec['title'])
+        top = Inches(1.8)
+        for section in spec.get('sections', []):
+            sp = copy.deepcopy(heading)
+            _set_text(sp, section['title'])
+            _set_top(sp, top)
+            shapes.append(sp)
+            top += Inches(0.5)
+            for item in section['items']:
+                sp = copy.deepcopy(item_proto)
+                _set_text(sp, item)
+                _set_top(sp, top)
+                shapes.append(sp)
+                top += Inches(0.5)
+            top += Inches(0.3)
+        return self._emit(prs, bg, shapes)
+
+    def add_slide(self, prs, spec):
+        """Add one spec slide, cloning the cached skeleton for its kind"""
+        builders = {
+            'title': self._title_slide,
+            'content': self._content_slide,
+            'list': self._list_slide,
+            'sections': self._sections_slide
+        }
+        if self.consolidated and spec['kind'] != 'title':
+            return add_spec_slide(prs, self.colors, spec, consolidated=True)
+        if spec['kind'] in builders and _clonable(spec):
+            return builders[spec['kind']](prs, spec)
+        return add_spec_slide(prs, self.colors, spec)
+
+    def render(self, spec, output_file):
+        """Render `spec` and stream it to `output_file` (a path, or '-' for stdout)"""
+        prs = self.new_deck()
+        for slide_spec in spec:
+            self.add_slide(prs, slide_spec)
+        save_streaming(prs, output_file)
+        return len(prs.slides)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render deck specs (JSON/YAML) to .pptx files")
+    parser.add_argument('specs', nargs='*', help="deck spec files; renders the built-in deck if omitted")
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help="directory for the rendered decks, or '-' to stream a single deck to stdout")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="one text frame per block of lines instead of one text box per line")
+    parser.add_argument('--incremental', action='store_true',
+                        help="re-render only the slides that changed since the last run (see incremental_deck.py)")
+    args = parser.parse_args()
+
+    if args.output_dir == '-':
+        if len(args.specs) > 1:
+            parser.error("only one spec can be streamed to stdout")
+        if args.incremental:
+            parser.error("--incremental needs an output directory")
+        # Keep stdout clean for the package bytes
+        with contextlib.redirect_stdout(sys.stderr):
+            prs, colors = new_presentation()
+        renderer = DeckRenderer(colors, prs.slide_width, prs.slide_height, args.consolidated, theme_fonts(prs))
+        spec = load_deck_spec(args.specs[0]) if args.specs else DECK_SPEC
+        count = renderer.render(spec, '-')
+        print(f"✓ {count} slides written to stdout", file=sys.stderr)
+        return
+
+    prs, colors = new_presentation()
+    renderer = DeckRenderer(colors, prs.slide_width, prs.slide_height, args.consolidated, theme_fonts(prs))
+
+    def render(spec, output_file):
+        if not args.incremental:
+            return f"{renderer.render(spec, output_file)} slides"
+        from incremental_deck import render_incremental
+        stats = render_incremental(renderer, spec, output_file)
+        return f"{stats['slides']} slides, {stats['rendered']} rendered, {stats['reused']} reused"
+
+    if not args.specs:
+        summary = render(DECK_SPEC, os.path.join(args.output_dir, OUTPUT_FILE))
+        print(f"✓ Presentation created successfully: {OUTPUT_FILE} ({summary})")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.specs:
+        output_file = os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0] + '.pptx')
+        summary = render(load_deck_spec(path), output_file)
+        print(f"✓ {path} -> {output_file} ({summary})")
+
+if __name__ == "__main__":
+    main()
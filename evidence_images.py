@@ -0,0 +1,195 @@
+"""
+Pre-sized variants of evidence images for each output.
+
+Screenshots are captured at full screen resolution, then drawn into a box a
+few inches wide: the evidence area of a PDF page, an evidence slide, an HTML
+thumbnail. Embedding the originals makes reports many times larger than
+they need to be, and every renderer decodes them again. Here each image is
+decoded once per target, turned upright from its EXIF orientation,
+downscaled to fit the target's box at the target's DPI and re-encoded, in a
+process pool. Variants are cached on disk under
+
+    <cache>/<ab>/<sha256 of the source>-<width>x<height>-q<quality>.<ext>
+
+so a screenshot that appears in many checklists, or is rendered again, is
+only processed once; the renderers (pdf_report.py, batch_decks.py) only
+embed these variants.
+
+JPEG sources stay JPEG (decoded at reduced size with Image.draft(), which
+is most of the speed-up); everything else becomes PNG, which keeps text in
+screenshots sharp. An image that already fits and needs no rotation is
+copied as it is. Without Pillow no variants are made and the renderers
+embed the originals.
+
+    python evidence_images.py Validation_Checklist_2024-06-30.json --profile pdf --profile pptx
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from checklist import evidence_image_path, file_mode, load_checklist
+from evidence_store import open_store
+
+CACHE_DIR = os.environ.get(
+    'REPORT_IMAGE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'report-validation-standards', 'images')
+)
+
+# Box in inches and resolution per output
+PROFILES = {
+    'pdf': {'box': (6.69, 4.72), 'dpi': 150, 'quality': 85},        # pdf_report.TEXT_WIDTH x IMAGE_MAX_HEIGHT
+    'pptx': {'box': (9.0, 5.4), 'dpi': 150, 'quality': 85},         # deck_layout.layout_evidence image box
+    'thumbnail': {'box': (3.33, 2.5), 'dpi': 96, 'quality': 80}     # 320 x 240 px
+}
+EXIF_ORIENTATION = 0x0112
+HASH_CHUNK = 1 << 20
+
+def box_pixels(profile):
+    width, height = PROFILES[profile]['box']
+    dpi = PROFILES[profile]['dpi']
+    return round(width * dpi), round(height * dpi)
+
+def file_digest(path):
+    """(SHA-256 hex digest, 'jpg' or 'png') for an image file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        chunk = f.read(HASH_CHUNK)
+        ext = 'jpg' if chunk[:2] == b'\xff\xd8' else 'png'
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(HASH_CHUNK)
+    return digest.hexdigest(), ext
+
+def variant_path(cache_dir, digest, box, quality, ext):
+    return os.path.join(cache_dir, digest[:2], f"{digest}-{box[0]}x{box[1]}-q{quality}.{ext}")
+
+def make_variant(source, target, box, quality):
+    """Write `source` fitted into `box` pixels to `target` (format from its extension); runs in a pool worker"""
+    from PIL import Image, ImageOps
+
+    jpeg = target.endswith('.jpg')
+    with Image.open(source) as image:
+        orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+        if orientation in (5, 6, 7, 8):
+            fitted = (box[1], box[0])     # the box the stored (unrotated) pixels must fit
+        else:
+            fitted = box
+        fits = image.width <= fitted[0] and image.height <= fitted[1]
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        os.close(fd)
+        try:
+            if fits and orientation == 1 and image.format == ('JPEG' if jpeg else 'PNG'):
+                shutil.copyfile(source, tmp_path)
+            else:
+                if jpeg:
+                    image.draft('RGB', fitted)
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+                if jpeg:
+                    if image.mode not in ('RGB', 'L'):
+                        image = image.convert('RGB')
+                    image.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+                else:
+                    image.save(tmp_path, 'PNG', optimize=False, compress_level=6)
+            os.chmod(tmp_path, file_mode(target))
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return target
+
+def prepare_variants(paths, profile, cache_dir=CACHE_DIR, workers=None):
+    """{source path: variant path} for `paths`, processing cache misses in a process pool
+
+    Images that cannot be processed are left out; renderers fall back to
+    the original. With workers=1, or a single miss, no pool is started.
+    """
+    if importlib.util.find_spec('PIL') is None:
+        return {}
+    from PIL import Image
+
+    # A decompression bomb only loses its own variant, like an unreadable file
+    failures = (OSError, ValueError, Image.DecompressionBombError)
+    box = box_pixels(profile)
+    quality = PROFILES[profile]['quality']
+    variants = {}
+    misses = {}
+    for path in dict.fromkeys(paths):
+        digest, ext = file_digest(path)
+        target = variant_path(cache_dir, digest, box, quality, ext)
+        if os.path.exists(target):
+            variants[path] = target
+        else:
+            misses.setdefault(target, []).append(path)
+    if not misses:
+        return variants
+    if workers == 1 or len(misses) == 1:
+        results = {}
+        for target, sources in misses.items():
+            try:
+                results[target] = make_variant(sources[0], target, box, quality)
+            except failures as e:
+                print(f"  – {sources[0]}: {e}", file=sys.stderr)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {target: pool.submit(make_variant, sources[0], target, box, quality)
+                       for target, sources in misses.items()}
+            results = {}
+            for target, future in futures.items():
+                try:
+                    results[target] = future.result()
+                except failures as e:
+                    print(f"  – {misses[target][0]}: {e}", file=sys.stderr)
+    for target in results:
+        for path in misses[target]:
+            variants[path] = target
+    return variants
+
+def checklist_images(checklist, evidence_dir, store=None):
+    """{(test case index, evidence number): image path} for the image evidence of a checklist"""
+    images = {}
+    for index, tc in enumerate(checklist['testCases']):
+        for number, evidence in enumerate(tc.get('evidence') or []):
+            if not (evidence.get('type') or '').startswith('image/'):
+                continue
+            path = evidence_image_path(evidence, evidence_dir, f"tc{index}-{number}", store)
+            if path is not None:
+                images[(index, number)] = path
+    return images
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-sized evidence image variants for checklists")
+    parser.add_argument('checklist', nargs='+', help="checklist exports")
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help="output to size for (repeatable; default: all)")
+    parser.add_argument('--cache', default=CACHE_DIR, help=f"variant cache directory (default: {CACHE_DIR})")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='evidence-') as evidence_dir:
+        sources = []
+        for path in args.checklist:
+            checklist = load_checklist(path)
+            sources.extend(checklist_images(checklist, evidence_dir, open_store(checklist, path)).values())
+        original = sum(os.path.getsize(path) for path in set(sources))
+        for profile in args.profile or sorted(PROFILES):
+            start = time.perf_counter()
+            variants = prepare_variants(sources, profile, args.cache, args.jobs)
+            size = sum(os.path.getsize(path) for path in set(variants.values()))
+            box = box_pixels(profile)
+            icon = '✓' if len(set(variants)) == len(set(sources)) else '✗'
+            print(f"{icon} {profile} ({box[0]}x{box[1]} px): {len(set(variants))}/{len(set(sources))} images, "
+                  f"{original / (1 << 20):.1f} MB -> {size / (1 << 20):.1f} MB "
+                  f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Content-addressed store for checklist evidence.
+
+handleEvidenceUpload() keeps every screenshot as a base64 data: URL inside
+its test case, and exportChecklist() writes them all into one JSON file, so
+exports reach hundreds of MB with the same screenshot repeated across test
+cases. This store keeps each distinct file once, under the SHA-256 of its
+bytes:
+
+    evidence/
+      manifest.json                {sha256: {"type", "size", "ext", "names"}}
+      objects/3f/3fa2…c9.png
+
+and the checklist keeps only a reference in place of the data: URL:
+
+    {"name": "top10.png", "type": "image/png", "sha256": "3fa2…c9", "size": 48213}
+
+with "evidenceStore" at the top level giving the store directory relative
+to the checklist file. Blobs are memory-mapped when they are read, and
+evidence_image_path() hands the object file itself to the deck renderer.
+
+Migration is lossless: a data: URL is only replaced when re-encoding the
+stored bytes gives back exactly the same URL, and inline rebuilds the
+original export.
+
+    python evidence_store.py migrate Validation_Checklist_2024-06-30.json
+    python evidence_store.py inline Validation_Checklist_2024-06-30.json -o full.json
+    python evidence_store.py verify --store evidence
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+
+from checklist import IMAGE_EXTENSIONS, file_mode, load_checklist, save_checklist, write_atomic
+
+STORE_DIR = 'evidence'
+MANIFEST = 'manifest.json'
+
+class EvidenceStore:
+    """Evidence files under objects/<first two hex digits>/<sha256>.<ext>, with a manifest"""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        self.manifest_path = os.path.join(root, MANIFEST)
+        self._manifest = None
+        self._dirty = False
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = {}
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+        return self._manifest
+
+    def save(self):
+        if self._dirty:
+            os.makedirs(self.root, exist_ok=True)
+            data = json.dumps(self.manifest, indent=1, sort_keys=True).encode('utf-8')
+            write_atomic(self.manifest_path, lambda f: f.write(data))
+            self._dirty = False
+
+    def path(self, digest):
+        """Object file of a stored blob, or None if the store does not have it"""
+        entry = self.manifest.get(digest)
+        if entry is None:
+            return None
+        path = os.path.join(self.objects, digest[:2], f"{digest}.{entry['ext']}")
+        return path if os.path.exists(path) else None
+
+    def put(self, data, media_type, name=None):
+        """Store `data` (deduplicated); returns its SHA-256 hex digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        entry = self.manifest.get(digest)
+        if entry is None:
+            ext = IMAGE_EXTENSIONS.get(media_type) or (media_type or 'bin').split('/')[-1].split('+')[0] or 'bin'
+            entry = self.manifest[digest] = {'type': media_type, 'size': len(data), 'ext': ext, 'names': []}
+            self._dirty = True
+        if self.path(digest) is None:
+            directory = os.path.join(self.objects, digest[:2])
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                target = os.path.join(directory, f"{digest}.{entry['ext']}")
+                os.chmod(tmp_path, file_mode(target))
+                os.replace(tmp_path, target)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        if name and name not in entry['names']:
+            entry['names'].append(name)
+            self._dirty = True
+        return digest
+
+    @contextlib.contextmanager
+    def blob(self, digest):
+        """Read-only memory map of a stored blob"""
+        path = self.path(digest)
+        if path is None:
+            raise KeyError(f"evidence {digest} is not in {self.root}")
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    def data_url(self, evidence):
+        """The data: URL a reference replaced"""
+        header = evidence.get('urlHeader') or f"data:{evidence.get('type')};base64"
+        with self.blob(evidence['sha256']) as data:
+            return f"{header},{base64.b64encode(data).decode('ascii')}"
+
+    def verify(self):
+        """Digests whose object is missing or no longer hashes to its name"""
+        bad = []
+        for digest in self.manifest:
+            try:
+                with self.blob(digest) as data:
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        bad.append(digest)
+            except KeyError:
+                bad.append(digest)
+        return bad
+
+def open_store(checklist, checklist_path):
+    """The EvidenceStore a checklist's references point into, or None"""
+    root = checklist.get('evidenceStore')
+    if not root:
+        return None
+    return EvidenceStore(os.path.join(os.path.dirname(os.path.abspath(checklist_path)), root))
+
+def _replace_key(item, old, new_items):
+    """Copy of dict `item` with key `old` replaced by `new_items` in the same position"""
+    out = {}
+    for key, value in item.items():
+        if key == old:
+            out.update(new_items)
+        else:
+            out[key] = value
+    return out
+
+def migrate_checklist(checklist, store):
+    """Move base64 data: URL evidence into `store`; returns counts of what happened"""
+    counts = {'migrated': 0, 'inline': 0, 'bytes': 0}
+    for tc in checklist['testCases']:
+        evidence = tc.get('evidence') or []
+        for number, item in enumerate(evidence):
+            url = item.get('url')
+            if not isinstance(url, str) or not url.startswith('data:') or ',' not in url:
+                continue
+            header, payload = url.split(',', 1)
+            try:
+                data = base64.b64decode(payload, validate=True) if header.endswith(';base64') else None
+            except ValueError:
+                data = None
+            if data is None or base64.b64encode(data).decode('ascii') != payload:
+                # Not plain base64 that re-encodes identically; keeping it is the only lossless choice
+                counts['inline'] += 1
+                continue
+            media_type = header[5:].split(';')[0] or item.get('type')
+            digest = store.put(data, media_type, item.get('name'))
+            reference = {'sha256': digest, 'size': len(data)}
+            if header != f"data:{item.get('type')};base64":
+                reference['urlHeader'] = header
+            evidence[number] = _replace_key(item, 'url', reference)
+            counts['migrated'] += 1
+            counts['bytes'] += len(url)
+    return counts
+
+def inline_checklist(checklist, store):
+    """Put the data: URLs back in place of store references; returns how many"""
+    count = 0
+    for tc in checklist['testCases']:
+        evidence = tc.get('evidence') or []
+        for number, item in enumerate(evidence):
+            if item.get('sha256'):
+                url = store.data_url(item)
+                item = {key: value for key, value in item.items() if key not in ('size', 'urlHeader')}
+                evidence[number] = _replace_key(item, 'sha256', {'url': url})
+                count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Move checklist evidence into a content-addressed store and back")
+    parser.add_argument('command', choices=['migrate', 'inline', 'verify'])
+    parser.add_argument('checklist', nargs='*', help="checklist exports")
+    parser.add_argument('--store', help=f"store directory (default: {STORE_DIR}/ next to the checklist, "
+                                        "or the checklist's evidenceStore)")
+    parser.add_argument('-o', '--output', help="write here instead of updating the checklist (one checklist only)")
+    args = parser.parse_args()
+
+    if args.output and len(args.checklist) != 1:
+        parser.error("-o needs exactly one checklist")
+    if args.command == 'verify':
+        roots = [args.store] if args.store else []
+        for path in args.checklist:
+            store = open_store(load_checklist(path), path)
+            if store is not None:
+                roots.append(store.root)
+        if not roots:
+            parser.error("verify needs --store or checklists that reference a store")
+        failed = 0
+        for root in dict.fromkeys(roots):
+            store = EvidenceStore(root)
+            bad = store.verify()
+            size = sum(entry['size'] for entry in store.manifest.values())
+            icon = '✓' if not bad else '✗'
+            print(f"{icon} {root}: {len(store.manifest)} blobs, {size / (1 << 20):.1f} MB, {len(bad)} damaged")
+            for digest in bad:
+                print(f"    {digest}")
+            failed += len(bad)
+        return 1 if failed else 0
+
+    for path in args.checklist:
+        checklist = load_checklist(path)
+        output = args.output or path
+        store = open_store(checklist, path)
+        if args.command == 'migrate':
+            if store is None:
+                root = args.store or os.path.join(os.path.dirname(os.path.abspath(output)), STORE_DIR)
+                store = EvidenceStore(root)
+                relative = os.path.relpath(os.path.abspath(root), os.path.dirname(os.path.abspath(output)))
+                checklist = dict(checklist, evidenceStore=relative.replace(os.sep, '/'))
+            counts = migrate_checklist(checklist, store)
+            store.save()
+            save_checklist(checklist, output)
+            print(f"✓ {path}: {counts['migrated']} evidence files moved to {store.root} "
+                  f"({counts['bytes'] / (1 << 20):.1f} MB of data URLs), {counts['inline']} kept inline")
+        else:
+            if store is None:
+                print(f"– {path}: no evidence store referenced")
+                continue
+            count = inline_checklist(checklist, store)
+            checklist.pop('evidenceStore', None)
+            save_checklist(checklist, output)
+            print(f"✓ {path}: {count} evidence files inlined into {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
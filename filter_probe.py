@@ -0,0 +1,344 @@
+"""
+Filter-combination performance probe for dashboard prompts.
+
+The Functional slide asks to "confirm performance is reasonable under
+typical filter combinations". Running the report query for every
+combination of prompt values is a cartesian product that quickly takes
+days; most slow queries, however, come from the interaction of one or two
+prompts. This probe builds a t-way covering array instead: a set of
+combinations in which every pair (or every t values, with --strength) of
+prompt values that can appear together appears at least once. Each
+combination's query runs on a pool of worker threads. The probe reports
+latency percentiles and the slowest combinations.
+
+A probe spec (JSON or YAML) lists the prompts with their value domains:
+
+    {
+      "connection": "duckdb:///lakehouse.duckdb",
+      "query": "SELECT supplier_name, SUM(invoice_amount) FROM ap_invoices_fact
+                WHERE (:region IS NULL OR region IN (:region))
+                  AND (:country IS NULL OR country = :country)
+                  AND invoice_date BETWEEN :start_date AND :end_date
+                GROUP BY supplier_name",
+      "prompts": [
+        {"name": "region", "values": [null, "EMEA", "APAC", ["EMEA", "APAC"]], "all": true},
+        {"name": "country", "dependsOn": "region",
+         "values": {"EMEA": ["UK", "DE"], "APAC": ["JP", "AU"]}},
+        {"name": "ledger", "values": [null, 1, 2]}
+      ],
+      "constraints": [{"region": "APAC", "ledger": 2}]
+    }
+
+null stands for "All" (the prompt left unset). A list is a multi-select
+selection: inside IN (...) its placeholder expands to one bind value per
+element, anywhere else it is bound to the first one, so that tests such as
+:region IS NULL still work. "all": true adds the selection of every value. A
+cascading prompt ("dependsOn") maps each parent value to the child values
+it offers; a child value is only combined with parents that offer it.
+"constraints" are combinations that cannot be selected together.
+
+    python filter_probe.py top10_prompts.json --start-date 2024-01-01 --end-date 2024-12-31 -j 8
+    python filter_probe.py top10_prompts.json --strength 3 --list
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from checklist import write_atomic
+from checklist_runner import ConnectionPool
+from validation_engine import PARAM_RE, bind_params, query_rows
+
+STRENGTH = 2
+CANDIDATES = 20             # candidate rows built per covering array row; the best one is kept
+WORKERS = 8
+WORST = 10
+PERCENTILES = (50, 90, 95, 99)
+
+IN_BEFORE_RE = re.compile(r"\bIN\s*\(\s*$", re.I)
+IN_AFTER_RE = re.compile(r"\s*\)")
+
+def load_probe(path):
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            import yaml
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    names = [prompt.get('name') for prompt in spec.get('prompts') or []]
+    if not spec.get('query') or not names or not all(names):
+        raise ValueError(f"{path}: a probe needs a query and named prompts")
+    for prompt in spec['prompts']:
+        parent = prompt.get('dependsOn')
+        if parent is not None and (parent not in names or not isinstance(prompt.get('values'), dict)):
+            raise ValueError(f"{path}: {prompt['name']} depends on {parent!r}, which needs a known prompt "
+                             "and values given per parent value")
+    return spec
+
+def _key(value):
+    return json.dumps(value, sort_keys=True)
+
+def prompt_levels(prompt):
+    """The selections a prompt is probed with, in spec order"""
+    values = prompt['values']
+    if isinstance(values, dict):
+        values = list({_key(v): v for options in values.values() for v in options}.values())
+    levels = list(values)
+    if prompt.get('all'):
+        levels.append([v for v in values if v is not None and not isinstance(v, list)])
+    return list({_key(level): level for level in levels}.values())
+
+def validity(spec, domains):
+    """allowed(assignment) for partial assignments {prompt index: level index}"""
+    prompts = spec['prompts']
+    index = {prompt['name']: i for i, prompt in enumerate(prompts)}
+    cascades = []
+    for child, prompt in enumerate(prompts):
+        if prompt.get('dependsOn') is not None:
+            offered = {str(parent): {_key(v) for v in options} for parent, options in prompt['values'].items()}
+            cascades.append((index[prompt['dependsOn']], child, offered))
+    constraints = []
+    for constraint in spec.get('constraints') or []:
+        unknown = set(constraint) - set(index)
+        if unknown:
+            raise ValueError(f"Constraint on unknown prompt {', '.join(sorted(unknown))}")
+        constraints.append({index[name]: _key(value) for name, value in constraint.items()})
+    keys = [[_key(level) for level in levels] for levels in domains]
+
+    def cascade_ok(parent_level, child_level, offered):
+        if parent_level is None or child_level is None:
+            return True
+        parents = parent_level if isinstance(parent_level, list) else [parent_level]
+        allowed = set().union(*(offered.get(str(p), ()) for p in parents))
+        children = child_level if isinstance(child_level, list) else [child_level]
+        return all(_key(c) in allowed for c in children)
+
+    def allowed(assignment):
+        for parent, child, offered in cascades:
+            if parent in assignment and child in assignment and not cascade_ok(
+                    domains[parent][assignment[parent]], domains[child][assignment[child]], offered):
+                return False
+        for constraint in constraints:
+            if all(p in assignment and keys[p][assignment[p]] == key for p, key in constraint.items()):
+                return False
+        return True
+    return allowed
+
+def covering_array(domains, strength=STRENGTH, allowed=lambda assignment: True, seed=0, candidates=CANDIDATES):
+    """Greedy t-way covering array; returns (rows of level indices, t-tuples no valid row can cover)
+
+    Every allowed combination of `strength` prompt levels is covered by at
+    least one row. Rows are built one at a time (as in AETG): starting from
+    an uncovered tuple, the other prompts are filled in random order with
+    the level covering most uncovered tuples, and the best of `candidates`
+    such rows is kept.
+    """
+    rng = random.Random(seed)
+    k = len(domains)
+    t = min(strength, k)
+    uncovered = set()
+    for prompts in itertools.combinations(range(k), t):
+        for levels in itertools.product(*(range(len(domains[p])) for p in prompts)):
+            if allowed(dict(zip(prompts, levels))):
+                uncovered.add(tuple(zip(prompts, levels)))
+
+    def covered_by(row):
+        return {tuple((p, row[p]) for p in prompts) for prompts in itertools.combinations(range(k), t)}
+
+    def gain(row, prompt, level):
+        assigned = sorted(p for p in row if p != prompt)
+        count = 0
+        for others in itertools.combinations(assigned, t - 1):
+            tup = tuple(sorted([(p, row[p]) for p in others] + [(prompt, level)]))
+            count += tup in uncovered
+        return count
+
+    rows = []
+    impossible = []
+    while uncovered:
+        start = min(uncovered)
+        best, best_new = None, None
+        for _ in range(candidates):
+            row = dict(start)
+            order = [p for p in range(k) if p not in row]
+            rng.shuffle(order)
+            for prompt in order:
+                levels = list(range(len(domains[prompt])))
+                rng.shuffle(levels)
+                choices = [(gain(row, prompt, level), level) for level in levels
+                           if allowed({**row, prompt: level})]
+                if not choices:
+                    row = None
+                    break
+                row[prompt] = max(choices, key=lambda choice: choice[0])[1]
+            if row is None:
+                continue
+            new = covered_by(row) & uncovered
+            if best is None or len(new) > len(best_new):
+                best, best_new = row, new
+        if best is None:
+            impossible.append(start)
+            uncovered.discard(start)
+            continue
+        rows.append([best[p] for p in range(k)])
+        uncovered -= best_new
+    return rows, impossible
+
+def bind_prompts(sql, params):
+    """bind_params() with list values (multi-select prompts) expanded to one placeholder per element in IN (...)"""
+    expanded = {}
+
+    def expand(match):
+        name = match.group(1)
+        if name is None or not isinstance(params.get(name), list):
+            return match.group(0)
+        values = params[name]
+        in_list = (IN_BEFORE_RE.search(match.string, max(0, match.start() - 20), match.start())
+                   and IN_AFTER_RE.match(match.string, match.end()))
+        if not in_list:
+            expanded[f"{name}__0"] = values[0] if values else None
+            return f":{name}__0"
+        if not values:
+            return 'NULL'
+        for i, value in enumerate(values):
+            expanded[f"{name}__{i}"] = value
+        return ', '.join(f":{name}__{i}" for i in range(len(values)))
+    return bind_params(PARAM_RE.sub(expand, sql), dict(params, **expanded))
+
+def probe(pool, sql, combination, params, repeat=1):
+    """Run the query for one combination `repeat` times; returns its median latency and row count"""
+    sql, values = bind_prompts(sql, dict(params, **combination))
+    latencies = []
+    rows = 0
+    with pool.connection() as connection:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, result = query_rows(connection, sql, values)
+            rows = sum(1 for _ in result)
+            latencies.append(time.perf_counter() - start)
+    return {'seconds': round(float(np.median(latencies)), 4), 'rows': rows}
+
+def run_probe(pool, sql, combinations, params, workers=WORKERS, repeat=1, on_result=None):
+    """Probe every combination on `workers` threads; results in combination order"""
+    def run(index):
+        try:
+            result = dict(probe(pool, sql, combinations[index], params, repeat), status='ok')
+        except Exception as e:
+            result = {'status': 'error', 'message': f"{type(e).__name__}: {e}", 'seconds': None, 'rows': None}
+        result['index'] = index
+        result['values'] = combinations[index]
+        if on_result:
+            on_result(result)
+        return result
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, range(len(combinations))))
+
+def latency_summary(results):
+    seconds = np.array([r['seconds'] for r in results if r['status'] == 'ok'], dtype=float)
+    if not len(seconds):
+        return {}
+    summary = {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(seconds, PERCENTILES))}
+    summary['max'] = round(float(seconds.max()), 4)
+    summary['mean'] = round(float(seconds.mean()), 4)
+    return summary
+
+def describe(combination):
+    def show(value):
+        if value is None:
+            return '(All)'
+        if isinstance(value, list):
+            return '[' + ', '.join(str(v) for v in value) + ']'
+        return str(value)
+    return ', '.join(f"{name}={show(value)}" for name, value in combination.items())
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe query latency over a covering array of prompt combinations")
+    parser.add_argument('spec', help="probe spec (JSON or YAML) with the query, prompts and constraints")
+    parser.add_argument('--target', help="database to query (default: the spec's connection)")
+    parser.add_argument('--strength', type=int, default=STRENGTH, help="cover every combination of this many prompts")
+    parser.add_argument('-j', '--jobs', type=int, default=WORKERS, help="queries run at the same time")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per combination; the median is kept")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the covering array construction")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help="extra query parameter (repeatable)")
+    parser.add_argument('--worst', type=int, default=WORST, help="slowest combinations to print")
+    parser.add_argument('--max-ms', type=float, help="fail when a combination takes longer than this")
+    parser.add_argument('--list', action='store_true', help="only print the combinations, do not run them")
+    parser.add_argument('-o', '--output', help="write every combination and its latency as JSON")
+    args = parser.parse_args()
+
+    spec = load_probe(args.spec)
+    names = [prompt['name'] for prompt in spec['prompts']]
+    domains = [prompt_levels(prompt) for prompt in spec['prompts']]
+    start = time.perf_counter()
+    rows, impossible = covering_array(domains, args.strength, validity(spec, domains), args.seed)
+    combinations = [{name: domains[p][level] for p, (name, level) in enumerate(zip(names, row))} for row in rows]
+    product = 1
+    for levels in domains:
+        product *= len(levels)
+    print(f"  {len(combinations):,} combinations cover every {min(args.strength, len(names))}-way interaction of "
+          f"{len(names)} prompts ({product:,} in the full product), built in {time.perf_counter() - start:.2f}s")
+    for tup in impossible:
+        print(f"  – no valid combination contains {describe({names[p]: domains[p][level] for p, level in tup})}")
+    if args.list:
+        for combination in combinations:
+            print(f"    {describe(combination)}")
+        return 0
+
+    url = args.target or spec.get('connection')
+    if not url:
+        parser.error("give --target or a connection in the spec")
+    params = dict(spec.get('params') or {})
+    params.update(param.split('=', 1) for param in args.param)
+    if args.start_date:
+        params['start_date'] = args.start_date
+    if args.end_date:
+        params['end_date'] = args.end_date
+
+    done = [0]
+
+    def report(result):
+        done[0] += 1
+        if result['status'] == 'error':
+            print(f"[{done[0]}/{len(combinations)}] ✗ {describe(result['values'])}: {result['message']}")
+
+    pool = ConnectionPool('target', url, max(1, args.jobs))
+    start = time.perf_counter()
+    try:
+        results = run_probe(pool, spec['query'], combinations, params, args.jobs, max(1, args.repeat), report)
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - start
+
+    summary = latency_summary(results)
+    errors = [r for r in results if r['status'] == 'error']
+    slow = [r for r in results if r['status'] == 'ok' and args.max_ms is not None
+            and r['seconds'] * 1000 > args.max_ms]
+    if summary:
+        print("  latency " + ', '.join(f"{name} {value * 1000:.0f} ms" for name, value in summary.items()))
+    ranked = sorted((r for r in results if r['status'] == 'ok'), key=lambda r: -r['seconds'])
+    if ranked:
+        print("  slowest combinations:")
+    for result in ranked[:args.worst]:
+        print(f"    {result['seconds'] * 1000:8.0f} ms  {result['rows']:>9,} rows  {describe(result['values'])}")
+    if args.output:
+        data = json.dumps({'spec': args.spec, 'strength': args.strength, 'combinations': len(combinations),
+                           'full_product': product, 'latency': summary, 'results': results}, indent=2)
+        write_atomic(args.output, lambda f: f.write(data.encode('utf-8')))
+    failed = errors or slow
+    icon = '✗' if failed else '✓'
+    limit = f", {len(slow)} over {args.max_ms:.0f} ms" if args.max_ms is not None else ''
+    print(f"{icon} {len(results)} combinations in {elapsed:.1f}s: {len(errors)} errors{limit}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
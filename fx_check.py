@@ -0,0 +1,327 @@
+"""
+Multi-currency conversion check with an indexed exchange-rate lookup.
+
+The "Multi-currency conversions" edge case means recomputing every converted
+amount with the rate in effect on its conversion date for its currency pair.
+A correlated subquery per transaction does not scale. Instead the rate table
+is indexed once: each (pair, date) becomes one int64 key, pair number in the
+high 32 bits and day in the low 32, sorted with the rates alongside. A whole
+batch of transactions is then looked up with a single searchsorted (the last
+rate on or before each conversion date), converted, rounded by the rules of
+its ledger and compared with the reported amount, all as array operations.
+
+Rounding rules are per ledger: --rounding "JP Primary=0" for a JPY ledger,
+or "US Primary=2:half_even". Modes are half_up (away from zero, like
+Oracle's ROUND), half_even and truncate. Transactions already in the ledger
+currency convert at 1. A rate older than --max-rate-age days counts as
+missing, and with --allow-inverse a missing pair falls back to 1 / the rate
+of the reverse pair.
+
+Transactions need the columns from_currency, to_currency, conversion_date,
+amount and reported_amount (and optionally ledger); rates need
+from_currency, to_currency, conversion_date and rate. Alias them in the
+query, or map them with --column LOGICAL=ACTUAL:
+
+    python fx_check.py --source sqlite:///ebs.db \\
+        --query "SELECT ledger_name AS ledger, currency_code AS from_currency, ledger_currency AS to_currency,
+                 currency_conversion_date AS conversion_date, entered_dr AS amount, accounted_dr AS reported_amount
+                 FROM gl_je_lines_v" \\
+        --rates-query "SELECT from_currency, to_currency, conversion_date, conversion_rate AS rate FROM gl_daily_rates
+                       WHERE conversion_type = 'Corporate'" \\
+        --rounding "JP Primary=0"
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from aggregation_check import read_csv_columns, read_query_columns, to_numbers
+from validation_engine import MAX_SAMPLES, connect
+
+ROUNDING_MODES = ('half_up', 'half_even', 'truncate')
+DEFAULT_DIGITS = 2
+TOLERANCE = 0.0
+EPSILON = 1e-9
+DAY_OFFSET = 1 << 31        # days since 1970 made non-negative for the low 32 bits of a key
+NO_DATE = np.iinfo(np.int64).min     # NaT as int64
+FACTORIZE_SPAN = 1 << 22
+TRANSACTION_COLUMNS = ('from_currency', 'to_currency', 'conversion_date', 'amount', 'reported_amount')
+RATE_COLUMNS = ('from_currency', 'to_currency', 'conversion_date', 'rate')
+
+def factorize(values):
+    """(uniques, codes) with values == uniques[codes]; codes, dates and ledgers repeat a lot"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'OUS':
+        seen = {}
+        items = values if values.dtype.kind == 'O' else values.tolist()
+        codes = np.fromiter((seen.setdefault(v, len(seen)) for v in items), dtype=np.int64, count=len(values))
+        uniques = np.empty(len(seen), dtype=object)
+        uniques[:] = list(seen)
+        return uniques, codes
+    if values.dtype.kind in 'iuM' and len(values):
+        numbers = values.view(np.int64) if values.dtype.kind == 'M' else values.astype(np.int64)
+        low = numbers.min()
+        span = int(numbers.max()) - int(low)
+        if span < FACTORIZE_SPAN:
+            # Small range (days, combined pair codes): a lookup table instead of a sort
+            present = np.zeros(span + 1, dtype=bool)
+            present[numbers - low] = True
+            table = np.cumsum(present) - 1
+            uniques = (np.flatnonzero(present) + low).astype(numbers.dtype)
+            return uniques.view(values.dtype) if values.dtype.kind == 'M' else uniques, table[numbers - low]
+    uniques = np.unique(values)
+    return uniques, np.searchsorted(uniques, values)
+
+def currency_codes(values):
+    return np.char.upper(np.char.strip(np.asarray(values).astype(str)))
+
+def parse_days(values):
+    """Days since 1970-01-01 (int64) from dates, datetimes or ISO text; blanks become NO_DATE"""
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        days = values.astype('datetime64[D]')
+    else:
+        text = values.astype(str).astype('U10')
+        blank = (np.char.strip(text) == '') | (text == 'None') | (text == 'nan')
+        days = np.where(blank, 'NaT', text).astype('datetime64[D]')
+    return days.astype(np.int64)
+
+def to_days(values):
+    """parse_days() over each distinct value only"""
+    uniques, codes = factorize(values)
+    return parse_days(uniques)[codes]
+
+def show_day(day):
+    return 'no date' if day == NO_DATE else str(np.datetime64(int(day), 'D'))
+
+def pair_names(from_codes, to_codes):
+    return np.char.add(np.char.add(from_codes, '/'), to_codes)
+
+def currency_pairs(from_currency, to_currency):
+    """Distinct pairs of two currency columns: (names, per-row codes, same-currency mask, reversed names)"""
+    from_uniques, from_codes = factorize(from_currency)
+    to_uniques, to_codes = factorize(to_currency)
+    combined = from_codes * len(to_uniques) + to_codes
+    uniques, codes = factorize(combined)
+    froms = currency_codes(from_uniques)[uniques // max(len(to_uniques), 1)]
+    tos = currency_codes(to_uniques)[uniques % max(len(to_uniques), 1)]
+    return pair_names(froms, tos), codes, froms == tos, pair_names(tos, froms)
+
+class RateIndex:
+    """Exchange rates sorted on a (pair, day) int64 key"""
+
+    def __init__(self, from_currency, to_currency, conversion_date, rate):
+        days = to_days(conversion_date)
+        rate = to_numbers(rate)
+        usable = (days != NO_DATE) & ~np.isnan(rate)
+        names, codes, _, _ = currency_pairs(from_currency, to_currency)
+        self.pairs, pair_ids = np.unique(names[codes][usable], return_inverse=True)
+        keys = (pair_ids.astype(np.int64) << 32) | (days[usable] + DAY_OFFSET)
+        rate = rate[usable]
+        order = np.argsort(keys, kind='stable')
+        keys, rate = keys[order], rate[order]
+        # The same pair and day loaded twice: keep the later row, note if the rates disagree
+        duplicate = np.flatnonzero(keys[1:] == keys[:-1])
+        self.conflicts = [(str(self.pairs[keys[i] >> 32]), self._day(keys[i]), rate[i], rate[i + 1])
+                          for i in duplicate if rate[i] != rate[i + 1]]
+        keep = np.ones(len(keys), dtype=bool)
+        keep[duplicate] = False
+        self.keys, self.rates = keys[keep], rate[keep]
+
+    @staticmethod
+    def _day(key):
+        return show_day((key & 0xFFFFFFFF) - DAY_OFFSET)
+
+    def _pair_ids(self, names):
+        """Index of each pair name in self.pairs, -1 if the index has no rates for it"""
+        if not len(self.pairs):
+            return np.full(len(names), -1, dtype=np.int64)
+        ids = np.minimum(np.searchsorted(self.pairs, names), len(self.pairs) - 1)
+        return np.where(self.pairs[ids] == names, ids, -1)
+
+    def _find(self, ids, days, max_age):
+        """(rates, found) for pair ids on days; unknown pairs or dates give NaN, found False"""
+        if not len(self.keys):
+            return np.full(len(ids), np.nan), np.zeros(len(ids), dtype=bool)
+        dated = (days != NO_DATE) & (ids >= 0)
+        keys = (np.maximum(ids, 0) << 32) | (np.where(dated, days, 0) + DAY_OFFSET)
+        at = np.searchsorted(self.keys, keys, side='right') - 1
+        clipped = np.maximum(at, 0)
+        found = dated & (at >= 0) & ((self.keys[clipped] >> 32) == ids)
+        if max_age is not None:
+            found &= (keys - self.keys[clipped]) <= max_age
+        return np.where(found, self.rates[clipped], np.nan), found
+
+    def lookup(self, from_currency, to_currency, conversion_date, max_age=None, allow_inverse=False):
+        """Rate per transaction and a status array: 0 found, 1 same currency, 2 inverse, 3 missing"""
+        names, codes, same, reverse = currency_pairs(from_currency, to_currency)
+        days = to_days(conversion_date)
+        rates, found = self._find(self._pair_ids(names)[codes], days, max_age)
+        status = np.where(found, 0, 3)
+        same = same[codes]
+        rates[same], status[same] = 1.0, 1
+        if allow_inverse:
+            todo = np.flatnonzero(status == 3)
+            inverse, found = self._find(self._pair_ids(reverse)[codes[todo]], days[todo], max_age)
+            found &= inverse != 0
+            rates[todo[found]] = 1.0 / inverse[found]
+            status[todo[found]] = 2
+        return rates, status
+
+def parse_rounding(text):
+    """'LEDGER=DIGITS[:MODE]' -> (ledger, digits, mode)"""
+    ledger, _, rule = text.rpartition('=')
+    digits, _, mode = rule.partition(':')
+    mode = mode or 'half_up'
+    if not ledger or not digits.strip().lstrip('-').isdigit() or mode not in ROUNDING_MODES:
+        raise ValueError(f"--rounding must look like LEDGER=DIGITS[:{'|'.join(ROUNDING_MODES)}]: {text!r}")
+    return ledger.strip(), int(digits), mode
+
+def round_amounts(values, digits, mode):
+    """Round `values` to per-row `digits` with one mode"""
+    scale = 10.0 ** digits
+    scaled = values * scale
+    if mode == 'half_even':
+        rounded = np.round(scaled)
+    elif mode == 'truncate':
+        rounded = np.trunc(scaled + np.sign(scaled) * EPSILON)
+    else:
+        rounded = np.sign(scaled) * np.floor(np.abs(scaled) + 0.5 + EPSILON)
+    return rounded / scale
+
+def ledger_rules(ledgers, rules, digits=DEFAULT_DIGITS, mode='half_up'):
+    """Per-row (digits, mode index) arrays from {ledger: (digits, mode)}"""
+    row_digits = np.full(len(ledgers), digits, dtype=np.int64)
+    row_modes = np.full(len(ledgers), ROUNDING_MODES.index(mode), dtype=np.int8)
+    if rules and len(ledgers):
+        names, codes = factorize(ledgers)
+        digits_of = np.array([rules.get(str(name).strip(), (digits, mode))[0] for name in names], dtype=np.int64)
+        modes_of = np.array([ROUNDING_MODES.index(rules.get(str(name).strip(), (digits, mode))[1])
+                             for name in names], dtype=np.int8)
+        row_digits, row_modes = digits_of[codes], modes_of[codes]
+    return row_digits, row_modes
+
+def check_conversions(transactions, index, rules=None, digits=DEFAULT_DIGITS, mode='half_up',
+                      tolerance=TOLERANCE, max_age=None, allow_inverse=False, max_samples=MAX_SAMPLES):
+    """Recompute every converted amount in `transactions` ({column: array}) and compare it"""
+    count = len(transactions['amount'])
+    ledgers = transactions.get('ledger')
+    ledgers = np.full(count, '') if ledgers is None else np.asarray(ledgers)
+    rates, status = index.lookup(transactions['from_currency'], transactions['to_currency'],
+                                 transactions['conversion_date'], max_age, allow_inverse)
+    amounts = to_numbers(transactions['amount'])
+    reported = to_numbers(transactions['reported_amount'])
+    row_digits, row_modes = ledger_rules(ledgers, rules or {}, digits, mode)
+    converted = amounts * rates
+    expected = np.empty(count)
+    for number, name in enumerate(ROUNDING_MODES):
+        rows = row_modes == number
+        if rows.any():
+            expected[rows] = round_amounts(converted[rows], row_digits[rows], name)
+    missing = status == 3
+    bad = ~missing & ~(np.abs(np.nan_to_num(expected) - np.nan_to_num(reported)) <= tolerance + EPSILON)
+
+    samples = []
+    for i in np.flatnonzero(missing | bad)[:max_samples]:
+        samples.append({
+            'row': int(i), 'ledger': str(ledgers[i]),
+            'pair': f"{currency_codes([transactions['from_currency'][i]])[0]}/"
+                    f"{currency_codes([transactions['to_currency'][i]])[0]}",
+            'date': show_day(to_days([transactions['conversion_date'][i]])[0]),
+            'amount': float(amounts[i]), 'rate': None if missing[i] else float(rates[i]),
+            'expected': None if missing[i] else float(expected[i]), 'reported': float(reported[i]),
+            'type': 'missing rate' if missing[i] else 'mismatch'
+        })
+    by_ledger = {}
+    if (missing | bad).any():
+        names, counts = np.unique(ledgers[missing | bad].astype(str), return_counts=True)
+        by_ledger = {str(name): int(n) for name, n in zip(names, counts)}
+    return {
+        'rows': count, 'same_currency': int((status == 1).sum()), 'inverse': int((status == 2).sum()),
+        'missing_rate': int(missing.sum()), 'mismatched': int(bad.sum()), 'by_ledger': by_ledger,
+        'rate_conflicts': index.conflicts[:max_samples], 'samples': samples,
+        'status': 'failed' if (missing.any() or bad.any()) else 'passed'
+    }
+
+def parse_column_map(values):
+    mapping = {}
+    for value in values:
+        logical, _, actual = value.partition('=')
+        if logical not in TRANSACTION_COLUMNS + RATE_COLUMNS + ('ledger',) or not actual:
+            raise ValueError(f"--column must look like LOGICAL=ACTUAL with a known logical name: {value!r}")
+        mapping[logical] = actual
+    return mapping
+
+def load_columns(logical, mapping, csv_path=None, connection=None, sql=None, params=None):
+    """{logical name: array}, reading the mapped column names from a CSV or a query"""
+    actual = [mapping.get(name, name) for name in logical]
+    columns = read_csv_columns(csv_path, actual) if csv_path else read_query_columns(connection, sql, params or {}, actual)
+    return {name: columns[column] for name, column in zip(logical, actual)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check converted amounts against an indexed exchange-rate table")
+    parser.add_argument('--transactions-csv', help="transactions as CSV")
+    parser.add_argument('--source', help="database holding the transactions (and rates)")
+    parser.add_argument('--query', help="query returning the transactions (with --source)")
+    parser.add_argument('--rates-csv', help="exchange rates as CSV")
+    parser.add_argument('--rates', help="database holding the rates (default: --source)")
+    parser.add_argument('--rates-query', help="query returning the exchange rates")
+    parser.add_argument('--column', action='append', default=[], metavar='LOGICAL=ACTUAL',
+                        help="actual name of a logical column (repeatable)")
+    parser.add_argument('--no-ledger', action='store_true', help="transactions have no ledger column")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--rounding', action='append', default=[], metavar='LEDGER=DIGITS[:MODE]',
+                        help="rounding rule for a ledger (repeatable)")
+    parser.add_argument('--digits', type=int, default=DEFAULT_DIGITS, help="decimal places for other ledgers")
+    parser.add_argument('--mode', choices=ROUNDING_MODES, default='half_up', help="rounding mode for other ledgers")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed absolute difference")
+    parser.add_argument('--max-rate-age', type=int, help="days a rate stays usable after its date")
+    parser.add_argument('--allow-inverse', action='store_true', help="use 1 / the reverse pair's rate when missing")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="failing transactions to report")
+    args = parser.parse_args()
+
+    if not (args.transactions_csv or (args.source and args.query)):
+        parser.error("give --transactions-csv, or --source with --query")
+    if not (args.rates_csv or args.rates_query):
+        parser.error("give --rates-csv or --rates-query")
+    mapping = parse_column_map(args.column)
+    rules = {ledger: (digits, mode) for ledger, digits, mode in map(parse_rounding, args.rounding)}
+    params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+    logical = TRANSACTION_COLUMNS + (() if args.no_ledger else ('ledger',))
+
+    connections = {}
+    try:
+        for url in (args.source, args.rates or args.source):
+            if url and url not in connections:
+                connections[url] = connect(url)
+        transactions = load_columns(logical, mapping, args.transactions_csv,
+                                    connections.get(args.source), args.query, params)
+        rates = load_columns(RATE_COLUMNS, mapping, args.rates_csv,
+                             connections.get(args.rates or args.source), args.rates_query, params)
+    finally:
+        for connection in connections.values():
+            connection.close()
+
+    index = RateIndex(rates['from_currency'], rates['to_currency'], rates['conversion_date'], rates['rate'])
+    result = check_conversions(transactions, index, rules, args.digits, args.mode, args.tolerance,
+                               args.max_rate_age, args.allow_inverse, args.max_samples)
+
+    print(f"  {len(index.keys):,} rates over {len(index.pairs):,} currency pairs")
+    for pair, day, first, second in result['rate_conflicts']:
+        print(f"  – {pair} {day} loaded twice with rates {first} and {second}; using {second}")
+    icon = '✓' if result['status'] == 'passed' else '✗'
+    print(f"{icon} {result['rows']:,} transactions ({result['same_currency']:,} in ledger currency, "
+          f"{result['inverse']:,} via inverse rates): {result['missing_rate']:,} without a rate, "
+          f"{result['mismatched']:,} mismatched")
+    for ledger, count in result['by_ledger'].items():
+        print(f"    {ledger or '(no ledger)'}: {count:,} failing")
+    for sample in result['samples']:
+        print(f"    row {sample['row']} {sample['ledger']} {sample['pair']} {sample['date']}: {sample['type']}, "
+              f"amount={sample['amount']} rate={sample['rate']} expected={sample['expected']} "
+              f"reported={sample['reported']}")
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
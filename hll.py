@@ -0,0 +1,325 @@
+"""
+HyperLogLog sketches for checking DISTINCT COUNT measures on large fact tables.
+
+Checking "distinct suppliers per period" exactly means materialising every
+distinct set on both sides. A HyperLogLog sketch instead keeps one small
+register per bucket (2**precision bytes, 16 KB at the default 1% error)
+however many values go in. Sketches of the same precision merge with
+an element-wise max, so per-partition sketches can be combined into a
+distinct count over any set of partitions. They can also be saved and merged
+with the sketches of later runs.
+
+compare_distinct() estimates both sides per partition and decides:
+
+  * identical sketches, or estimates closer than the tolerance by more
+    than the error bound: pass
+  * estimates further apart than the tolerance by more than the error
+    bound: fail
+  * anything in between is too close to call; only those partitions are
+    counted exactly, in one more pass over the query (unless --no-exact).
+    A partition whose sketch includes sketches merged from earlier runs
+    cannot be counted again, so a close call there is reported unverified
+
+The error bound is Z standard errors of the difference of two estimates.
+
+    python hll.py --source sqlite:///ebs.db \\
+        --source-query "SELECT strftime('%Y-%m', invoice_date), vendor_id FROM ap_invoices_all" \\
+        --target sqlite:///lake.db \\
+        --target-query "SELECT strftime('%Y-%m', calendar_date), supplier_id FROM ap_invoices_fact" \\
+        --error 0.01 --tolerance 0 --save-source ebs.hll.json
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import sys
+import zlib
+
+import numpy as np
+
+from checklist import write_atomic
+from validation_engine import bind_params, connect, normalize, query_rows
+
+ERROR = 0.01                # target relative standard error
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+Z = 3.0                     # standard errors covered by the pass/fail bound
+BATCH = 50000
+SKETCH_VERSION = 1
+
+def precision_for_error(error):
+    """Smallest precision whose standard error (1.04 / sqrt(2**p)) is at most `error`"""
+    p = math.ceil(math.log2((1.04 / error) ** 2))
+    return min(max(p, MIN_PRECISION), MAX_PRECISION)
+
+def hash_values(values):
+    """64-bit hashes of the values' normalised text, so 42, 42.0 and '42' count as one value"""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(normalize(v)).encode('utf-8'), digest_size=8).digest(), 'little')
+         for v in values),
+        dtype=np.uint64, count=len(values)
+    )
+
+def _leading_zeros(values):
+    """Leading zero bits of each uint64 (64 for zero)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        high_bits = np.where(high > 0, np.floor(np.log2(np.maximum(high, 1))) + 1, 0)
+        low_bits = np.where(low > 0, np.floor(np.log2(np.maximum(low, 1))) + 1, 0)
+    return np.where(high > 0, 32 - high_bits, 64 - low_bits).astype(np.uint8)
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with 2**precision registers"""
+
+    def __init__(self, precision=None, error=ERROR):
+        self.precision = precision or precision_for_error(error)
+        if not MIN_PRECISION <= self.precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def error(self):
+        """Relative standard error of the estimate"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes):
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rest = hashes << p
+        rank = np.minimum(_leading_zeros(rest), 64 - self.precision) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def update(self, values):
+        """Add an iterable of values; None (SQL NULL) is not counted"""
+        batch = []
+        for value in values:
+            if value is not None:
+                batch.append(value)
+                if len(batch) >= BATCH:
+                    self.add_hashes(hash_values(batch))
+                    batch = []
+        if batch:
+            self.add_hashes(hash_values(batch))
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return float(raw)
+
+    def merge(self, other):
+        """Union with another sketch of the same precision, in place"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge precision {other.precision} into {self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.registers[:] = self.registers
+        return sketch
+
+    def __eq__(self, other):
+        return isinstance(other, HyperLogLog) and np.array_equal(self.registers, other.registers)
+
+    def to_bytes(self):
+        return bytes([SKETCH_VERSION, self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[0] != SKETCH_VERSION:
+            raise ValueError(f"Unsupported sketch version {data[0]}")
+        sketch = cls(data[1])
+        sketch.registers[:] = np.frombuffer(zlib.decompress(data[2:]), dtype=np.uint8)
+        return sketch
+
+def save_sketches(path, sketches):
+    """Write {partition: HyperLogLog} as JSON (base64 sketches)"""
+    payload = {str(key): base64.b64encode(sketch.to_bytes()).decode('ascii') for key, sketch in sketches.items()}
+    write_atomic(path, lambda f: f.write(json.dumps({'sketches': payload}, indent=1, sort_keys=True).encode('utf-8')))
+
+def load_sketches(path):
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)['sketches']
+    return {key: HyperLogLog.from_bytes(base64.b64decode(data)) for key, data in payload.items()}
+
+def merge_sketches(into, sketches):
+    """Merge {partition: sketch} into `into` (a sketch per partition), keeping partitions from both"""
+    for key, sketch in sketches.items():
+        if key in into:
+            into[key].merge(sketch)
+        else:
+            into[key] = sketch.copy()
+    return into
+
+def partition_sketches(rows, precision):
+    """{partition: HyperLogLog} from (partition, value) rows, or (value,) rows for a single '' partition"""
+    sketches = {}
+    batches = {}
+    for row in rows:
+        key, value = partition_key(row)
+        if value is None:
+            continue
+        batch = batches.setdefault(key, [])
+        batch.append(value)
+        if len(batch) >= BATCH:
+            sketches.setdefault(key, HyperLogLog(precision)).add_hashes(hash_values(batch))
+            batch.clear()
+    for key, batch in batches.items():
+        sketch = sketches.setdefault(key, HyperLogLog(precision))
+        if batch:
+            sketch.add_hashes(hash_values(batch))
+    return sketches
+
+def query_sketches(connection, sql, params, precision):
+    sql, values = bind_params(sql, params)
+    _, rows = query_rows(connection, sql, values)
+    return partition_sketches(rows, precision)
+
+def partition_key(row):
+    """(partition, value) of a query row; single-column rows all fall in the '' partition"""
+    if len(row) > 1:
+        return '' if row[0] is None else str(row[0]), row[1]
+    return '', row[0]
+
+def exact_counts(connection, sql, params, partitions):
+    """Exact distinct counts for the given partitions (None: all rows), in one more pass over the query"""
+    sql, values = bind_params(sql, params)
+    _, rows = query_rows(connection, sql, values)
+    distinct = {key: set() for key in partitions}
+    everything = distinct.get(None)
+    for row in rows:
+        key, value = partition_key(row)
+        if value is None:
+            continue
+        # Counted by the same normalised text the sketches hash
+        value = str(normalize(value))
+        if key in distinct:
+            distinct[key].add(value)
+        if everything is not None:
+            everything.add(value)
+    return {key: len(found) for key, found in distinct.items()}
+
+def decide(source, target, error, tolerance, z=Z):
+    """'pass', 'fail' or 'unsure' for two estimates with relative standard error `error`"""
+    largest = max(source, target)
+    if largest == 0:
+        return 'pass'
+    difference = abs(source - target) / largest
+    bound = z * error * math.sqrt(2)
+    if difference + bound <= tolerance:
+        return 'pass'
+    if difference - bound > tolerance:
+        return 'fail'
+    return 'unsure'
+
+def within(source, target, tolerance):
+    largest = max(source, target)
+    return not largest or abs(source - target) / largest <= tolerance
+
+def compare_distinct(source, target, precision, tolerance=0.0, exact=None, z=Z, merged=()):
+    """Compare {partition: sketch} maps per partition and over all partitions merged
+
+    `exact(partitions)` returns exact ({partition: source count},
+    {partition: target count}) and is only called for close calls.
+    Partitions in `merged` (None for all partitions merged) hold sketches
+    of earlier runs that a query cannot count again; their close calls are
+    reported unverified.
+    """
+    empty = HyperLogLog(precision)
+    merged_source, merged_target = empty.copy(), empty.copy()
+    for sketch in source.values():
+        merged_source.merge(sketch)
+    for sketch in target.values():
+        merged_target.merge(sketch)
+
+    results = []
+    for key in sorted(source.keys() | target.keys()) + [None]:
+        s = merged_source if key is None else source.get(key, empty)
+        t = merged_target if key is None else target.get(key, empty)
+        item = {'partition': '(all)' if key is None else key, 'key': key, 'source': round(s.estimate()),
+                'target': round(t.estimate()), 'method': 'sketch'}
+        item['status'] = 'pass' if s == t else decide(item['source'], item['target'], s.error, tolerance, z)
+        results.append(item)
+
+    for item in results:
+        if item['status'] == 'unsure' and item['key'] in merged:
+            item['status'] = 'unverified'
+    unsure = [item['key'] for item in results if item['status'] == 'unsure']
+    if unsure and exact is not None:
+        exact_source, exact_target = exact(unsure)
+        for item in results:
+            if item['key'] in exact_source:
+                item['source'] = exact_source[item['key']]
+                item['target'] = exact_target[item['key']]
+                item['method'] = 'exact'
+                item['status'] = 'pass' if within(item['source'], item['target'], tolerance) else 'fail'
+    for item in results:
+        item['status'] = {'pass': 'passed', 'fail': 'failed', 'unsure': 'unsure',
+                          'unverified': 'unverified'}[item.pop('status')]
+        del item['key']
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare DISTINCT COUNTs per partition with HyperLogLog sketches")
+    parser.add_argument('--source', required=True, help="source database (sqlite:///path, duckdb:///path)")
+    parser.add_argument('--source-query', required=True, help="query returning (partition, value) or (value)")
+    parser.add_argument('--target', required=True, help="target database")
+    parser.add_argument('--target-query', required=True, help="query returning (partition, value) or (value)")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--error', type=float, default=ERROR, help="relative standard error of the sketches")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="allowed relative difference")
+    parser.add_argument('--no-exact', action='store_true', help="report close calls as unsure instead of counting")
+    parser.add_argument('--merge-source', help="merge previously saved source sketches before comparing")
+    parser.add_argument('--merge-target', help="merge previously saved target sketches before comparing")
+    parser.add_argument('--save-source', help="save the source sketches (JSON) for later runs")
+    parser.add_argument('--save-target', help="save the target sketches (JSON) for later runs")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+    precision = precision_for_error(args.error)
+    source_conn = connect(args.source)
+    target_conn = connect(args.target)
+    try:
+        sketches = {}
+        merged = set()
+        for name, connection, sql, merge_path, save_path in (
+            ('source', source_conn, args.source_query, args.merge_source, args.save_source),
+            ('target', target_conn, args.target_query, args.merge_target, args.save_target)
+        ):
+            sketches[name] = query_sketches(connection, sql, params, precision)
+            if merge_path and os.path.exists(merge_path):
+                earlier = load_sketches(merge_path)
+                merge_sketches(sketches[name], earlier)
+                merged.update(earlier)
+                merged.add(None)
+            if save_path:
+                save_sketches(save_path, sketches[name])
+        def exact(partitions):
+            return (exact_counts(source_conn, args.source_query, params, partitions),
+                    exact_counts(target_conn, args.target_query, params, partitions))
+
+        results = compare_distinct(sketches['source'], sketches['target'], precision, args.tolerance,
+                                   None if args.no_exact else exact, merged=merged)
+    finally:
+        source_conn.close()
+        target_conn.close()
+
+    error = 1.04 / math.sqrt(1 << precision)
+    print(f"HyperLogLog precision {precision} ({1 << precision} registers, ±{error:.2%} standard error)")
+    for item in results:
+        icon = {'passed': '✓', 'failed': '✗', 'unsure': '?', 'unverified': '?'}[item['status']]
+        print(f"{icon} {item['partition']}: source {item['source']:,} vs target {item['target']:,} ({item['method']})")
+    return 0 if all(item['status'] == 'passed' for item in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Incremental re-validation of the ledger/month partitions that changed.
+
+A full reconcile.py run aggregates the whole history every night, although
+between releases only recent periods and a few backdated entries change.
+This runner keeps a state file with, for every (ledger, month) partition
+and each side, a watermark: the latest last_update_date, the row count and
+the checksums reconcile.py compares. A nightly run then:
+
+  1. asks each side which partitions have rows updated since its stored
+     watermark (an index range scan on the update column, so the work
+     follows the churn). A backdated entry lands in an old, closed month
+     but still carries a new last_update_date, so it is caught here;
+  2. adds the partitions that failed last time;
+  3. re-reads the watermark of just those partitions on both sides and
+     compares them. Months that still differ are drilled into per day and
+     transaction with reconcile.py;
+  4. saves the new watermarks and the failing partitions.
+
+Deleted rows leave no update timestamp behind, so --full recomputes every
+partition's watermark (one GROUP BY per side) and re-validates any whose
+count or checksums moved since the state was written; run it weekly, or
+whenever a release deletes data. The first run, with no state yet, is a
+full one.
+
+The spec is reconcile.py's, with an "updated" column on each side:
+
+    "source": {..., "updated": "last_update_date"}
+
+    python incremental.py ap_invoices.json --state ap_invoices.state.json
+    python incremental.py ap_invoices.json --state ap_invoices.state.json --full
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+from checklist import write_atomic
+from reconcile import (
+    LEVELS, _chunks, _execute, _sort_key, _where, checksums_match, level_exprs, load_spec, metric_exprs,
+    print_report, reconcile
+)
+from validation_engine import MAX_SAMPLES, connect, normalize
+
+STATE_VERSION = 1
+OVERLAP_MINUTES = 60        # re-read rows updated this long before the watermark, for late commits
+
+# Comparison of the update column with a watermark bound as text
+SINCE = {
+    'sqlite': "{0} > ?",
+    'duckdb': "{0} > CAST(? AS TIMESTAMP)",
+    'oracle': "{0} > TO_TIMESTAMP(?, 'YYYY-MM-DD HH24:MI:SS.FF')"
+}
+
+def load_state(path):
+    """{'source': {...}, 'target': {...}, 'failed': [...]}; None if there is no state yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return None
+    for side in ('source', 'target'):
+        state[side]['partitions'] = {_sort_key(p['partition']): p for p in state[side]['partitions']}
+    return state
+
+def save_state(path, state):
+    data = dict(state, version=STATE_VERSION)
+    for side in ('source', 'target'):
+        data[side] = dict(state[side], partitions=sorted(state[side]['partitions'].values(),
+                                                         key=lambda p: _sort_key(p['partition'])))
+    write_atomic(path, lambda f: f.write(json.dumps(data, indent=1, default=str).encode('utf-8')))
+
+def watermark_text(value):
+    """Update timestamp as text that sorts and binds the same way on every dialect"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ', 'microseconds')
+    if isinstance(value, datetime.date):
+        return value.isoformat() + ' 00:00:00.000000'
+    return None if value is None else str(value)
+
+def since(watermark, overlap_minutes=OVERLAP_MINUTES):
+    """The watermark moved back by the overlap, when it parses as a timestamp"""
+    try:
+        moment = datetime.datetime.fromisoformat(watermark)
+    except (TypeError, ValueError):
+        return watermark
+    return watermark_text(moment - datetime.timedelta(minutes=overlap_minutes))
+
+def _require_updated(side, name):
+    if not side.get('updated'):
+        raise ValueError(f"spec {name} needs an \"updated\" column (e.g. last_update_date) for incremental runs")
+
+def updated_partitions(connection, side, watermark, params, stats):
+    """(ledger, month) partitions with rows updated after `watermark`"""
+    exprs = level_exprs(side, 1)
+    where, values = _where(side, 1, None)
+    clause = SINCE[side.get('dialect', 'sqlite')].format(side['updated'])
+    where = f"{where} AND {clause}" if where else f" WHERE {clause}"
+    sql = f"SELECT {', '.join(exprs)} FROM {side['table']}{where} GROUP BY {', '.join(exprs)}"
+    return {_sort_key(row): list(row) for row in _execute(connection, sql, params, values + [watermark], stats)}
+
+def partition_watermarks(connection, side, partitions, params, stats):
+    """{key: {'partition', 'updated', 'checksums'}} for the given (ledger, month) partitions, or all"""
+    exprs = level_exprs(side, 1)
+    columns = exprs + [f"MAX({side['updated']})"] + metric_exprs(side)
+    watermarks = {}
+    for chunk in _chunks(partitions):
+        where, values = _where(side, 1, chunk)
+        sql = f"SELECT {', '.join(columns)} FROM {side['table']}{where} GROUP BY {', '.join(exprs)}"
+        for row in _execute(connection, sql, params, values, stats):
+            watermarks[_sort_key(row[:2])] = {
+                'partition': list(row[:2]), 'updated': watermark_text(row[2]),
+                'checksums': [normalize(value) for value in row[3:]]
+            }
+    return watermarks
+
+def _checksums(entry):
+    return None if entry is None else tuple(entry['checksums'])
+
+def run_incremental(source_conn, target_conn, spec, params, state=None, full=False,
+                    overlap_minutes=OVERLAP_MINUTES, max_samples=MAX_SAMPLES):
+    """One incremental (or full) run; returns (result, new state)"""
+    for name in ('source', 'target'):
+        _require_updated(spec[name], name)
+    stats = {'rows_fetched': 0}
+    full = full or state is None
+    sides = {'source': (source_conn, spec['source']), 'target': (target_conn, spec['target'])}
+    stored = {name: (state or {}).get(name, {}).get('partitions', {}) for name in sides}
+    current = {}
+    if full:
+        for name, (connection, side) in sides.items():
+            current[name] = partition_watermarks(connection, side, None, params, stats)
+        keys = set(current['source']) | set(current['target']) | set(stored['source']) | set(stored['target'])
+        # Only partitions that moved since the last run, or still differ, need a closer look
+        candidates = {key for key in keys if any(
+            _checksums(current[name].get(key)) != _checksums(stored[name].get(key)) for name in sides)}
+        candidates |= {key for key in keys if not checksums_match(
+            _checksums(current['source'].get(key)), _checksums(current['target'].get(key)))}
+    else:
+        touched = {}
+        for name, (connection, side) in sides.items():
+            watermark = state[name].get('watermark')
+            if watermark is None:
+                found = {key: entry['partition'] for key, entry in
+                         partition_watermarks(connection, side, None, params, stats).items()}
+            else:
+                found = updated_partitions(connection, side, since(watermark, overlap_minutes), params, stats)
+            touched.update(found)
+        touched.update({_sort_key(p): p for p in state.get('failed', [])})
+        candidates = set(touched)
+        for name, (connection, side) in sides.items():
+            current[name] = {}
+            if touched:
+                current[name] = partition_watermarks(connection, side, list(touched.values()), params, stats)
+
+    differing = sorted(key for key in candidates if not checksums_match(
+        _checksums(current['source'].get(key)), _checksums(current['target'].get(key))))
+    partition_of = {}
+    for name in sides:
+        for key, entry in current[name].items():
+            partition_of[key] = entry['partition']
+    for key in candidates:
+        partition_of.setdefault(key, (stored['source'].get(key) or stored['target'].get(key) or {}).get(
+            'partition', list(key)))
+
+    if differing:
+        result = reconcile(source_conn, target_conn, spec, params, max_samples, start_level=2,
+                           parents=[tuple(partition_of[key]) for key in differing])
+        result['levels'].insert(0, {'level': LEVELS[1], 'partitions': len(candidates), 'differing': len(differing)})
+        result['rows_fetched'] += stats['rows_fetched']
+    else:
+        result = {'status': 'passed', 'differing': [], 'rows_fetched': stats['rows_fetched'],
+                  'levels': [{'level': LEVELS[1], 'partitions': len(candidates), 'differing': 0}],
+                  'transactions': {'samples': []}}
+    result['mode'] = 'full' if full else 'incremental'
+    result['message'] = (f"{result['mode']} run: {len(candidates)} changed partitions re-validated, "
+                         f"{len(differing)} differ" + (f" ({result['message']})" if differing else ''))
+    result['differing'] = result['differing'] or [
+        {'partition': partition_of[key], 'source': _checksums(current['source'].get(key)),
+         'target': _checksums(current['target'].get(key))} for key in differing[:max_samples]]
+
+    new_state = {'failed': [partition_of[key] for key in differing]}
+    for name in sides:
+        partitions = dict(current[name]) if full else dict(stored[name])
+        if not full:
+            for key in candidates:
+                if key in current[name]:
+                    partitions[key] = current[name][key]
+                else:
+                    partitions.pop(key, None)
+        updates = [entry['updated'] for entry in partitions.values() if entry.get('updated') is not None]
+        new_state[name] = {'watermark': max(updates) if updates else None, 'partitions': partitions}
+    return result, new_state
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-validate only the ledger/month partitions that changed")
+    parser.add_argument('spec', help="reconciliation spec JSON with an \"updated\" column per side")
+    parser.add_argument('--state', help="watermark state file (default: <spec>.state.json)")
+    parser.add_argument('--full', action='store_true', help="recompute every partition's watermark")
+    parser.add_argument('--source', help="source database, overriding the spec's connection")
+    parser.add_argument('--target', help="target database, overriding the spec's connection")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--overlap-minutes', type=float, default=OVERLAP_MINUTES,
+                        help="re-read rows updated this long before the watermark")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="partitions/rows to report per level")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    state_path = args.state or os.path.splitext(args.spec)[0] + '.state.json'
+    state = load_state(state_path)
+    params = {name: value for name, value in (('start_date', args.start_date), ('end_date', args.end_date)) if value}
+    source_conn = connect(args.source or spec['source']['connection'])
+    target_conn = connect(args.target or spec['target']['connection'])
+    try:
+        result, state = run_incremental(source_conn, target_conn, spec, params, state, args.full,
+                                        args.overlap_minutes, args.max_samples)
+    finally:
+        source_conn.close()
+        target_conn.close()
+    save_state(state_path, state)
+    print_report(result)
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
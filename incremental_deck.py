@@ -0,0 +1,396 @@
+"""
+Incremental deck regeneration: re-render only the slides whose input changed.
+
+Changing one test case's status used to mean rendering every slide of its
+results deck again. With --incremental, a manifest is kept next to the deck
+(<deck>.pptx.manifest.json) holding a content hash per slide: the slide's
+spec, with evidence images hashed by content rather than path. On the next
+run:
+
+  1. slides whose hash is already in the old deck are reused, wherever
+     they moved to;
+  2. only the new or changed slides are rendered (DeckRenderer), into a
+     scratch package;
+  3. the deck is spliced together at the zip level. Reused slides, their
+     media and every template part are copied as raw compressed entries
+     from the old package, without being parsed or recompressed. Only the
+     slide list (presentation.xml and its rels), [Content_Types].xml and
+     the new slides are written fresh. New media that the old package
+     already holds (same SHA-1) is shared rather than added again.
+
+So a run costs one render per changed slide plus a byte copy of the rest.
+Anything that makes the old deck untrustworthy falls back to a full
+render: no manifest, a deck modified since (size or mtime), a different
+renderer (colours, slide size, --consolidated) or different template parts.
+
+    python deck_renderer.py results.json -o decks/ --incremental
+    python batch_decks.py exports/ -o decks/ --incremental
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+
+from checklist import write_atomic
+from evidence_images import file_digest
+from pptx_stream import STORED_EXTENSIONS
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+COPY_CHUNK = 1 << 20
+
+CONTENT_TYPES = '[Content_Types].xml'
+PRESENTATION = 'ppt/presentation.xml'
+PRESENTATION_RELS = 'ppt/_rels/presentation.xml.rels'
+SLIDE = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+SLIDE_RELS = re.compile(r'^ppt/slides/_rels/slide(\d+)\.xml\.rels$')
+MEDIA = re.compile(r'^ppt/media/[A-Za-z]+(\d+)\.(\w+)$')
+
+NS_PKG_RELS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+NS_TYPES = 'http://schemas.openxmlformats.org/package/2006/content-types'
+NS_P = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+RT_SLIDE = NS_R + '/slide'
+CT_SLIDE = 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'
+FIRST_SLIDE_ID = 256
+
+def manifest_path(output_path):
+    return output_path + MANIFEST_SUFFIX
+
+def slide_hash(spec):
+    """Content hash of one slide spec; evidence images count by their bytes, not their path"""
+    if spec.get('image'):
+        spec = dict(spec, image=file_digest(spec['image'])[0])
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def renderer_key(renderer):
+    """Hash of the renderer settings every slide depends on"""
+    colors = sorted((name, str(value)) for name, value in renderer.colors.items())
+    fonts = sorted(renderer.fonts.items())
+    settings = [colors, fonts, int(renderer.slide_width), int(renderer.slide_height), renderer.consolidated]
+    return hashlib.sha256(json.dumps(settings).encode('utf-8')).hexdigest()
+
+def _is_structural(name):
+    return name in (CONTENT_TYPES, PRESENTATION, PRESENTATION_RELS) or name.startswith('docProps/')
+
+def base_key(zf):
+    """Hash of the template parts (layouts, master, theme, ...) from their CRCs"""
+    parts = sorted((info.filename, info.CRC) for info in zf.infolist()
+                   if not (_is_structural(info.filename) or SLIDE.match(info.filename)
+                           or SLIDE_RELS.match(info.filename) or MEDIA.match(info.filename)))
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+def _slide_rels_name(number):
+    return f"ppt/slides/_rels/slide{number}.xml.rels"
+
+def slide_media(zf, number):
+    """Media members referenced by slide `number` of the package"""
+    from lxml import etree
+
+    name = _slide_rels_name(number)
+    if name not in zf.NameToInfo:
+        return []
+    root = etree.fromstring(zf.read(name))
+    media = []
+    for rel in root.iter(f"{{{NS_PKG_RELS}}}Relationship"):
+        if rel.get('TargetMode') != 'External':
+            target = posixpath.normpath(posixpath.join('ppt/slides', rel.get('Target')))
+            if MEDIA.match(target):
+                media.append(target)
+    return media
+
+def build_manifest(output_path, hashes, key):
+    """Manifest describing the deck at `output_path`, whose slides have the content `hashes`"""
+    with zipfile.ZipFile(output_path) as zf:
+        media = {}
+        for info in zf.infolist():
+            if MEDIA.match(info.filename):
+                with zf.open(info) as f:
+                    digest = hashlib.sha1()
+                    for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+                        digest.update(chunk)
+                media[info.filename] = digest.hexdigest()
+        slides = [{'hash': h, 'media': slide_media(zf, number)} for number, h in enumerate(hashes, 1)]
+        base = base_key(zf)
+    stat = os.stat(output_path)
+    return {'version': MANIFEST_VERSION, 'renderer': key, 'base': base,
+            'package': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+            'slides': slides, 'media': media}
+
+def load_manifest(output_path, key):
+    """The manifest of the deck at `output_path`, or None if the deck cannot be reused"""
+    path = manifest_path(output_path)
+    if not (os.path.exists(path) and os.path.exists(output_path)):
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    stat = os.stat(output_path)
+    if (manifest.get('version') != MANIFEST_VERSION or manifest.get('renderer') != key
+            or manifest.get('package') != {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}):
+        return None
+    return manifest
+
+def save_manifest(output_path, manifest):
+    data = json.dumps(manifest, indent=1).encode('utf-8')
+    write_atomic(manifest_path(output_path), lambda f: f.write(data))
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+class RawZipWriter:
+    """Zip writer that can copy another archive's entries without decompressing them"""
+
+    def __init__(self, f):
+        self.f = f
+        self.entries = []
+
+    def _header(self, name, method, date_time, crc, compressed, size):
+        encoded = name.encode('utf-8')
+        flags = 0x800 if not encoded.isascii() else 0
+        if compressed >= 0xFFFFFFFF or size >= 0xFFFFFFFF:
+            raise ValueError(f"{name}: zip64 entries are not supported")
+        offset = self.f.tell()
+        dos_time, dos_date = _dos_time(date_time)
+        self.f.write(struct.pack('<IHHHHHIIIHH', 0x04034B50, 20, flags, method, dos_time, dos_date,
+                                 crc, compressed, size, len(encoded), 0) + encoded)
+        self.entries.append((encoded, flags, method, dos_time, dos_date, crc, compressed, size, offset))
+
+    def copy(self, source, info, name=None):
+        """Copy entry `info` of the open archive file `source` as-is, optionally renamed"""
+        source.seek(info.header_offset)
+        fields = struct.unpack('<IHHHHHIIIHH', source.read(30))
+        if fields[0] != 0x04034B50:
+            raise zipfile.BadZipFile(f"bad local header for {info.filename}")
+        source.seek(fields[9] + fields[10], os.SEEK_CUR)
+        self._header(name or info.filename, info.compress_type, info.date_time, info.CRC,
+                     info.compress_size, info.file_size)
+        remaining = info.compress_size
+        while remaining:
+            chunk = source.read(min(COPY_CHUNK, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"{info.filename} is truncated")
+            self.f.write(chunk)
+            remaining -= len(chunk)
+
+    def write(self, name, data, compress=True):
+        crc = zlib.crc32(data)
+        if compress:
+            deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+            stored = deflate.compress(data) + deflate.flush()
+        else:
+            stored = data
+        self._header(name, zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED,
+                     time.localtime()[:6], crc, len(stored), len(data))
+        self.f.write(stored)
+
+    def close(self):
+        start = self.f.tell()
+        for encoded, flags, method, dos_time, dos_date, crc, compressed, size, offset in self.entries:
+            self.f.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014B50, 20, 20, flags, method, dos_time, dos_date,
+                                     crc, compressed, size, len(encoded), 0, 0, 0, 0, 0, offset) + encoded)
+        end = self.f.tell()
+        if len(self.entries) > 0xFFFF or end > 0xFFFFFFFF:
+            raise ValueError("package too large for a plain zip")
+        self.f.write(struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, len(self.entries), len(self.entries),
+                                 end - start, start, 0))
+
+def _serialize(root):
+    from lxml import etree
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def _content_types(old_xml, new_xml, slide_count):
+    """Old content types with the slide overrides redone and any new media extensions added"""
+    from lxml import etree
+
+    root = etree.fromstring(old_xml)
+    defaults = {el.get('Extension').lower() for el in root.iter(f"{{{NS_TYPES}}}Default")}
+    if new_xml is not None:
+        for el in etree.fromstring(new_xml).iter(f"{{{NS_TYPES}}}Default"):
+            if el.get('Extension').lower() not in defaults:
+                root.insert(0, el)
+    for el in list(root.iter(f"{{{NS_TYPES}}}Override")):
+        if SLIDE.match(el.get('PartName').lstrip('/')):
+            root.remove(el)
+    for number in range(1, slide_count + 1):
+        etree.SubElement(root, f"{{{NS_TYPES}}}Override", PartName=f"/ppt/slides/slide{number}.xml",
+                         ContentType=CT_SLIDE)
+    return _serialize(root)
+
+def _slide_list(presentation_xml, rels_xml, slide_count):
+    """presentation.xml and its rels pointing at slide1..slide<count>, in order"""
+    from lxml import etree
+
+    rels = etree.fromstring(rels_xml)
+    for rel in list(rels):
+        if rel.get('Type') == RT_SLIDE:
+            rels.remove(rel)
+    used = [int(rel.get('Id')[3:]) for rel in rels if re.match(r'^rId\d+$', rel.get('Id') or '')]
+    first = max(used, default=0) + 1
+    for number in range(1, slide_count + 1):
+        etree.SubElement(rels, f"{{{NS_PKG_RELS}}}Relationship", Id=f"rId{first + number - 1}",
+                         Type=RT_SLIDE, Target=f"slides/slide{number}.xml")
+
+    presentation = etree.fromstring(presentation_xml)
+    slide_ids = presentation.find(f"{{{NS_P}}}sldIdLst")
+    if slide_ids is None:
+        slide_ids = etree.Element(f"{{{NS_P}}}sldIdLst")
+        masters = presentation.find(f"{{{NS_P}}}sldMasterIdLst")
+        presentation.insert(presentation.index(masters) + 1 if masters is not None else 0, slide_ids)
+    for el in list(slide_ids):
+        slide_ids.remove(el)
+    for number in range(1, slide_count + 1):
+        el = etree.SubElement(slide_ids, f"{{{NS_P}}}sldId", id=str(FIRST_SLIDE_ID + number - 1))
+        el.set(f"{{{NS_R}}}id", f"rId{first + number - 1}")
+    if slide_count == 0:
+        presentation.remove(slide_ids)
+    return _serialize(presentation), _serialize(rels)
+
+def _retarget_media(rels_xml, renames):
+    """Slide rels with media targets renamed (member name -> member name)"""
+    from lxml import etree
+
+    root = etree.fromstring(rels_xml)
+    for rel in root.iter(f"{{{NS_PKG_RELS}}}Relationship"):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = posixpath.normpath(posixpath.join('ppt/slides', rel.get('Target')))
+        if target in renames:
+            rel.set('Target', posixpath.relpath(renames[target], 'ppt/slides'))
+    return _serialize(root)
+
+def splice(old_path, manifest, plan, new_path, output_f):
+    """Write the spliced deck to `output_f`; returns (media names per slide, {media name: sha1})
+
+    `plan` lists, per final slide, ('old', index in the old deck) or ('new',
+    index in the package at `new_path`, which holds only the re-rendered
+    slides). Old members are copied raw; see RawZipWriter.
+    """
+    old_media_by_sha = {}
+    for name, sha in manifest['media'].items():
+        old_media_by_sha.setdefault(sha, name)
+    next_number = max((int(MEDIA.match(name).group(1)) for name in manifest['media']), default=0) + 1
+    with open(old_path, 'rb') as old_f, zipfile.ZipFile(old_f) as old_zf, \
+            (zipfile.ZipFile(new_path) if new_path else contextlib.nullcontext()) as new_zf:
+        # Media of the re-rendered slides is shared with the old package when the bytes match
+        renames = {}            # member in the new package -> member in the spliced one
+        added = {}              # member in the spliced one -> (member in the new package, sha1)
+        media_of = []
+        for source, index in plan:
+            if source == 'old':
+                media_of.append(list(manifest['slides'][index]['media']))
+                continue
+            for name in slide_media(new_zf, index + 1):
+                if name not in renames:
+                    sha = hashlib.sha1(new_zf.read(name)).hexdigest()
+                    target = old_media_by_sha.get(sha) or next(
+                        (member for member, (_, other) in added.items() if other == sha), None)
+                    if target is None:
+                        target = f"ppt/media/image{next_number}.{MEDIA.match(name).group(2)}"
+                        next_number += 1
+                        added[target] = (name, sha)
+                    renames[name] = target
+            media_of.append([renames[name] for name in slide_media(new_zf, index + 1)])
+        keep = {name for names in media_of for name in names}
+
+        count = len(plan)
+        content_types = _content_types(old_zf.read(CONTENT_TYPES),
+                                       new_zf.read(CONTENT_TYPES) if new_zf else None, count)
+        presentation, presentation_rels = _slide_list(old_zf.read(PRESENTATION), old_zf.read(PRESENTATION_RELS),
+                                                      count)
+        writer = RawZipWriter(output_f)
+        writer.write(CONTENT_TYPES, content_types)
+        slides_written = False
+        for info in old_zf.infolist():
+            name = info.filename
+            if name == CONTENT_TYPES:
+                continue
+            if name == PRESENTATION:
+                writer.write(name, presentation)
+            elif name == PRESENTATION_RELS:
+                writer.write(name, presentation_rels)
+            elif SLIDE.match(name) or SLIDE_RELS.match(name):
+                if not slides_written:
+                    _write_slides(writer, plan, old_f, old_zf, new_zf, renames)
+                    slides_written = True
+            elif not MEDIA.match(name) or name in keep:
+                writer.copy(old_f, info)
+        if not slides_written:
+            _write_slides(writer, plan, old_f, old_zf, new_zf, renames)
+        for target, (name, _) in added.items():
+            # Images are already compressed; like pptx_stream, store them as they are
+            writer.write(target, new_zf.read(name), compress=MEDIA.match(target).group(2).lower()
+                         not in STORED_EXTENSIONS)
+        writer.close()
+    media = {name: sha for name, sha in manifest['media'].items() if name in keep}
+    media.update({target: sha for target, (_, sha) in added.items()})
+    return media_of, media
+
+def _write_slides(writer, plan, old_f, old_zf, new_zf, renames):
+    for number, (source, index) in enumerate(plan, 1):
+        if source == 'old':
+            writer.copy(old_f, old_zf.getinfo(f"ppt/slides/slide{index + 1}.xml"), f"ppt/slides/slide{number}.xml")
+            rels = _slide_rels_name(index + 1)
+            if rels in old_zf.NameToInfo:
+                writer.copy(old_f, old_zf.getinfo(rels), _slide_rels_name(number))
+        else:
+            writer.write(f"ppt/slides/slide{number}.xml", new_zf.read(f"ppt/slides/slide{index + 1}.xml"))
+            rels = _slide_rels_name(index + 1)
+            if rels in new_zf.NameToInfo:
+                writer.write(_slide_rels_name(number), _retarget_media(new_zf.read(rels), renames))
+
+def render_incremental(renderer, spec, output_path):
+    """Render `spec` to `output_path`, re-rendering only slides that changed since the last run
+
+    Returns {'mode': 'full' | 'incremental' | 'unchanged', 'slides', 'rendered', 'reused'}.
+    """
+    key = renderer_key(renderer)
+    hashes = [slide_hash(slide) for slide in spec]
+    manifest = load_manifest(output_path, key)
+    if manifest is not None:
+        available = {}
+        for index, slide in enumerate(manifest['slides']):
+            available.setdefault(slide['hash'], []).append(index)
+        plan = []
+        changed = []
+        for slide, h in zip(spec, hashes):
+            if available.get(h):
+                plan.append(('old', available[h].pop(0)))
+            else:
+                plan.append(('new', len(changed)))
+                changed.append(slide)
+        stats = {'slides': len(spec), 'rendered': len(changed), 'reused': len(spec) - len(changed)}
+        if plan == [('old', i) for i in range(len(manifest['slides']))]:
+            return dict(stats, mode='unchanged')
+        with tempfile.TemporaryDirectory(prefix='deck-') as directory:
+            new_path = None
+            if changed:
+                new_path = os.path.join(directory, 'changed.pptx')
+                renderer.render(changed, new_path)
+                with zipfile.ZipFile(new_path) as zf:
+                    if base_key(zf) != manifest['base']:
+                        manifest = None
+            if manifest is not None:
+                result = []
+                write_atomic(output_path, lambda f: result.extend(splice(output_path, manifest, plan, new_path, f)))
+                media_of, media = result
+                stat = os.stat(output_path)
+                save_manifest(output_path, {
+                    'version': MANIFEST_VERSION, 'renderer': key, 'base': manifest['base'],
+                    'package': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+                    'slides': [{'hash': h, 'media': names} for h, names in zip(hashes, media_of)],
+                    'media': media
+                })
+                return dict(stats, mode='incremental')
+
+    count = renderer.render(spec, output_path)
+    save_manifest(output_path, build_manifest(output_path, hashes, key))
+    return {'mode': 'full', 'slides': count, 'rendered': count, 'reused': 0}
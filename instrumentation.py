@@ -0,0 +1,275 @@
+"""
+Timing spans and counters for checklist runs.
+
+When a run is slow, the spans show which test case, query and system the
+time went to. validation_engine.py, checklist_runner.py and pdf_report.py record
+them when --trace or --metrics is given:
+
+  connect   opening a database connection
+  execute   cursor.execute() of a query
+  fetch     time spent in fetchmany(), with the rows and bytes fetched
+  cache     a result cache lookup (result_cache.py): hits, misses, rows served
+  query     one side of a test case end to end: execute, fetch or cache, and
+            hash-partitioning the rows to disk
+  compare   diffing the partitioned source and target rows
+  render    one test case's section of the PDF report, with its pages
+
+Each span carries the labels in effect on its thread when it starts: the
+test case id, the side (source or target) and, where the caller knows it,
+the system that side runs against. --trace writes every span as a JSON line:
+
+    {"span": "fetch", "test_case": "TC-007", "side": "source", "system": "ebs",
+     "start": 1.203112, "seconds": 0.841, "rows": 120000, "bytes": 9840000,
+     "thread": "checklist-runner-2"}
+
+and --metrics writes the totals per test case, span and system as an
+OpenMetrics text file for Prometheus:
+
+    validation_span_seconds_total{test_case="TC-007",span="fetch",side="source",system="ebs"} 0.841
+
+run_test_case() also puts a test case's totals in its result as "metrics",
+which --update writes into the checklist export for the HTML checklist.
+
+Bytes fetched are estimated from the first row of each fetchmany() batch
+times the batch size, since sizing every value would cost more than all the
+other instrumentation together. While nothing is recording, span() returns
+a shared no-op object.
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+from checklist import write_atomic
+
+# Labels that become OpenMetrics labels; any other span attribute only goes to the trace
+METRIC_LABELS = ('test_case', 'span', 'side', 'system')
+COUNTER_UNITS = {'bytes': 'bytes'}
+
+_recorder = None
+_local = threading.local()
+
+class Span:
+    """A timed operation; counts given to add() are recorded with it when it is closed"""
+
+    enabled = True
+
+    def __init__(self, recorder, name, labels):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+        self.counts = {}
+        self.seconds = 0.0
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self.start
+        self.close()
+
+    def add(self, seconds=0.0, **counts):
+        """Add to the span's time (for spans timed piecewise rather than with `with`) and counts"""
+        self.seconds += seconds
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def close(self):
+        self.recorder.record(self)
+
+class _NullSpan:
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def add(self, seconds=0.0, **counts):
+        pass
+
+    def close(self):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Recorder:
+    """Closed spans of one run, indexed by test case"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._by_test_case = {}
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        entry = {'span': span.name}
+        entry.update(span.labels)
+        entry['start'] = round(span.start - self.origin, 6)
+        entry['seconds'] = round(span.seconds, 6)
+        entry.update(span.counts)
+        entry['thread'] = threading.current_thread().name
+        with self._lock:
+            self.spans.append(entry)
+            if 'test_case' in entry:
+                self._by_test_case.setdefault(entry['test_case'], []).append(entry)
+
+    def test_case_metrics(self, test_case):
+        """Totals of one test case's spans, in the shape stored on checklist test cases"""
+        with self._lock:
+            spans = list(self._by_test_case.get(test_case, ()))
+        seconds = {}
+        metrics = {'rowsFetched': 0, 'bytesFetched': 0, 'rowsFromCache': 0, 'cacheHits': 0, 'cacheMisses': 0}
+        for entry in spans:
+            seconds[entry['span']] = seconds.get(entry['span'], 0.0) + entry['seconds']
+            if entry['span'] == 'fetch':
+                metrics['rowsFetched'] += entry.get('rows', 0)
+                metrics['bytesFetched'] += entry.get('bytes', 0)
+            elif entry['span'] == 'cache':
+                metrics['rowsFromCache'] += entry.get('rows', 0)
+                metrics['cacheHits'] += entry.get('hits', 0)
+                metrics['cacheMisses'] += entry.get('misses', 0)
+        metrics['spans'] = {name: round(value, 4) for name, value in seconds.items()}
+        return metrics
+
+    def totals(self):
+        """{label tuple: {'seconds', 'count', counters...}} summed over METRIC_LABELS"""
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for entry in spans:
+            key = tuple((name, str(entry[name])) for name in METRIC_LABELS if entry.get(name) is not None)
+            total = totals.setdefault(key, {'seconds': 0.0, 'count': 0})
+            total['seconds'] += entry['seconds']
+            total['count'] += 1
+            for name, value in entry.items():
+                if name not in METRIC_LABELS and name not in ('start', 'seconds', 'thread') \
+                        and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total[name] = total.get(name, 0) + value
+        return totals
+
+    def write_trace(self, path):
+        """Every span as one JSON object per line"""
+        with self._lock:
+            spans = list(self.spans)
+
+        def write(f):
+            for entry in spans:
+                f.write(json.dumps(entry, default=str).encode('utf-8') + b'\n')
+        write_atomic(path, write)
+
+    def write_metrics(self, path):
+        """Span totals as an OpenMetrics text exposition"""
+        totals = self.totals()
+        counters = sorted({name for total in totals.values() for name in total} - {'seconds', 'count'})
+        families = [('validation_span_seconds', 'seconds', 'Time spent in instrumented spans.', 'seconds'),
+                    ('validation_spans', None, 'Instrumented spans closed.', 'count')]
+        families += [(f"validation_span_{name}", COUNTER_UNITS.get(name), f"{name.capitalize()} counted by spans.",
+                      name) for name in counters]
+        lines = []
+        for family, unit, help_text, field in families:
+            lines.append(f"# TYPE {family} counter")
+            if unit:
+                lines.append(f"# UNIT {family} {unit}")
+            lines.append(f"# HELP {family} {help_text}")
+            for key, total in sorted(totals.items()):
+                if field in total:
+                    labels = ','.join(f'{name}="{_escape(value)}"' for name, value in key)
+                    lines.append(f"{family}_total{{{labels}}} {_sample(total[field])}")
+        lines.append('# EOF')
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        write_atomic(path, lambda f: f.write(data))
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _sample(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+def span(name, **labels):
+    """A Span labelled with the labels in effect on this thread, or NULL_SPAN while not recording"""
+    recorder = _recorder
+    if recorder is None:
+        return NULL_SPAN
+    current = getattr(_local, 'labels', None)
+    if current:
+        labels = dict(current, **labels)
+    sides = getattr(_local, 'sides', None)
+    if sides and 'system' not in labels and labels.get('side') in sides:
+        labels['system'] = sides[labels['side']]
+    return Span(recorder, name, labels)
+
+@contextlib.contextmanager
+def _labelled(values, sides):
+    previous = getattr(_local, 'labels', None), getattr(_local, 'sides', None)
+    _local.labels = dict(previous[0] or {}, **values)
+    if sides:
+        _local.sides = dict(previous[1] or {}, **sides)
+    try:
+        yield
+    finally:
+        _local.labels, _local.sides = previous
+
+def labels(sides=None, **values):
+    """Labels for the spans started on this thread inside the block
+
+    `sides` maps 'source' / 'target' to system names, giving spans labelled
+    with a side their system too. Labels that are None are left out.
+    """
+    if _recorder is None:
+        return contextlib.nullcontext()
+    return _labelled({name: value for name, value in values.items() if value is not None}, sides)
+
+def test_case_metrics(test_case):
+    """Totals of a test case's spans so far, or None while not recording"""
+    recorder = _recorder
+    if recorder is None or not test_case:
+        return None
+    return recorder.test_case_metrics(test_case)
+
+def start_recording():
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+def stop_recording():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+def row_bytes(row):
+    """Rough size of a fetched row: text and binary by length, anything else as 8 bytes"""
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            size += len(value)
+        elif value is not None:
+            size += 8
+    return size
+
+def add_instrumentation_arguments(parser):
+    """The --trace/--metrics options shared by validation_engine.py, checklist_runner.py and pdf_report.py"""
+    parser.add_argument('--trace', metavar='PATH', help="write every timing span as a JSON line to PATH")
+    parser.add_argument('--metrics', metavar='PATH', help="write span totals per test case as OpenMetrics text")
+
+def open_recorder(args):
+    """Start recording if add_instrumentation_arguments() options ask for it; returns the Recorder or None"""
+    if not (args.trace or args.metrics):
+        return None
+    return start_recording()
+
+def close_recorder(recorder, args):
+    """Stop recording and write the files asked for"""
+    if recorder is None:
+        return
+    stop_recording()
+    if args.trace:
+        recorder.write_trace(args.trace)
+        print(f"✓ {len(recorder.spans)} spans written to {args.trace}")
+    if args.metrics:
+        recorder.write_metrics(args.metrics)
+        print(f"✓ Metrics written to {args.metrics}")
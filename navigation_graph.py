@@ -0,0 +1,326 @@
+"""
+Navigation graph checks for the "Report Navigation" technical validation.
+
+"Confirm no circular or dead-end navigation loops" used to be a manual
+click-through. This module loads the navigation edges exported from the
+OAC / Power BI report metadata and checks the whole estate at once:
+
+  * cycles      - strongly connected pages (Tarjan), ignoring edges whose
+                  kind is expected to loop back, e.g. 'back' to the parent
+  * unreachable - pages no entry page leads to
+  * dead ends   - pages with no way out that are not marked terminal
+  * breadcrumbs - every breadcrumb starts at an entry page, names known
+                  pages, ends at its own page and follows real edges
+
+Pages are numbered as they are read and the edges are kept in a compressed
+sparse row layout (an offsets array and a sorted targets array), so every
+check is linear in pages + edges and the estate is held in a few arrays.
+
+Input is JSON:
+
+    {"pages": [{"id": "summary", "title": "Top 10 Suppliers", "entry": true},
+               {"id": "detail", "breadcrumb": ["summary", "detail"], "terminal": true}],
+     "edges": [{"source": "summary", "target": "detail", "kind": "drill"},
+               {"source": "detail", "target": "summary", "kind": "back"}]}
+
+or a bare list of those edges, or a CSV of source,target[,kind], with entry
+pages given by --entry. The findings become Technical-phase checklist test
+cases (NAV-001..NAV-004), written to --output or merged into a checklist
+export with --checklist:
+
+    python navigation_graph.py navigation.json --checklist Validation_Checklist.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+from array import array
+from bisect import bisect_left
+
+from checklist import load_checklist, save_checklist
+
+BACK_KINDS = ('back',)
+MAX_SAMPLES = 20
+
+class NavigationGraph:
+    """Pages numbered 0..n-1 with edges in CSR form once freeze() has run"""
+
+    def __init__(self):
+        self.index = {}
+        self.pages = []
+        self.titles = {}
+        self.entries = set()
+        self.terminal = set()
+        self.breadcrumbs = {}
+        self._sources = array('l')
+        self._targets = array('l')
+        self._back = array('b')
+        self.offsets = None
+        self.targets = None
+        self.back = None
+
+    def page(self, page_id):
+        """Number of a page, registering it on first sight"""
+        page_id = str(page_id)
+        number = self.index.get(page_id)
+        if number is None:
+            number = self.index[page_id] = len(self.pages)
+            self.pages.append(page_id)
+        return number
+
+    def add_edge(self, source, target, kind='navigate', back_kinds=BACK_KINDS):
+        self._sources.append(self.page(source))
+        self._targets.append(self.page(target))
+        self._back.append(1 if kind in back_kinds else 0)
+
+    def freeze(self):
+        """Build the CSR arrays (counting sort on source, targets sorted per page)"""
+        n = len(self.pages)
+        offsets = array('l', [0]) * (n + 1)
+        for source in self._sources:
+            offsets[source + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        fill = array('l', offsets[:n])
+        order = array('l', [0]) * len(self._sources)
+        for edge, source in enumerate(self._sources):
+            order[fill[source]] = edge
+            fill[source] += 1
+        targets = array('l')
+        back = array('b')
+        for page in range(n):
+            row = sorted(order[offsets[page]:offsets[page + 1]], key=self._targets.__getitem__)
+            targets.extend(self._targets[e] for e in row)
+            back.extend(self._back[e] for e in row)
+        self.offsets, self.targets, self.back = offsets, targets, back
+        self._sources = self._targets = self._back = None
+        return self
+
+    def out_degree(self, page):
+        return self.offsets[page + 1] - self.offsets[page]
+
+    def has_edge(self, source, target):
+        start, end = self.offsets[source], self.offsets[source + 1]
+        i = bisect_left(self.targets, target, start, end)
+        return i < end and self.targets[i] == target
+
+    def label(self, page):
+        page_id = self.pages[page]
+        title = self.titles.get(page_id)
+        return f"{page_id} ({title})" if title else page_id
+
+def load_json(path, back_kinds=BACK_KINDS):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'edges': data}
+    graph = NavigationGraph()
+    for page in data.get('pages', []):
+        number = graph.page(page['id'])
+        page_id = graph.pages[number]
+        if page.get('title'):
+            graph.titles[page_id] = page['title']
+        if page.get('entry'):
+            graph.entries.add(number)
+        if page.get('terminal'):
+            graph.terminal.add(number)
+        if page.get('breadcrumb'):
+            graph.breadcrumbs[number] = [str(p) for p in page['breadcrumb']]
+    for edge in data.get('edges', []):
+        graph.add_edge(edge['source'], edge['target'], edge.get('kind', 'navigate'), back_kinds)
+    return graph
+
+def load_csv(path, back_kinds=BACK_KINDS):
+    graph = NavigationGraph()
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            graph.add_edge(row['source'], row['target'], row.get('kind') or 'navigate', back_kinds)
+    return graph
+
+def load_graph(path, entries=(), back_kinds=BACK_KINDS):
+    """A frozen NavigationGraph from a JSON or CSV export; `entries` adds entry pages"""
+    graph = load_csv(path, back_kinds) if path.lower().endswith('.csv') else load_json(path, back_kinds)
+    for page_id in entries:
+        graph.entries.add(graph.page(page_id))
+    return graph.freeze()
+
+def strongly_connected(graph):
+    """Tarjan's SCCs over the non-back edges, iteratively; returns the components that loop"""
+    n = len(graph.pages)
+    offsets, targets, back = graph.offsets, graph.targets, graph.back
+    index = array('l', [-1]) * n
+    low = array('l', [0]) * n
+    on_stack = bytearray(n)
+    stack = []
+    cycles = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            page, edge = work[-1]
+            end = offsets[page + 1]
+            while edge < end and back[edge]:
+                edge += 1
+            if edge < end:
+                work[-1] = (page, edge + 1)
+                target = targets[edge]
+                if index[target] == -1:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    work.append((target, offsets[target]))
+                elif on_stack[target] and index[target] < low[page]:
+                    low[page] = index[target]
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[page] < low[parent]:
+                    low[parent] = low[page]
+            if low[page] == index[page]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    component.append(member)
+                    if member == page:
+                        break
+                looping = len(component) > 1 or any(
+                    targets[e] == page and not back[e] for e in range(offsets[page], offsets[page + 1]))
+                if looping:
+                    cycles.append(sorted(component))
+    return cycles
+
+def reachable(graph):
+    """bytearray marking the pages reachable from an entry page over any edge"""
+    seen = bytearray(len(graph.pages))
+    queue = list(graph.entries)
+    for page in queue:
+        seen[page] = 1
+    while queue:
+        page = queue.pop()
+        for edge in range(graph.offsets[page], graph.offsets[page + 1]):
+            target = graph.targets[edge]
+            if not seen[target]:
+                seen[target] = 1
+                queue.append(target)
+    return seen
+
+def dead_ends(graph):
+    return [page for page in range(len(graph.pages))
+            if graph.out_degree(page) == 0 and page not in graph.terminal]
+
+def breadcrumb_issues(graph):
+    """(page, problem) for breadcrumbs that do not describe a real path from an entry page"""
+    issues = []
+    for page, trail in graph.breadcrumbs.items():
+        unknown = [p for p in trail if p not in graph.index]
+        if unknown:
+            issues.append((page, f"unknown page(s) {', '.join(unknown)}"))
+            continue
+        steps = [graph.index[p] for p in trail]
+        if steps[-1] != page:
+            issues.append((page, f"ends at {trail[-1]}, not the page itself"))
+        elif steps[0] not in graph.entries:
+            issues.append((page, f"starts at {trail[0]}, which is not an entry page"))
+        else:
+            for a, b in zip(steps, steps[1:]):
+                if not graph.has_edge(a, b):
+                    issues.append((page, f"no navigation from {graph.pages[a]} to {graph.pages[b]}"))
+                    break
+    return issues
+
+def analyse(graph):
+    """Run every check; returns {check: [finding text, ...]}"""
+    seen = reachable(graph)
+    return {
+        'cycles': [' -> '.join(graph.label(p) for p in component) for component in strongly_connected(graph)],
+        'unreachable': [graph.label(p) for p in range(len(graph.pages)) if not seen[p]] if graph.entries else [],
+        'dead_ends': [graph.label(p) for p in dead_ends(graph)],
+        'breadcrumbs': [f"{graph.label(p)}: {problem}" for p, problem in breadcrumb_issues(graph)],
+    }
+
+CHECKS = [
+    ('cycles', 'Confirm no circular navigation loops',
+     'No group of pages should navigate in a circle other than through back links.'),
+    ('unreachable', 'Confirm every page is reachable from an entry page',
+     'Every report page should be reachable by navigation from an entry page.'),
+    ('dead_ends', 'Confirm no dead-end navigation pages',
+     'Every non-terminal page should offer navigation onwards or back.'),
+    ('breadcrumbs', 'Validate breadcrumb consistency',
+     'Each breadcrumb should start at an entry page and follow real navigation to its own page.'),
+]
+
+def navigation_test_cases(graph, findings, prefix='NAV', max_samples=MAX_SAMPLES):
+    """Technical-phase checklist test cases carrying the findings and a passed/failed status"""
+    test_cases = []
+    summary = f"{len(graph.pages):,} pages, {len(graph.targets):,} navigation edges, {len(graph.entries)} entry pages."
+    for number, (check, title, expected) in enumerate(CHECKS, 1):
+        found = findings[check]
+        if found:
+            shown = '; '.join(found[:max_samples])
+            more = f" (and {len(found) - max_samples} more)" if len(found) > max_samples else ''
+            description = f"{summary} {len(found)} finding(s): {shown}{more}"
+        elif check == 'unreachable' and not graph.entries:
+            description = f"{summary} No entry pages were given, so reachability was not checked."
+        else:
+            description = f"{summary} No findings."
+        test_cases.append({
+            'id': f"{prefix}-{number:03d}", 'title': title, 'phase': 'technical',
+            'description': description, 'sourceQuery': '', 'targetQueryPowerBI': '', 'targetQueryOAC': '',
+            'expectedResult': expected, 'status': 'failed' if found else 'passed', 'evidence': []
+        })
+    return test_cases
+
+def merge_test_cases(checklist, test_cases):
+    """Replace test cases with the same id in `checklist`, append the rest; keeps existing evidence"""
+    existing = {tc.get('id'): tc for tc in checklist['testCases']}
+    for test_case in test_cases:
+        if test_case['id'] in existing:
+            test_case['evidence'] = existing[test_case['id']].get('evidence', [])
+            existing[test_case['id']].update(test_case)
+        else:
+            checklist['testCases'].append(test_case)
+    return checklist
+
+def main():
+    parser = argparse.ArgumentParser(description="Check report navigation for loops, dead ends and broken breadcrumbs")
+    parser.add_argument('graph', help="navigation export (JSON pages/edges, or CSV source,target[,kind])")
+    parser.add_argument('--entry', action='append', default=[], help="entry page id (repeatable)")
+    parser.add_argument('--back-kind', action='append', metavar='KIND',
+                        help=f"edge kinds allowed to loop (default: {', '.join(BACK_KINDS)})")
+    parser.add_argument('--checklist', help="checklist export to merge the test cases into")
+    parser.add_argument('--output', help="write the test cases to this JSON file")
+    parser.add_argument('--prefix', default='NAV', help="test case id prefix")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="findings listed per test case")
+    args = parser.parse_args()
+
+    graph = load_graph(args.graph, args.entry, tuple(args.back_kind or BACK_KINDS))
+    findings = analyse(graph)
+    test_cases = navigation_test_cases(graph, findings, args.prefix, args.max_samples)
+
+    print(f"{len(graph.pages):,} pages, {len(graph.targets):,} edges, {len(graph.entries)} entry pages")
+    for test_case, (check, _, _) in zip(test_cases, CHECKS):
+        icon = '✓' if test_case['status'] == 'passed' else '✗'
+        print(f"{icon} {test_case['id']} {test_case['title']}: {len(findings[check])} finding(s)")
+        for finding in findings[check][:args.max_samples]:
+            print(f"    {finding}")
+
+    if args.output:
+        save_checklist({'testCases': test_cases}, args.output)
+        print(f"✓ Wrote {len(test_cases)} test cases to {args.output}")
+    if args.checklist:
+        save_checklist(merge_test_cases(load_checklist(args.checklist), test_cases), args.checklist)
+        print(f"✓ Merged {len(test_cases)} test cases into {args.checklist}")
+    return 0 if all(tc['status'] == 'passed' for tc in test_cases) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
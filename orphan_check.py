@@ -0,0 +1,259 @@
+"""
+Orphaned fact record detection under a memory ceiling.
+
+"Ensure orphaned records are excluded unless explicitly expected" means an
+anti-join of a fact table's foreign key against its dimension, e.g.
+ap_invoices_fact.supplier_key against supplier_dim. On a 100M-row fact table
+that anti-join does not fit in memory, so instead:
+
+  1. The dimension keys are streamed into a membership filter. If their
+     64-bit hashes (see hll.hash_values) fit in the memory ceiling they are
+     kept as a sorted array, which is exact. Otherwise the dimension is read
+     again into a Bloom filter as large as the ceiling allows.
+  2. The fact keys are streamed through the filter in batches. Keys the
+     filter does not hold are candidate orphans, counted per key.
+  3. The candidates are confirmed exactly in a second pass over the
+     dimension, comparing normalised key values. Keys found there (e.g.
+     dimension rows loaded since step 1) are dropped from the orphans.
+
+A Bloom filter never misses a dimension key, so candidates really are
+absent from it. It can, however, claim a key is present when it is not; the
+chance per orphan key is reported as the false positive rate, and raising
+--memory-mb until the sorted array fits makes the check exact.
+
+NULL keys are counted separately, and keys listed with --expected (an
+"unknown" member such as -1) are reported without failing the check.
+
+    python orphan_check.py --fact sqlite:///dw.db \\
+        --fact-query "SELECT supplier_key FROM ap_invoices_fact" \\
+        --dimension-query "SELECT supplier_key FROM supplier_dim" \\
+        --memory-mb 256 --expected -1
+"""
+
+import argparse
+import itertools
+import math
+import sys
+
+import numpy as np
+
+from hll import hash_values
+from validation_engine import MAX_SAMPLES, bind_params, connect, normalize, query_rows
+
+MEMORY_MB = 256
+BATCH = 50000
+MAX_ORPHAN_KEYS = 100000
+MAX_HASHES = 16
+SORT_OVERHEAD = 3           # sorting a key array briefly needs about three copies of it
+
+class SortedKeys:
+    """Exact membership over a sorted array of key hashes"""
+
+    kind = 'sorted array'
+    false_positive_rate = 0.0
+
+    def __init__(self, hashes):
+        self.hashes = np.unique(hashes)
+        self.nbytes = self.hashes.nbytes
+
+    def contains(self, hashes):
+        positions = np.searchsorted(self.hashes, hashes)
+        positions[positions == len(self.hashes)] = 0
+        return self.hashes[positions] == hashes if len(self.hashes) else np.zeros(len(hashes), dtype=bool)
+
+class BloomFilter:
+    """Bloom filter over key hashes; k bit positions per key by double hashing"""
+
+    kind = 'Bloom filter'
+
+    def __init__(self, bits, hashes):
+        self.bits = max(64, bits - bits % 8)
+        self.hashes = hashes
+        self.array = np.zeros(self.bits // 8, dtype=np.uint8)
+        self.nbytes = self.array.nbytes
+        self.items = 0
+
+    @classmethod
+    def for_capacity(cls, items, memory_bytes):
+        """The largest filter within `memory_bytes`, with the best hash count for `items` keys"""
+        bits = memory_bytes * 8
+        hashes = min(MAX_HASHES, max(1, round(bits / max(items, 1) * math.log(2))))
+        return cls(bits, hashes)
+
+    @property
+    def false_positive_rate(self):
+        return (1 - math.exp(-self.hashes * self.items / self.bits)) ** self.hashes
+
+    def _positions(self, hashes):
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        for i in range(self.hashes):
+            yield (low + np.uint64(i) * high) % np.uint64(self.bits)
+
+    def add(self, hashes):
+        self.items += len(hashes)
+        for positions in self._positions(hashes):
+            np.bitwise_or.at(self.array, positions >> np.uint64(3),
+                             np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+
+    def contains(self, hashes):
+        found = np.ones(len(hashes), dtype=bool)
+        for positions in self._positions(hashes):
+            found &= (self.array[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        return found
+
+def key_batches(connection, sql, params, batch_size=BATCH):
+    """Lists of first-column values of the query, `batch_size` at a time"""
+    sql, values = bind_params(sql, params)
+    _, rows = query_rows(connection, sql, values, batch_size)
+    try:
+        while True:
+            batch = [row[0] for row in itertools.islice(rows, batch_size)]
+            if not batch:
+                return
+            yield batch
+    finally:
+        rows.close()
+
+def dimension_filter(dimension_batches, memory_bytes):
+    """Membership filter over the dimension keys: SortedKeys if it fits, else a BloomFilter
+
+    `dimension_batches()` returns a fresh iterator of key batches; it is
+    called a second time only when the Bloom filter is needed.
+    """
+    chunks = []
+    size = 0
+    count = 0
+    for batch in dimension_batches():
+        keys = [key for key in batch if key is not None]
+        count += len(keys)
+        if chunks is not None:
+            chunks.append(hash_values(keys))
+            size += 8 * len(keys)
+            if size * SORT_OVERHEAD > memory_bytes:
+                chunks = None
+    if chunks is not None:
+        return SortedKeys(np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint64)), count
+    bloom = BloomFilter.for_capacity(count, memory_bytes)
+    for batch in dimension_batches():
+        bloom.add(hash_values([key for key in batch if key is not None]))
+    return bloom, count
+
+def key_text(value):
+    return str(normalize(value))
+
+def find_orphans(fact_batches, membership, max_keys=MAX_ORPHAN_KEYS):
+    """Stream fact keys through `membership`; returns (candidates, totals)
+
+    candidates maps a key's normalised text to [key, rows] for at most
+    `max_keys` distinct keys; orphan rows past that are still counted.
+    """
+    candidates = {}
+    totals = {'fact_rows': 0, 'null_rows': 0, 'orphan_rows': 0, 'truncated': False}
+    for batch in fact_batches:
+        totals['fact_rows'] += len(batch)
+        keys = [key for key in batch if key is not None]
+        totals['null_rows'] += len(batch) - len(keys)
+        if not keys:
+            continue
+        missing = ~membership.contains(hash_values(keys))
+        for key in itertools.compress(keys, missing.tolist()):
+            totals['orphan_rows'] += 1
+            text = key_text(key)
+            entry = candidates.get(text)
+            if entry is not None:
+                entry[1] += 1
+            elif len(candidates) < max_keys:
+                candidates[text] = [key, 1]
+            else:
+                totals['truncated'] = True
+    return candidates, totals
+
+def confirm_orphans(candidates, dimension_batches):
+    """Drop candidates whose key is in the dimension after all; returns their (key, rows)"""
+    present = []
+    if not candidates:
+        return present
+    for batch in dimension_batches:
+        for key in batch:
+            if key is None:
+                continue
+            entry = candidates.pop(key_text(key), None)
+            if entry is not None:
+                present.append(tuple(entry))
+        if not candidates:
+            break
+    return present
+
+def check_orphans(fact_batches, dimension_batches, memory_bytes=MEMORY_MB << 20, expected=(),
+                  max_keys=MAX_ORPHAN_KEYS, confirm=True):
+    """Orphan check of the fact keys against the dimension keys
+
+    `fact_batches` and `dimension_batches` are callables returning fresh
+    iterators of key batches (see key_batches()). `expected` keys are
+    reported but do not fail the check.
+    """
+    membership, dimension_keys = dimension_filter(dimension_batches, memory_bytes)
+    candidates, totals = find_orphans(fact_batches(), membership, max_keys)
+    # Rows of keys past the distinct key cap are counted but not attributed to a key
+    unattributed = totals['orphan_rows'] - sum(entry[1] for entry in candidates.values())
+    late = confirm_orphans(candidates, dimension_batches()) if confirm else []
+    expected = {key_text(key) for key in expected}
+    orphans = sorted(((entry[0], entry[1]) for text, entry in candidates.items() if text not in expected),
+                     key=lambda item: (-item[1], key_text(item[0])))
+    allowed = [(entry[0], entry[1]) for text, entry in candidates.items() if text in expected]
+    orphan_rows = sum(rows for _, rows in orphans) + unattributed
+    return dict(
+        totals, dimension_keys=dimension_keys, filter=membership.kind, filter_bytes=membership.nbytes,
+        false_positive_rate=membership.false_positive_rate, orphan_rows=orphan_rows,
+        orphans=orphans, expected=allowed, confirmed_present=late,
+        status='failed' if orphan_rows else 'passed'
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Find fact rows whose key is missing from the dimension")
+    parser.add_argument('--fact', required=True, help="database holding the fact table")
+    parser.add_argument('--fact-query', required=True, help="query returning the fact foreign key column")
+    parser.add_argument('--dimension', help="database holding the dimension (default: --fact)")
+    parser.add_argument('--dimension-query', required=True, help="query returning the dimension key column")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--memory-mb', type=float, default=MEMORY_MB, help="memory for the dimension key filter")
+    parser.add_argument('--expected', action='append', default=[], metavar='KEY',
+                        help="key allowed to be missing from the dimension, e.g. -1 (repeatable)")
+    parser.add_argument('--max-orphan-keys', type=int, default=MAX_ORPHAN_KEYS,
+                        help="distinct orphan keys counted individually")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="orphan keys to print")
+    parser.add_argument('--no-confirm', action='store_true', help="skip the confirmation pass over the dimension")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+    fact_conn = connect(args.fact)
+    dimension_conn = connect(args.dimension) if args.dimension else fact_conn
+    try:
+        result = check_orphans(
+            lambda: key_batches(fact_conn, args.fact_query, params),
+            lambda: key_batches(dimension_conn, args.dimension_query, params),
+            int(args.memory_mb * (1 << 20)), args.expected, args.max_orphan_keys, not args.no_confirm
+        )
+    finally:
+        fact_conn.close()
+        if dimension_conn is not fact_conn:
+            dimension_conn.close()
+
+    print(f"  {result['dimension_keys']:,} dimension keys in a {result['filter']} "
+          f"({result['filter_bytes'] / (1 << 20):.1f} MB, false positive rate {result['false_positive_rate']:.2g})")
+    print(f"  {result['fact_rows']:,} fact rows, {result['null_rows']:,} with a NULL key")
+    for key, rows in result['expected']:
+        print(f"  – expected key {key}: {rows:,} rows")
+    if result['confirmed_present']:
+        print(f"  – {len(result['confirmed_present'])} candidate keys found in the dimension on confirmation")
+    icon = '✓' if result['status'] == 'passed' else '✗'
+    print(f"{icon} {result['orphan_rows']:,} orphan rows across {len(result['orphans']):,} keys"
+          + (" (distinct key cap reached)" if result['truncated'] else ''))
+    for key, rows in result['orphans'][:args.max_samples]:
+        print(f"    {key}: {rows:,} rows")
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,618 @@
+"""
+PDF export of a checklist, rendered from the exported JSON.
+
+exportToPDF() in checklist-script.js builds the whole document with jsPDF in
+the browser and decodes every evidence screenshot on the main thread, so
+large checklists freeze or crash the tab. This renders the same report on
+the server: title page with the report information, description and table
+of contents, one section per test case (queries in Courier, evidence images
+scaled to the page width) and the validation summary.
+
+The PDF is written by the small writer below rather than a library. Pages
+are laid out one at a time, and each page's content stream is compressed
+and written out as soon as the page is full, so memory use stays at about
+one page plus one image whatever the size of the checklist. JPEG evidence is
+embedded as it is (DCTDecode) and plain PNG evidence by copying its IDAT data
+with PNG predictors, so neither is decoded; other images (alpha channel,
+interlaced, GIF, BMP) are converted with Pillow. Evidence is embedded as the
+pre-sized 'pdf' variants from evidence_images.py, not the originals. The
+standard Helvetica and Courier fonts are used, with their metrics here for
+wrapping; characters outside WinAnsi (such as the emoji in the phase labels)
+are dropped.
+
+The table of contents comes first in page order but is written last, once
+every test case's page is known; its entries link to the test cases, which
+also get a bookmark each. With --trace / --metrics, each test case's
+section is timed as a 'render' span (see instrumentation.py).
+
+    python pdf_report.py Validation_Checklist_2024-06-30.json -o report.pdf
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+import instrumentation
+from checklist import PHASE_LABELS, STATUS_LABELS, load_checklist, status_counts, target_query, write_atomic
+from evidence_images import CACHE_DIR, checklist_images, prepare_variants
+from evidence_store import open_store
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89        # A4, jsPDF's default
+MARGIN = 56.69                                  # 20 mm
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+IMAGE_MAX_HEIGHT = 340
+COMPRESS_LEVEL = 6
+
+BLACK = (0, 0, 0)
+BLUE = (0, 102, 204)
+GREY = (120, 120, 120)
+STATUS_COLORS = {'passed': (0, 153, 76), 'failed': (220, 53, 69), 'pending': (255, 193, 7)}
+TOOL_LABELS = {'powerbi': 'Power BI', 'oac': 'Oracle Analytics Cloud'}
+
+# Advance widths (1/1000 em) of the WinAnsi characters 32-126 in the standard fonts
+HELVETICA_WIDTHS = (
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278] + [556] * 10 +
+    [278, 278, 584, 584, 584, 556, 1015] +
+    [667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722,
+     667, 944, 667, 667, 611] +
+    [278, 278, 278, 469, 556, 333] +
+    [556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556,
+     500, 722, 500, 500, 500] +
+    [334, 260, 334, 584]
+)
+HELVETICA_BOLD_WIDTHS = (
+    [278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278] + [556] * 10 +
+    [333, 333, 584, 584, 584, 611, 975] +
+    [722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778, 667, 778, 722, 667, 611, 722,
+     667, 944, 667, 667, 611] +
+    [333, 278, 333, 584, 556, 333] +
+    [556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611, 611, 611, 389, 556, 333, 611,
+     556, 778, 556, 556, 500] +
+    [389, 280, 389, 584]
+)
+# The few non-ASCII characters the checklists use; anything else counts as 556
+HELVETICA_EXTRA = {'•': 350, '–': 556, '—': 1000, '…': 1000, '‘': 222, '’': 222, '“': 333, '”': 333}
+HELVETICA_BOLD_EXTRA = {'•': 350, '–': 556, '—': 1000, '…': 1000, '‘': 278, '’': 278, '“': 500, '”': 500}
+
+# Resource name: (base font, widths, extra widths); Courier is 600 throughout
+FONTS = {
+    'F1': ('Helvetica', HELVETICA_WIDTHS, HELVETICA_EXTRA),
+    'F2': ('Helvetica-Bold', HELVETICA_BOLD_WIDTHS, HELVETICA_BOLD_EXTRA),
+    'F3': ('Courier', None, None)
+}
+REGULAR, BOLD, MONO = 'F1', 'F2', 'F3'
+
+TOKENS = re.compile(r'\S+|\s+')
+CONTROL = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+
+def pdf_text(value):
+    """`value` as text the WinAnsi fonts can show: other characters dropped, CRLF as LF"""
+    text = '' if value is None else str(value)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return CONTROL.sub('', text.encode('cp1252', 'ignore').decode('cp1252'))
+
+def label(text):
+    """A label from checklist.py without its emoji"""
+    return pdf_text(text).strip()
+
+def text_width(text, font, size):
+    _, widths, extra = FONTS[font]
+    if widths is None:
+        return len(text) * 0.6 * size
+    total = 0
+    for ch in text:
+        code = ord(ch)
+        total += widths[code - 32] if 32 <= code < 127 else extra.get(ch, 556)
+    return total * size / 1000
+
+def _fit_chars(text, font, size, width):
+    """How many leading characters of `text` fit in `width` (at least one)"""
+    used = 0
+    for count, ch in enumerate(text):
+        used += text_width(ch, font, size)
+        if used > width:
+            return max(1, count)
+    return len(text)
+
+def wrap(text, font, size, width):
+    """Lines of `text` no wider than `width`, breaking at spaces and, for long words or SQL, anywhere
+
+    Leading whitespace is kept, so indented SQL stays indented.
+    """
+    lines = []
+    for paragraph in pdf_text(text).expandtabs(4).split('\n'):
+        line, used = '', 0.0
+        for token in TOKENS.findall(paragraph):
+            token_width = text_width(token, font, size)
+            if used + token_width <= width:
+                line += token
+                used += token_width
+            elif token.isspace():
+                lines.append(line)
+                line, used = '', 0.0
+            else:
+                if line.strip():
+                    lines.append(line.rstrip())
+                    line, used = '', 0.0
+                while used + token_width > width and len(token) > 1:
+                    cut = _fit_chars(token, font, size, width - used)
+                    lines.append(line + token[:cut])
+                    line, used = '', 0.0
+                    token = token[cut:]
+                    token_width = text_width(token, font, size)
+                line += token
+                used += token_width
+        lines.append(line.rstrip())
+    return lines
+
+def _literal(text):
+    data = text.encode('cp1252', 'ignore')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def _text_string(text):
+    """PDF text string (UTF-16BE) for bookmarks and document info"""
+    return '<FEFF' + text.encode('utf-16-be').hex().upper() + '>'
+
+def _number(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+def _color(rgb):
+    return ' '.join(_number(c / 255) for c in rgb)
+
+def jpeg_info(data):
+    """(width, height, components, adobe) from a JPEG's frame header, or None"""
+    position = 2
+    adobe = False
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        code = data[position + 1]
+        if code == 0xFF:
+            position += 1
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            position += 2
+            continue
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        if code == 0xEE and data[position + 4:position + 9] == b'Adobe':
+            adobe = True
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            height, width, components = struct.unpack('>HHB', data[position + 5:position + 10])
+            return width, height, components, adobe
+        position += 2 + length
+    return None
+
+def png_xobject(data):
+    """(dictionary entries, data, width, height) for a PNG PDF can decode itself, or None
+
+    8-bit grey or RGB, and palette images without transparency, that are not
+    interlaced keep their IDAT data: it is a zlib stream with PNG predictors,
+    which FlateDecode understands.
+    """
+    width, height, depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data[16:29])
+    if interlace or color_type not in (0, 2, 3) or (color_type != 3 and depth != 8):
+        return None
+    idat = []
+    palette = None
+    position = 8
+    while position + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        if kind == b'IDAT':
+            idat.append(chunk)
+        elif kind == b'PLTE':
+            palette = chunk
+        elif kind == b'tRNS':
+            return None
+        elif kind == b'IEND':
+            break
+        position += 12 + length
+    colors = {0: 1, 2: 3, 3: 1}[color_type]
+    if color_type == 3:
+        if palette is None:
+            return None
+        space = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    else:
+        space = '/DeviceGray' if color_type == 0 else '/DeviceRGB'
+    entries = (f"/ColorSpace {space} /BitsPerComponent {depth} /Filter /FlateDecode "
+               f"/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {depth} /Columns {width} >>")
+    return entries, b''.join(idat), width, height
+
+def pillow_xobject(data):
+    """Decode any image Pillow reads, flatten transparency onto white and deflate it
+
+    None without Pillow, or for an image too large for Pillow to decode safely.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        return None
+    with image:
+        image.seek(0)
+        if image.mode in ('RGBA', 'LA', 'P', 'PA') or 'transparency' in image.info:
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'L':
+            image = image.convert('RGB')
+        space = '/DeviceGray' if image.mode == 'L' else '/DeviceRGB'
+        entries = f"/ColorSpace {space} /BitsPerComponent 8 /Filter /FlateDecode"
+        return entries, zlib.compress(image.tobytes(), COMPRESS_LEVEL), image.width, image.height
+
+def image_xobject(data):
+    """(dictionary entries, stream data, width, height) embedding an image file's bytes, or None"""
+    if data[:2] == b'\xff\xd8':
+        info = jpeg_info(data)
+        if info is not None and info[2] in (1, 3, 4):
+            width, height, components, adobe = info
+            space = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}[components]
+            decode = ' /Decode [1 0 1 0 1 0 1 0]' if components == 4 and adobe else ''
+            return f"/ColorSpace {space} /BitsPerComponent 8 /Filter /DCTDecode{decode}", data, width, height
+    elif data[:8] == b'\x89PNG\r\n\x1a\n':
+        embedded = png_xobject(data)
+        if embedded is not None:
+            return embedded
+    try:
+        return pillow_xobject(data)
+    except (OSError, ValueError):
+        return None
+
+class PdfWriter:
+    """Writes a PDF object by object to a binary file, keeping only the cross-reference offsets"""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.next_id = 1
+        self.pages_id = self.reserve()
+        self.images = {}        # sha1 of the file -> (name, object id, width, height), or None
+        self.image_ids = {}     # name -> object id
+        self.page_count = 0
+        f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.font_ids = {key: self.write_object(
+            None, f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>")
+            for key, (base, _, _) in FONTS.items()}
+
+    def reserve(self):
+        number = self.next_id
+        self.next_id += 1
+        return number
+
+    def write_object(self, number, body, stream=None):
+        """Write object `number` (a new one if None); `body` is its dictionary when there is a stream"""
+        number = number or self.reserve()
+        self.offsets[number] = self.f.tell()
+        if stream is not None:
+            body = f"{body[:-2]}/Length {len(stream)} >>"
+        self.f.write(f"{number} 0 obj\n{body}".encode('latin-1'))
+        if stream is not None:
+            self.f.write(b'\nstream\n')
+            self.f.write(stream)
+            self.f.write(b'\nendstream')
+        self.f.write(b'\nendobj\n')
+        return number
+
+    def image(self, path):
+        """(resource name, width, height) of the image in `path`, embedding it on first use; None if it can't be"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).digest()
+        if digest not in self.images:
+            embedded = image_xobject(data)
+            if embedded is None:
+                self.images[digest] = None
+            else:
+                entries, stream, width, height = embedded
+                name = f"Im{len(self.image_ids)}"
+                self.image_ids[name] = self.write_object(
+                    None, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} {entries} >>", stream)
+                self.images[digest] = (name, width, height)
+        return self.images[digest]
+
+    def page(self, number, content, images, links):
+        """Write page object `number` with its content stream; `links` are (rect, page id, top) annotations"""
+        contents = self.write_object(None, "<< /Filter /FlateDecode >>", zlib.compress(content, COMPRESS_LEVEL))
+        fonts = ' '.join(f"/{key} {number_} 0 R" for key, number_ in self.font_ids.items())
+        resources = f"/Font << {fonts} >>"
+        if images:
+            resources += " /XObject << " + ' '.join(f"/{name} {self.image_ids[name]} 0 R"
+                                                     for name in sorted(images)) + " >>"
+        annots = ''
+        if links:
+            annots = " /Annots [" + ' '.join(
+                f"<< /Type /Annot /Subtype /Link /Border [0 0 0] /Rect [{' '.join(_number(v) for v in rect)}] "
+                f"/Dest [{target} 0 R /XYZ 0 {_number(top)} null] >>" for rect, target, top in links) + "]"
+        self.write_object(number, f"<< /Type /Page /Parent {self.pages_id} 0 R "
+                                  f"/MediaBox [0 0 {_number(PAGE_WIDTH)} {_number(PAGE_HEIGHT)}] "
+                                  f"/Resources << {resources} >> /Contents {contents} 0 R{annots} >>")
+        self.page_count += 1
+
+    def close(self, pages, outlines=(), title=None):
+        """Write the page tree in the order of `pages`, bookmarks (title, page id, top), the trailer"""
+        self.write_object(self.pages_id, f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in pages)}] "
+                                         f"/Count {len(pages)} >>")
+        catalog = f"/Type /Catalog /Pages {self.pages_id} 0 R"
+        if outlines:
+            root = self.reserve()
+            items = [self.reserve() for _ in outlines]
+            for i, (text, page, top) in enumerate(outlines):
+                links = f" /Prev {items[i - 1]} 0 R" if i else ''
+                links += f" /Next {items[i + 1]} 0 R" if i + 1 < len(items) else ''
+                self.write_object(items[i], f"<< /Title {_text_string(text)} /Parent {root} 0 R{links} "
+                                            f"/Dest [{page} 0 R /XYZ 0 {_number(top)} null] >>")
+            self.write_object(root, f"<< /Type /Outlines /First {items[0]} 0 R /Last {items[-1]} 0 R "
+                                    f"/Count {len(items)} >>")
+            catalog += f" /Outlines {root} 0 R /PageMode /UseOutlines"
+        catalog_id = self.write_object(None, f"<< {catalog} >>")
+        info = f"/Producer (pdf_report.py) /CreationDate (D:{time.strftime('%Y%m%d%H%M%S')})"
+        if title:
+            info += f" /Title {_text_string(title)}"
+        info_id = self.write_object(None, f"<< {info} >>")
+        start = self.f.tell()
+        count = self.next_id
+        xref = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        for number in range(1, count):
+            offset = self.offsets.get(number)
+            xref.append(f"{offset:010d} 00000 n \n" if offset is not None else "0000000000 65535 f \n")
+        self.f.write(''.join(xref).encode('ascii'))
+        self.f.write(f"trailer\n<< /Size {count} /Root {catalog_id} 0 R /Info {info_id} 0 R >>\n"
+                     f"startxref\n{start}\n%%EOF\n".encode('ascii'))
+
+class Layout:
+    """Lays lines and images out down the page, handing each full page to the writer
+
+    With no writer it only counts pages, which is how the front matter is
+    sized before the test cases are numbered.
+    """
+
+    def __init__(self, writer, first_page=1):
+        self.writer = writer
+        self.number = first_page - 1
+        self.pages = []
+        self.ops = None
+        self.y = 0
+
+    def new_page(self):
+        self.finish()
+        self.number += 1
+        self.page_id = self.writer.reserve() if self.writer else None
+        self.pages.append(self.page_id)
+        self.ops = []
+        self.images = set()
+        self.links = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def finish(self):
+        if self.ops is None:
+            return
+        footer = f"Page {self.number}"
+        self.ops.append(b'BT /F1 8 Tf %s rg %s %s Td %s Tj ET' % (
+            _color(GREY).encode(), _number(PAGE_WIDTH - MARGIN - text_width(footer, REGULAR, 8)).encode(),
+            _number(MARGIN / 2).encode(), _literal(footer)))
+        if self.writer:
+            self.writer.page(self.page_id, b'\n'.join(self.ops), self.images, self.links)
+        self.ops = None
+
+    def ensure(self, height):
+        """Start a new page unless `height` more points fit on this one"""
+        if self.ops is None or self.y - height < MARGIN:
+            self.new_page()
+
+    def line(self, text, font=REGULAR, size=10, color=BLACK, x=MARGIN, leading=None):
+        """One line of text; the next starts `leading` points lower"""
+        leading = leading or size * 1.5
+        self.ensure(leading)
+        if text:
+            self.ops.append(b'BT /%s %s Tf %s rg %s %s Td %s Tj ET' % (
+                font.encode(), _number(size).encode(), _color(color).encode(), _number(x).encode(),
+                _number(self.y - size).encode(), _literal(text)))
+        self.y -= leading
+
+    def text(self, text, font=REGULAR, size=10, color=BLACK, indent=0, leading=None):
+        """Wrapped text across as many lines and pages as it needs"""
+        for line in wrap(text, font, size, TEXT_WIDTH - indent):
+            self.line(line, font, size, color, MARGIN + indent, leading)
+
+    def space(self, height):
+        self.y -= height
+
+    def link(self, target, top, height):
+        """Make the line just laid out (`height` tall) link to page `target` at `top`"""
+        if self.writer and target:
+            self.links.append(((MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y + height), target, top))
+
+    def image(self, path, max_width=TEXT_WIDTH, max_height=IMAGE_MAX_HEIGHT):
+        """Draw the image scaled into the box; False if it could not be embedded"""
+        embedded = self.writer.image(path) if self.writer else None
+        if embedded is None:
+            return False
+        name, width, height = embedded
+        scale = min(max_width / width, max_height / height, 1.0)
+        width, height = width * scale, height * scale
+        self.ensure(height + 6)
+        self.images.add(name)
+        self.ops.append(b'q %s 0 0 %s %s %s cm /%s Do Q' % (
+            _number(width).encode(), _number(height).encode(), _number(MARGIN).encode(),
+            _number(self.y - height).encode(), name.encode()))
+        self.y -= height + 6
+        return True
+
+def front_matter(layout, checklist, contents):
+    """Title page, report information, description and the table of contents
+
+    `contents` holds (test case, page number, page id, top) per test case;
+    the page numbers do not change the layout, so a dry run can use None.
+    """
+    counts = status_counts(checklist['testCases'])
+    tool = TOOL_LABELS.get(checklist.get('reportingTool'), checklist.get('reportingTool') or '')
+    layout.new_page()
+    layout.line('Report Validation Checklist', BOLD, 24, BLUE, leading=36)
+    layout.text(checklist.get('reportName') or 'Report', REGULAR, 18, leading=27)
+    layout.space(18)
+    layout.line('Report Information', BOLD, 12, leading=20)
+    for caption, value in (('Reporting Tool', tool), ('Validation Date', checklist.get('validationDate')),
+                           ('Validator', checklist.get('validator') or 'Not specified'),
+                           ('Test Cases', f"{counts['total']} ({counts['passed']} passed, {counts['failed']} "
+                                          f"failed, {counts['pending']} pending)")):
+        layout.text(f"{caption}: {value or ''}")
+    layout.space(20)
+    if checklist.get('reportDescription'):
+        layout.ensure(60)
+        layout.line('Report Description', BOLD, 12, leading=20)
+        layout.text(checklist['reportDescription'])
+        layout.space(14)
+    layout.ensure(60)
+    layout.line('Table of Contents', BOLD, 12, leading=22)
+    for tc, page, page_id, top in contents:
+        lines = wrap(f"{tc.get('id', '')}: {tc.get('title', '')}", REGULAR, 10, TEXT_WIDTH - 50)
+        for i, line in enumerate(lines):
+            layout.line(line, x=MARGIN if i == 0 else MARGIN + 14, leading=15)
+            if i == 0 and page is not None:
+                number = str(page)
+                layout.ops.append(b'BT /F1 10 Tf 0 0 0 rg %s %s Td %s Tj ET' % (
+                    _number(PAGE_WIDTH - MARGIN - text_width(number, REGULAR, 10)).encode(),
+                    _number(layout.y + 15 - 10).encode(), _literal(number)))
+                layout.link(page_id, top, 15)
+
+def test_case_section(layout, tc, tool, images, index):
+    """One test case from the top of the current page; returns the number of evidence images drawn
+
+    `images` maps (test case index, evidence number) to the image file to embed.
+    """
+    layout.line(f"Test Case {tc.get('id', '')}", BOLD, 14, BLUE, leading=24)
+    layout.text(tc.get('title') or '', BOLD, 12, leading=18)
+    layout.space(8)
+    layout.line(f"Validation Phase: {label(PHASE_LABELS.get(tc.get('phase'), tc.get('phase') or ''))}")
+    layout.line(f"Status: {label(STATUS_LABELS.get(tc.get('status'), tc.get('status') or ''))}", leading=24)
+
+    for caption, key in (('Description:', 'description'), ('Expected Result:', 'expectedResult')):
+        if tc.get(key):
+            layout.ensure(40)
+            layout.line(caption, BOLD)
+            layout.text(tc[key])
+            layout.space(10)
+    target = target_query(tc, tool)
+    target_label = ('Target Query (One Lake Warehouse / Lakehouse):' if tool == 'powerbi'
+                    else 'Target Query (Oracle ADW):')
+    for caption, sql in (('Source Query (Oracle EBS/Fusion):', tc.get('sourceQuery')), (target_label, target)):
+        if sql:
+            layout.ensure(50)
+            layout.line(caption, BOLD)
+            layout.text(sql.strip('\n'), MONO, 8, leading=11)
+            layout.space(10)
+
+    drawn = 0
+    evidence = tc.get('evidence') or []
+    if evidence:
+        layout.ensure(40)
+        layout.line('Evidence:', BOLD)
+        for number, item in enumerate(evidence):
+            layout.text(f"• {item.get('name') or 'evidence'}")
+            path = images.get((index, number))
+            if path is None:
+                continue
+            if layout.image(path):
+                drawn += 1
+            else:
+                layout.text('(Image could not be embedded)', size=9, color=GREY, indent=14)
+        layout.space(10)
+
+    status = tc.get('status') or 'pending'
+    layout.ensure(40)
+    layout.line('Test Result:', BOLD)
+    layout.line(label(STATUS_LABELS.get(status, status)), BOLD, 10, STATUS_COLORS.get(status, BLACK))
+    return drawn
+
+def summary_page(layout, checklist):
+    counts = status_counts(checklist['testCases'])
+    layout.new_page()
+    layout.line('Validation Summary', BOLD, 16, BLUE, leading=30)
+    for text, color in ((f"Total Test Cases: {counts['total']}", BLACK),
+                        (f"Passed: {counts['passed']}", STATUS_COLORS['passed']),
+                        (f"Failed: {counts['failed']}", STATUS_COLORS['failed']),
+                        (f"Pending: {counts['pending']}", STATUS_COLORS['pending']),
+                        (f"Completion Rate: {counts['completion']}%", BLUE)):
+        layout.line(text, REGULAR, 12, color, leading=22)
+
+def render_pdf(checklist, f, images):
+    """Write the report for `checklist` to the binary file `f`; returns (pages, images drawn)
+
+    `images` maps (test case index, evidence number) to the file to embed,
+    see evidence_images.checklist_images().
+    """
+    test_cases = checklist['testCases']
+    dry = Layout(None)
+    front_matter(dry, checklist, [(tc, None, None, None) for tc in test_cases])
+    dry.finish()
+
+    writer = PdfWriter(f)
+    body = Layout(writer, len(dry.pages) + 1)
+    contents = []
+    drawn = 0
+    for index, tc in enumerate(test_cases):
+        body.new_page()
+        contents.append((tc, body.number, body.page_id, body.y))
+        with instrumentation.labels(test_case=tc.get('id') or None), instrumentation.span('render') as render:
+            first = body.number
+            count = test_case_section(body, tc, checklist.get('reportingTool'), images, index)
+            render.add(pages=body.number - first + 1, images=count)
+        drawn += count
+    summary_page(body, checklist)
+    body.finish()
+
+    front = Layout(writer)
+    front_matter(front, checklist, contents)
+    front.finish()
+    outlines = [(f"{tc.get('id', '')}: {label(tc.get('title'))}", page_id, top)
+                for tc, _, page_id, top in contents]
+    writer.close(front.pages + body.pages, outlines, checklist.get('reportName'))
+    return writer.page_count, drawn
+
+def render_file(input_path, output_path, full_size=False, cache_dir=CACHE_DIR, workers=None):
+    """Render one checklist export to a PDF, written atomically; returns (pages, images drawn)
+
+    Evidence images are embedded as their 'pdf' variants (see
+    evidence_images.py) unless `full_size` is set.
+    """
+    checklist = load_checklist(input_path)
+    result = []
+    with tempfile.TemporaryDirectory(prefix='pdf-evidence-') as evidence_dir:
+        images = checklist_images(checklist, evidence_dir, open_store(checklist, input_path))
+        if not full_size:
+            variants = prepare_variants(images.values(), 'pdf', cache_dir, workers)
+            images = {key: variants.get(path, path) for key, path in images.items()}
+        write_atomic(output_path, lambda f: result.extend(render_pdf(checklist, f, images)))
+    return tuple(result)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render an exported checklist JSON to a PDF report")
+    parser.add_argument('checklist', help="checklist export (Validation_Checklist_*.json)")
+    parser.add_argument('-o', '--output', help="PDF to write (default: the checklist name with .pdf)")
+    parser.add_argument('--full-size', action='store_true', help="embed evidence images at their original size")
+    parser.add_argument('--image-cache', default=CACHE_DIR, help="evidence image variant cache directory")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="image worker processes (default: all cores)")
+    instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.checklist)[0] + '.pdf'
+    start = time.perf_counter()
+    recorder = instrumentation.open_recorder(args)
+    pages, images = render_file(args.checklist, output, args.full_size, args.image_cache, args.jobs)
+    print(f"✓ {args.checklist} -> {output} ({pages} pages, {images} images, "
+          f"{time.perf_counter() - start:.1f}s)")
+    instrumentation.close_recorder(recorder, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
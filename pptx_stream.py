@@ -0,0 +1,151 @@
+"""
+Streaming save path for decks that carry large evidence images.
+
+prs.save() builds every part in memory, including every image blob. Here
+evidence images are added as DeferredImagePart objects that only remember
+the file they came from, and save_streaming() writes the package one part at
+a time: XML parts are serialised as they are reached, deferred images are
+copied from disk in chunks, and images that are already compressed
+(PNG/JPEG/GIF) are stored rather than deflated again. Memory use therefore
+does not grow with the number or size of the screenshots in the deck.
+
+    picture = add_evidence_picture(slide, 'evidence/tc-001.png', left, top, max_width, max_height)
+    save_streaming(prs, 'deck.pptx')      # or '-' for stdout
+"""
+
+import hashlib
+import os
+import shutil
+import struct
+import sys
+import zipfile
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.parts.image import ImagePart
+
+from checklist import write_atomic
+
+CHUNK_SIZE = 1 << 20
+IMAGE_CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'tif': 'image/tiff',
+    'tiff': 'image/tiff'
+}
+# Formats whose data is already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+def image_size(path):
+    """(width, height) in pixels read from a PNG or JPEG header, or None"""
+    with open(path, 'rb') as f:
+        head = f.read(26)
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:2] != b'\xff\xd8':
+            return None
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            while marker[1] == 0xFF:
+                marker = marker[1:] + f.read(1)
+            code = marker[1]
+            if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                continue
+            length = struct.unpack('>H', f.read(2))[0]
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>xHH', f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+def fit_size(size, max_width, max_height):
+    """Largest (cx, cy) inside the box that keeps the image's aspect ratio"""
+    if not size or not size[0] or not size[1]:
+        return max_width, max_height
+    width, height = size
+    scale = min(max_width / width, max_height / height)
+    return int(width * scale), int(height * scale)
+
+class DeferredImagePart(ImagePart):
+    """Image part whose bytes stay on disk until the package is written"""
+
+    def __init__(self, partname, content_type, package, path):
+        super().__init__(partname, content_type, package, b'', os.path.basename(path))
+        self.path = path
+
+    @property
+    def blob(self):
+        # Only reached through prs.save(); save_streaming() copies the file instead
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    @property
+    def sha1(self):
+        digest = hashlib.sha1()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def scale(self, scaled_cx, scaled_cy):
+        return scaled_cx, scaled_cy
+
+def deferred_image_part(package, path):
+    """Return the deferred part for `path`, adding it the first time it is used"""
+    path = os.path.abspath(path)
+    for part in package.iter_parts():
+        if isinstance(part, DeferredImagePart) and part.path == path:
+            return part
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    if ext not in IMAGE_CONTENT_TYPES:
+        raise ValueError(f"Unsupported evidence image type: {path}")
+    partname = package.next_image_partname('jpg' if ext == 'jpeg' else ext)
+    return DeferredImagePart(partname, IMAGE_CONTENT_TYPES[ext], package, path)
+
+def add_evidence_picture(slide, path, left, top, max_width, max_height):
+    """Add the image at `path` fitted into the box, without reading it into memory"""
+    image_part = deferred_image_part(slide.part.package, path)
+    rId = slide.part.relate_to(image_part, RT.IMAGE)
+    cx, cy = fit_size(image_size(path), max_width, max_height)
+    left += (max_width - cx) // 2
+    pic = slide.shapes._add_pic_from_image_part(image_part, rId, left, top, cx, cy)
+    return slide.shapes._shape_factory(pic)
+
+def _compress_type(name):
+    ext = name.rsplit('.', 1)[-1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+def write_package(prs, fileobj):
+    """Write `prs` as a .pptx zip to `fileobj`, one part at a time"""
+    package = prs.part.package
+    parts = list(package.iter_parts())
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        zf.writestr('_rels/.rels', package._rels.xml)
+        for part in parts:
+            name = part.partname.membername
+            if isinstance(part, DeferredImagePart):
+                info = zipfile.ZipInfo.from_file(part.path, name)
+                info.compress_type = _compress_type(name)
+                with open(part.path, 'rb') as src, zf.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                zf.writestr(name, part.blob, compress_type=_compress_type(name))
+            if part._rels:
+                zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+def save_streaming(prs, target):
+    """Save `prs` to a path (written atomically), '-' for stdout, or a binary file object"""
+    if target == '-':
+        write_package(prs, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    elif isinstance(target, (str, os.PathLike)):
+        write_atomic(target, lambda f: write_package(prs, f))
+    else:
+        write_package(prs, target)
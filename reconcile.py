@@ -0,0 +1,220 @@
+"""
+Hierarchical reconciliation of a fact table between source and target.
+
+The Data Accuracy checks ask for fact values to match at the ledger,
+monthly/daily and transaction levels. Instead of pulling every transaction
+from both systems, both sides are aggregated per ledger first (row count plus
+the sums of the amount columns, and any extra checksum expressions). Only
+partitions whose checksums differ are broken down further, per month and
+then per day, and transaction rows are fetched only for the days that still
+differ. Like a Merkle tree, matching partitions are never expanded, so the
+rows transferred grow with the number of discrepancies rather than with the
+size of the table. Sums match within half a cent per partition, so a
+partition can differ while none of its children do (many sub-cent
+differences adding up); that fails too, with the partition as the sample.
+
+A reconciliation spec describes the table on each side:
+
+    {
+      "source": {"connection": "sqlite:///ebs.db", "dialect": "sqlite",
+                 "table": "ap_invoices_all", "ledger": "set_of_books_id",
+                 "date": "invoice_date", "id": "invoice_id",
+                 "amounts": ["invoice_amount"],
+                 "where": "invoice_date BETWEEN :start_date AND :end_date"},
+      "target": {...same keys for the warehouse table...}
+    }
+
+Usage:
+    python reconcile.py ap_invoices.json --start-date 2024-01-01 --end-date 2024-12-31
+"""
+
+import argparse
+import json
+import sys
+
+from validation_engine import MAX_SAMPLES, bind_params, connect, diff_partition, iter_rows
+
+LEVELS = ('ledger', 'month', 'day')
+TOLERANCE = 0.005           # amounts are money; sums within half a cent match
+PARENTS_PER_QUERY = 100     # partitions filtered on in one query
+
+# Expressions that turn the date column into the month/day labels of a partition
+DIALECTS = {
+    'sqlite': {'month': "strftime('%Y-%m', {0})", 'day': "strftime('%Y-%m-%d', {0})"},
+    'duckdb': {'month': "strftime(CAST({0} AS DATE), '%Y-%m')", 'day': "strftime(CAST({0} AS DATE), '%Y-%m-%d')"},
+    'oracle': {'month': "TO_CHAR({0}, 'YYYY-MM')", 'day': "TO_CHAR({0}, 'YYYY-MM-DD')"}
+}
+
+def load_spec(path):
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    for side in ('source', 'target'):
+        missing = [key for key in ('table', 'ledger', 'date', 'id', 'amounts') if key not in spec.get(side, {})]
+        if missing:
+            raise ValueError(f"{path}: {side} is missing {', '.join(missing)}")
+    return spec
+
+def level_exprs(side, level):
+    """Group-by expressions identifying a partition at `level` (0 = ledger, 1 = month, 2 = day)"""
+    if level == 0:
+        return [side['ledger']]
+    dialect = DIALECTS[side.get('dialect', 'sqlite')]
+    return [side['ledger'], dialect[LEVELS[level]].format(side['date'])]
+
+def metric_exprs(side):
+    """Checksum columns: row count, the sum of every amount, then any extra checksum expressions"""
+    return ['COUNT(*)'] + [f"SUM({amount})" for amount in side['amounts']] + list(side.get('checksums', []))
+
+def _where(side, parent_level, parents):
+    """WHERE clause (with its values) for the side filter plus membership in `parents`"""
+    clauses = [f"({side['where']})"] if side.get('where') else []
+    values = []
+    if parents:
+        exprs = level_exprs(side, parent_level)
+        matches = []
+        for parent in parents:
+            # A NULL ledger or date is its own partition, which `= NULL` would never match
+            matches.append(' AND '.join(f"{expr} IS NULL" if value is None else f"{expr} = ?"
+                                        for expr, value in zip(exprs, parent)))
+            values.extend(value for value in parent if value is not None)
+        clauses.append('(' + ' OR '.join(f"({match})" for match in matches) + ')')
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', values
+
+def _execute(connection, sql, params, extra_values, stats):
+    """Run `sql` (binding :name params ahead of the positional filter values) and yield rows"""
+    sql, values = bind_params(sql, params)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, values + extra_values)
+        for row in iter_rows(cursor):
+            stats['rows_fetched'] += 1
+            yield row
+    finally:
+        cursor.close()
+
+def _chunks(parents):
+    if parents is None:
+        yield None
+        return
+    for start in range(0, len(parents), PARENTS_PER_QUERY):
+        yield parents[start:start + PARENTS_PER_QUERY]
+
+def aggregate(connection, side, level, parents, params, stats):
+    """{partition key: checksum tuple} at `level`, limited to children of `parents`"""
+    exprs = level_exprs(side, level)
+    checksums = {}
+    for chunk in _chunks(parents):
+        where, values = _where(side, level - 1, chunk)
+        sql = (f"SELECT {', '.join(exprs + metric_exprs(side))} FROM {side['table']}{where} "
+               f"GROUP BY {', '.join(exprs)}")
+        for row in _execute(connection, sql, params, values, stats):
+            checksums[row[:len(exprs)]] = row[len(exprs):]
+    return checksums
+
+def checksums_match(a, b, tolerance=TOLERANCE):
+    if a is None or b is None:
+        return a is b
+    return all(
+        abs((x or 0) - (y or 0)) <= tolerance if isinstance(x or 0, (int, float)) and isinstance(y or 0, (int, float))
+        else x == y
+        for x, y in zip(a, b)
+    )
+
+def _sort_key(key):
+    return tuple(str(value) for value in key)
+
+def fetch_transactions(connection, side, days, params, stats):
+    """(key, row) pairs for every transaction in the given (ledger, day) partitions"""
+    columns = [side['id'], side['ledger'], side['date']] + list(side['amounts'])
+    where, values = _where(side, 2, days)
+    sql = f"SELECT {', '.join(columns)} FROM {side['table']}{where}"
+    for row in _execute(connection, sql, params, values, stats):
+        yield (row[0],), row
+
+def reconcile(source_conn, target_conn, spec, params, max_samples=MAX_SAMPLES, start_level=0, parents=None):
+    """Compare checksums level by level and diff transactions of the partitions that differ
+
+    By default every ledger is compared. With `start_level` and `parents`,
+    only the children of those partitions (at start_level - 1) are, e.g.
+    the days of a few changed months with start_level=2.
+    """
+    stats = {'rows_fetched': 0}
+    result = {'status': 'passed', 'levels': [], 'differing': []}
+    below_tolerance = False
+    for level in range(start_level, len(LEVELS)):
+        name = LEVELS[level]
+        source = aggregate(source_conn, spec['source'], level, parents, params, stats)
+        target = aggregate(target_conn, spec['target'], level, parents, params, stats)
+        keys = sorted(source.keys() | target.keys(), key=_sort_key)
+        differing = [key for key in keys if not checksums_match(source.get(key), target.get(key))]
+        result['levels'].append({'level': name, 'partitions': len(keys), 'differing': len(differing)})
+        if not differing:
+            # Parents that differ while none of their children do are off by
+            # differences each below TOLERANCE; they stay the samples
+            below_tolerance = len(result['levels']) > 1
+            break
+        result['differing'] = [
+            {'partition': list(key), 'source': source.get(key), 'target': target.get(key)}
+            for key in differing[:max_samples]
+        ]
+        parents = differing
+
+    transactions = {'matched': 0, 'mismatched': 0, 'source_only': 0, 'target_only': 0, 'samples': []}
+    if result['levels'][-1]['differing']:
+        result['status'] = 'failed'
+        for chunk in _chunks(parents):
+            diff_partition(
+                fetch_transactions(source_conn, spec['source'], chunk, params, stats),
+                fetch_transactions(target_conn, spec['target'], chunk, params, stats),
+                transactions, max_samples
+            )
+    elif below_tolerance:
+        result['status'] = 'failed'
+    result['transactions'] = transactions
+    result['rows_fetched'] = stats['rows_fetched']
+    if result['status'] == 'passed':
+        result['message'] = f"{result['levels'][0]['partitions']} {LEVELS[start_level]}s match"
+    elif below_tolerance:
+        parent, child = result['levels'][-2], result['levels'][-1]
+        result['message'] = (f"{parent['differing']} {parent['level']}s differ, but no {child['level']} within them "
+                             f"does: differences below per-partition tolerance")
+    else:
+        result['message'] = (f"{result['levels'][-1]['differing']} days differ: "
+                             f"{transactions['mismatched']} mismatched, {transactions['source_only']} only in source, "
+                             f"{transactions['target_only']} only in target")
+    return result
+
+def print_report(result):
+    for level in result['levels']:
+        print(f"  {level['level']:<7} {level['partitions']:>6} partitions, {level['differing']} differ")
+    for item in result['differing']:
+        print(f"    {item['partition']}: source={item['source']} target={item['target']}")
+    for sample in result['transactions']['samples']:
+        print(f"    {sample['type']} id={sample['key'][0]} source={sample['source']} target={sample['target']}")
+    icon = '✓' if result['status'] == 'passed' else '✗'
+    print(f"{icon} {result['message']} ({result['rows_fetched']} rows fetched)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile a fact table ledger -> month -> day -> transaction")
+    parser.add_argument('spec', help="reconciliation spec JSON")
+    parser.add_argument('--source', help="source database, overriding the spec's connection")
+    parser.add_argument('--target', help="target database, overriding the spec's connection")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="partitions/rows to report per level")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    params = {name: value for name, value in (('start_date', args.start_date), ('end_date', args.end_date)) if value}
+    source_conn = connect(args.source or spec['source']['connection'])
+    target_conn = connect(args.target or spec['target']['connection'])
+    try:
+        result = reconcile(source_conn, target_conn, spec, params, args.max_samples)
+    finally:
+        source_conn.close()
+        target_conn.close()
+    print_report(result)
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
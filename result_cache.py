@@ -0,0 +1,353 @@
+"""
+Persistent cache of query result sets for iterative validation sessions.
+
+Re-running a checklist after fixing one test case would otherwise re-execute
+every source and target query. Results are cached in a SQLite file, keyed by
+the SHA-256 of:
+
+  * the system the query ran against (ebs, fusion, lakehouse, adw),
+  * the query with comments removed and whitespace collapsed (text inside
+    quotes is left alone),
+  * the bind values,
+  * a snapshot token for that system supplied by the caller, e.g. the
+    latest last_update_date of the tables the queries read. When the
+    token moves, every older entry for that system stops matching.
+
+Rows are stored in compressed chunks as they stream past, so caching a
+large result does not hold it in memory. Entries expire after a TTL. The
+least recently used entries are evicted once the cache grows past its size
+cap, and a whole system can be invalidated explicitly:
+
+    python result_cache.py --stats
+    python result_cache.py --invalidate ebs
+    python result_cache.py --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import instrumentation
+from validation_engine import BATCH_SIZE, query_rows
+
+CACHE_PATH = os.environ.get(
+    'REPORT_RESULT_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'report-validation-standards', 'results.sqlite')
+)
+CACHE_VERSION = 1
+MAX_BYTES = 1 << 30
+TTL = 24 * 3600
+CHUNK_ROWS = 5000
+
+# Quoted text is kept as is; comments and runs of whitespace become one space
+SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(--[^\n]*|/\*.*?\*/|\s+)", re.S)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY, system TEXT, query TEXT, columns TEXT,
+    row_count INTEGER, bytes INTEGER, created REAL, accessed REAL
+);
+CREATE INDEX IF NOT EXISTS results_system ON results (system);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS chunks (key TEXT, seq INTEGER, data BLOB, PRIMARY KEY (key, seq));
+"""
+
+def normalize_sql(sql):
+    """Drop comments, collapse whitespace and trailing semicolons outside quoted text"""
+    parts = []
+    position = 0
+    for match in SQL_TOKEN_RE.finditer(sql):
+        text = sql[position:match.start()]
+        if text:
+            parts.append(text)
+        if match.group(1) is None:
+            parts.append(match.group(0))
+        elif parts and parts[-1] != ' ':
+            parts.append(' ')
+        position = match.end()
+    parts.append(sql[position:])
+    return ''.join(parts).strip().rstrip(';').strip()
+
+def cache_key(system, sql, values, snapshot):
+    payload = json.dumps([CACHE_VERSION, system, normalize_sql(sql), list(values), snapshot], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def snapshot_token(connection, sql):
+    """Run a snapshot query (e.g. SELECT MAX(last_update_date) FROM ...) and return its value as text"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return '' if row is None or row[0] is None else str(row[0])
+
+class ResultCache:
+    """Result sets stored in one SQLite file, shared by every system"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttl=TTL):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._retired = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            if path != ':memory:':
+                self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def view(self, system, snapshot=''):
+        """A cache scoped to one system and snapshot token, as used by validation_engine"""
+        return CacheView(self, system, snapshot)
+
+    def open(self, key):
+        """(columns, row_count, rows) of a live entry, refreshing its LRU time; None if missing or expired
+
+        The entry is pinned until `rows` is exhausted, closed or collected:
+        evict(), invalidate() and a rewrite of the same key meanwhile move its
+        chunks aside instead of deleting them, so the rows are never cut short
+        or mixed with another version of the entry.
+        """
+        stream = self._stream(key)
+        entry = next(stream)
+        if entry is None:
+            return None
+        return entry + (stream,)
+
+    def _stream(self, key):
+        # Yields the entry first, then its rows one chunk at a time; pinned
+        # from the lookup until the generator finishes
+        now = time.time()
+        pin = None
+        with self._lock, self._db:
+            row = self._db.execute('SELECT columns, row_count, created FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                self._delete(key)
+            elif row is not None:
+                self._db.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+                pin = self._pins.setdefault(key, {'chunks': key, 'readers': 0})
+                pin['readers'] += 1
+        if pin is None:
+            yield None
+            return
+        try:
+            yield json.loads(row[0]), row[1]
+            seq = 0
+            while True:
+                with self._lock:
+                    data = self._db.execute('SELECT data FROM chunks WHERE key = ? AND seq = ?',
+                                            (pin['chunks'], seq)).fetchone()
+                if data is None:
+                    return
+                yield from pickle.loads(zlib.decompress(data[0]))
+                seq += 1
+        finally:
+            self._unpin(key, pin)
+
+    def _unpin(self, key, pin):
+        with self._lock, self._db:
+            pin['readers'] -= 1
+            if pin['readers']:
+                return
+            if pin['chunks'] != key:
+                del self._retired[pin['chunks']]
+                self._db.execute('DELETE FROM chunks WHERE key = ?', (pin['chunks'],))
+            elif self._pins.get(key) is pin:
+                del self._pins[key]
+
+    def write_through(self, key, system, sql, columns, rows):
+        """Yield `rows` unchanged while storing them under `key`
+
+        The entry only becomes visible once every row has been seen. Results
+        larger than the whole cache, or abandoned part way, are not kept.
+        """
+        # Chunks go under a private key until complete, so two runs filling the
+        # same entry at once cannot interleave
+        pending = f"{key}:{threading.get_ident()}:{time.monotonic_ns()}"
+        buffer = []
+        seq = 0
+        size = 0
+        count = 0
+        caching = True
+        try:
+            for row in rows:
+                count += 1
+                yield row
+                if not caching:
+                    continue
+                buffer.append(row)
+                if len(buffer) >= CHUNK_ROWS:
+                    size += self._write_chunk(pending, seq, buffer)
+                    seq += 1
+                    buffer = []
+                    if size > self.max_bytes:
+                        caching = False
+                        self._discard(pending)
+            if caching:
+                if buffer:
+                    size += self._write_chunk(pending, seq, buffer)
+                now = time.time()
+                with self._lock, self._db:
+                    self._delete(key)
+                    self._db.execute('UPDATE chunks SET key = ? WHERE key = ?', (key, pending))
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (key, system, normalize_sql(sql), json.dumps(columns), count, size, now, now)
+                    )
+                self.evict()
+        except BaseException:
+            self._discard(pending)
+            raise
+
+    def _write_chunk(self, key, seq, rows):
+        data = zlib.compress(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL), 1)
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)', (key, seq, data))
+        return len(data)
+
+    def _delete(self, key):
+        self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+        pin = self._pins.pop(key, None)
+        if pin is None:
+            self._db.execute('DELETE FROM chunks WHERE key = ?', (key,))
+            return
+        # Readers still streaming the entry follow its chunks to a key of their
+        # own; the last one to finish deletes them
+        pin['chunks'] = f"{key}:retired:{time.monotonic_ns()}"
+        self._retired[pin['chunks']] = pin
+        self._db.execute('UPDATE chunks SET key = ? WHERE key = ?', (pin['chunks'], key))
+
+    def _discard(self, key):
+        with self._lock, self._db:
+            self._delete(key)
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size cap"""
+        with self._lock, self._db:
+            expired = [key for key, in self._db.execute(
+                'SELECT key FROM results WHERE created < ?', (time.time() - self.ttl,))]
+            for key in expired:
+                self._delete(key)
+            total = self._db.execute('SELECT COALESCE(SUM(bytes), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._db.execute('SELECT key, bytes FROM results ORDER BY accessed').fetchall():
+                    self._delete(key)
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+    def invalidate(self, system=None):
+        """Drop every entry for `system` (or all entries); returns how many were dropped"""
+        with self._lock, self._db:
+            if system is None:
+                keys = [key for key, in self._db.execute('SELECT key FROM results')]
+            else:
+                keys = [key for key, in self._db.execute('SELECT key FROM results WHERE system = ?', (system,))]
+            for key in keys:
+                self._delete(key)
+            if system is None:
+                # Also clears chunks orphaned by interrupted runs, but not those readers are streaming
+                streaming = list(self._pins) + list(self._retired)
+                self._db.execute(f"DELETE FROM chunks WHERE key NOT IN ({', '.join('?' * len(streaming))})",
+                                 streaming)
+        return len(keys)
+
+    def stats(self):
+        """{system: (entries, rows, bytes)}"""
+        with self._lock:
+            return {system: (entries, rows, size) for system, entries, rows, size in self._db.execute(
+                'SELECT system, COUNT(*), SUM(row_count), SUM(bytes) FROM results GROUP BY system ORDER BY system')}
+
+class CacheView:
+    """ResultCache bound to one system and snapshot token"""
+
+    def __init__(self, cache, system, snapshot=''):
+        self.cache = cache
+        self.system = system
+        self.snapshot = snapshot
+
+    def rows(self, connection, sql, values, batch_size=BATCH_SIZE):
+        """Same contract as validation_engine.query_rows(), served from the cache when possible"""
+        key = cache_key(self.system, sql, values, self.snapshot)
+        with instrumentation.span('cache', system=self.system) as lookup:
+            entry = self.cache.open(key)
+            lookup.add(**({'hits': 1, 'rows': entry[1]} if entry is not None else {'misses': 1}))
+        if entry is not None:
+            self.cache.hits += 1
+            return entry[0], entry[2]
+        self.cache.misses += 1
+        columns, rows = query_rows(connection, sql, values, batch_size)
+        return columns, self.cache.write_through(key, self.system, sql, columns, rows)
+
+def add_cache_arguments(parser):
+    """The --cache/--snapshot options shared by validation_engine.py and checklist_runner.py"""
+    parser.add_argument('--cache', nargs='?', const=CACHE_PATH, metavar='PATH',
+                        help=f"reuse cached result sets (default file: {CACHE_PATH})")
+    parser.add_argument('--snapshot', action='append', default=[], metavar='SYSTEM=TOKEN',
+                        help="snapshot token for a system's cached results (repeatable)")
+    parser.add_argument('--snapshot-query', action='append', default=[], metavar='SYSTEM=SQL',
+                        help="query whose result is the system's snapshot token (repeatable)")
+    parser.add_argument('--cache-ttl', type=float, default=TTL, help="seconds a cached result stays valid")
+    parser.add_argument('--cache-max-mb', type=float, default=MAX_BYTES / (1 << 20), help="cache size cap in MB")
+
+def snapshot_tokens(args, connection_for):
+    """{system: token} from --snapshot and --snapshot-query
+
+    `connection_for(system)` is a context manager yielding a connection the
+    snapshot query can run on.
+    """
+    tokens = dict(value.split('=', 1) for value in args.snapshot)
+    for value in args.snapshot_query:
+        system, sql = value.split('=', 1)
+        with connection_for(system) as connection:
+            tokens[system] = snapshot_token(connection, sql)
+    return tokens
+
+def open_cache(args):
+    """The ResultCache selected by add_cache_arguments() options, or None"""
+    if not args.cache:
+        return None
+    return ResultCache(args.cache, int(args.cache_max_mb * (1 << 20)), args.cache_ttl)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the query result cache")
+    parser.add_argument('--path', default=CACHE_PATH, help="cache file")
+    parser.add_argument('--invalidate', action='append', metavar='SYSTEM', help="drop every entry for a system")
+    parser.add_argument('--clear', action='store_true', help="drop every entry")
+    parser.add_argument('--stats', action='store_true', help="show entries per system")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.path)
+    try:
+        if args.clear:
+            print(f"✓ Dropped {cache.invalidate()} cached results")
+        for system in args.invalidate or []:
+            print(f"✓ Dropped {cache.invalidate(system)} cached results for {system}")
+        if args.stats or not (args.clear or args.invalidate):
+            stats = cache.stats()
+            if not stats:
+                print(f"{args.path}: empty")
+            for system, (entries, rows, size) in stats.items():
+                print(f"{system}: {entries} results, {rows} rows, {size / (1 << 20):.1f} MB")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
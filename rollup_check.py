@@ -0,0 +1,279 @@
+"""
+Drill-down hierarchy roll-up check in one streaming pass over the lines.
+
+The Drill Down check (Ledger -> Account -> Journal -> Line) used to be one
+query per level per parameter set. Here the line-level rows are read once,
+sorted on the hierarchy columns, and every level is totalled with a stack,
+like ROLLUP: when the key at some level changes, the nodes below it are
+closed and their totals are added to their parents. Only one open node per
+level is held at a time, so memory does not depend on the number of leaves.
+
+As each node closes it is checked against the report:
+
+  * value   - the report's figure for the node differs from the lines
+  * missing - the report has no row for a node the lines have
+  * extra   - the report has a row the lines do not
+  * rollup  - the report's parent differs from the sum of the report's
+              own children
+
+The report's figures for a level come from a query sorted the same way as
+the lines, and it is merged against the closing nodes as they arrive.
+Drill-through queries can also be given per level. They run with the node's
+path bound as :level parameters, for every broken node and a reservoir
+sample of the rest, and must return the node's (count, sum) or sum.
+
+Streams must be sorted on the hierarchy columns in binary order (ORDER BY
+1, 2, ... with a binary collation).
+
+    python rollup_check.py --source sqlite:///ebs.db \\
+        --lines "SELECT ledger, account, journal, amount FROM gl_lines ORDER BY 1, 2, 3" \\
+        --levels ledger,account,journal --target sqlite:///dw.db \\
+        --reported "ledger=SELECT ledger, amount FROM rpt_ledger ORDER BY 1" \\
+        --reported "account=SELECT ledger, account, amount FROM rpt_account ORDER BY 1, 2" \\
+        --drill "journal=SELECT COUNT(*), SUM(amount) FROM dw_lines WHERE ledger = :ledger AND account = :account AND journal = :journal"
+"""
+
+import argparse
+import random
+import sys
+
+from validation_engine import MAX_SAMPLES, bind_params, connect, query_rows
+
+TOLERANCE = 0.005
+DRILL_SAMPLE = 20
+
+def sort_key(path):
+    """Binary sort order of a path: NULLs first, then numbers, then text by code point"""
+    return tuple((0, 0) if v is None else (1, v) if isinstance(v, (int, float)) else (2, str(v)) for v in path)
+
+def close_enough(a, b, tolerance=TOLERANCE):
+    return abs((a or 0) - (b or 0)) <= tolerance
+
+class SortedLookup:
+    """Merge-join cursor over sorted (path, value) rows of one reported level"""
+
+    def __init__(self, rows, on_extra):
+        self.rows = iter(rows)
+        self.on_extra = on_extra
+        self.current = None
+        self.previous = None
+        self._advance()
+
+    def _advance(self):
+        row = next(self.rows, None)
+        if row is not None:
+            key = sort_key(row[0])
+            if self.previous is not None and key < self.previous:
+                raise ValueError(f"Reported rows are not sorted on the hierarchy columns at {list(row[0])}")
+            self.previous = key
+        self.current = row
+
+    def find(self, path):
+        """Reported value for `path`, or None; rows skipped on the way are reported as extra"""
+        key = sort_key(path)
+        while self.current is not None and sort_key(self.current[0]) < key:
+            self.on_extra(self.current)
+            self._advance()
+        if self.current is not None and tuple(self.current[0]) == tuple(path):
+            value = self.current[1]
+            self._advance()
+            return value
+        return None
+
+    def drain(self):
+        while self.current is not None:
+            self.on_extra(self.current)
+            self._advance()
+
+def check_rollup(lines, levels, reported=None, tolerance=TOLERANCE, max_samples=MAX_SAMPLES,
+                 sample_size=DRILL_SAMPLE, seed=0):
+    """Roll `lines` ((path..., amount) rows sorted on the path) up through `levels`
+
+    `reported` maps a level name to sorted (path, value) rows from the report.
+    Returns a result dict with per-level counts, broken nodes and a sample
+    of nodes per level for drill-through checks.
+    """
+    reported = reported or {}
+    depth = len(levels)
+    result = {
+        'lines': 0, 'total': 0.0,
+        'levels': [{'level': name, 'nodes': 0, 'broken': 0} for name in levels],
+        'broken': [], 'samples': {name: [] for name in levels}
+    }
+    rng = random.Random(seed)
+
+    def broken(kind, level, path, **values):
+        result['levels'][level]['broken'] += 1
+        if len(result['broken']) < max_samples:
+            result['broken'].append(dict({'type': kind, 'level': levels[level], 'path': list(path)}, **values))
+
+    def level_rows(rows, level):
+        for row in rows:
+            yield tuple(row[:level + 1]), row[level + 1]
+
+    lookups = {}
+    for level, name in enumerate(levels):
+        if name in reported:
+            lookups[level] = SortedLookup(
+                level_rows(reported[name], level),
+                lambda row, level=level: broken('extra', level, row[0], reported=row[1])
+            )
+
+    # One open node per level: [path, total, count, sum of reported children, any child unreported]
+    stack = []
+
+    def close(level):
+        path, total, count, children, gap = stack.pop()
+        info = result['levels'][level]
+        info['nodes'] += 1
+        if stack:
+            stack[-1][1] += total
+            stack[-1][2] += count
+        else:
+            result['total'] += total
+        value = None
+        if level in lookups:
+            value = lookups[level].find(path)
+            if value is None:
+                broken('missing', level, path, lines=total)
+            elif not close_enough(total, value, tolerance):
+                broken('value', level, path, lines=total, reported=value)
+            if level + 1 in lookups and value is not None and not gap and not close_enough(value, children, tolerance):
+                broken('rollup', level, path, reported=value, children=children)
+            if stack:
+                if value is None:
+                    stack[-1][4] = True
+                else:
+                    stack[-1][3] += value
+        elif stack:
+            stack[-1][4] = True
+        # Reservoir sample of nodes for drill-through checks
+        sample = result['samples'][levels[level]]
+        node = {'path': list(path), 'lines': total, 'count': count}
+        if len(sample) < sample_size:
+            sample.append(node)
+        else:
+            slot = rng.randrange(info['nodes'])
+            if slot < sample_size:
+                sample[slot] = node
+
+    previous = None
+    for row in lines:
+        path, amount = tuple(row[:depth]), row[depth] or 0
+        key = sort_key(path)
+        if previous is not None and key < previous:
+            raise ValueError(f"Line rows are not sorted on {', '.join(levels)} at {list(path)}")
+        previous = key
+        common = 0
+        while common < len(stack) and stack[common][0][common] == path[common]:
+            common += 1
+        while len(stack) > common:
+            close(len(stack) - 1)
+        while len(stack) < depth:
+            stack.append([path[:len(stack) + 1], 0.0, 0, 0.0, False])
+        stack[-1][1] += amount
+        stack[-1][2] += 1
+        result['lines'] += 1
+    while stack:
+        close(len(stack) - 1)
+    for lookup in lookups.values():
+        lookup.drain()
+    return result
+
+def check_drill_through(connection, levels, drills, result, params, tolerance=TOLERANCE, max_samples=MAX_SAMPLES):
+    """Run each level's drill-through query for its sampled and broken nodes; adds 'drill' breaks"""
+    checked = 0
+    drilled = []
+    for level, name in enumerate(levels):
+        if name not in drills:
+            continue
+        nodes = list(result['samples'][name])
+        nodes += [{'path': b['path'], 'lines': b['lines'], 'count': None}
+                  for b in result['broken'] if b['level'] == name and 'lines' in b]
+        for node in nodes:
+            bound = dict(params, **dict(zip(levels, node['path'])))
+            sql, values = bind_params(drills[name], bound)
+            _, rows = query_rows(connection, sql, values)
+            row = next(rows, None) or (0,)
+            rows.close()
+            count, total = (row[0], row[1]) if len(row) > 1 else (None, row[0])
+            checked += 1
+            if not close_enough(total, node['lines'], tolerance) or (
+                    count is not None and node['count'] is not None and count != node['count']):
+                result['levels'][level]['broken'] += 1
+                drilled.append({'type': 'drill', 'level': name, 'path': node['path'],
+                                'lines': node['lines'], 'drill': total,
+                                'line_count': node['count'], 'drill_count': count})
+    result['broken'].extend(drilled[:max(0, max_samples - len(result['broken']))])
+    return checked
+
+def parse_level_option(values, levels, option):
+    parsed = {}
+    for value in values:
+        name, _, sql = value.partition('=')
+        if name not in levels or not sql:
+            raise ValueError(f"{option} must look like LEVEL=SQL with LEVEL one of {', '.join(levels)}: {value!r}")
+        parsed[name] = sql
+    return parsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Check drill-down roll-ups in one pass over the line-level data")
+    parser.add_argument('--source', required=True, help="database holding the line-level data")
+    parser.add_argument('--lines', required=True, help="query returning the hierarchy columns then the amount, sorted")
+    parser.add_argument('--levels', required=True, help="comma-separated hierarchy level names, top first")
+    parser.add_argument('--target', help="database the reported and drill-through queries run on (default: --source)")
+    parser.add_argument('--reported', action='append', default=[], metavar='LEVEL=SQL',
+                        help="sorted query returning the level's path columns then the reported amount")
+    parser.add_argument('--drill', action='append', default=[], metavar='LEVEL=SQL',
+                        help="drill-through query for a level, parameterised by :<level> names")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--drill-sample', type=int, default=DRILL_SAMPLE, help="nodes per level to drill through")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed absolute difference")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="broken nodes to report")
+    args = parser.parse_args()
+
+    levels = [name.strip() for name in args.levels.split(',') if name.strip()]
+    reported_sql = parse_level_option(args.reported, levels, '--reported')
+    drills = parse_level_option(args.drill, levels, '--drill')
+    params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+
+    source_conn = connect(args.source)
+    target_conn = connect(args.target) if args.target else source_conn
+    level_conns = []
+    streams = []
+    try:
+        sql, values = bind_params(args.lines, params)
+        _, lines = query_rows(source_conn, sql, values)
+        streams.append(lines)
+        reported = {}
+        for name, level_sql in reported_sql.items():
+            # Each level is read in step with the others, so each gets its own connection
+            level_conns.append(connect(args.target or args.source))
+            sql, values = bind_params(level_sql, params)
+            reported[name] = query_rows(level_conns[-1], sql, values)[1]
+            streams.append(reported[name])
+        result = check_rollup(lines, levels, reported, args.tolerance, args.max_samples, args.drill_sample)
+        drilled = check_drill_through(target_conn, levels, drills, result, params, args.tolerance, args.max_samples)
+    finally:
+        for rows in streams:
+            rows.close()
+        for connection in level_conns:
+            connection.close()
+        source_conn.close()
+        if target_conn is not source_conn:
+            target_conn.close()
+
+    print(f"  {result['lines']:,} lines, total {result['total']:,.2f}")
+    for level in result['levels']:
+        icon = '✓' if not level['broken'] else '✗'
+        print(f"{icon} {level['level']}: {level['nodes']:,} nodes, {level['broken']} broken")
+    for node in result['broken'][:args.max_samples]:
+        details = ', '.join(f"{k}={v}" for k, v in node.items() if k not in ('type', 'level', 'path'))
+        print(f"    {node['type']} {node['level']} {' > '.join(str(p) for p in node['path'])}: {details}")
+    if drills:
+        print(f"  {drilled} drill-through queries run")
+    return 0 if not any(level['broken'] for level in result['levels']) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Effective-date checks for slowly changing (type 2) dimensions.
+
+"Confirm proper handling of nulls, effective dates, primary keys" and the
+"Effective-date based changes" edge case come down to: for each business
+key, the effective-dated rows must follow on from each other with no
+overlap and no gap, and at most one of them may be current. A self-join
+does that in quadratic time. Here the rows are sorted by business key and
+start date, with an external merge sort once they exceed --sort-rows (runs
+are spilled to a temp directory like validation_engine's HashSpill), and
+checked in one sweep holding only the current key's state:
+
+  * invalid  - no start date, a date that cannot be read, or an end
+               before the start
+  * overlap  - a row starts before the previous one has ended
+  * gap      - a row starts later than the day after the previous end
+  * current  - more than one current row, or the current row is not the
+               latest one
+
+End dates are inclusive by default, as in EBS (effective_end_date is the
+day before the next start); use --end-exclusive when the end equals the
+next start. A NULL end, or one on or after 4712-12-31, is open. Without
+--current, rows with an open end are the current ones.
+
+    python scd2_check.py --source sqlite:///dw.db \\
+        --query "SELECT supplier_id, effective_start_date, effective_end_date, current_flag FROM supplier_dim" \\
+        --key supplier_id --start effective_start_date --end effective_end_date --current current_flag
+"""
+
+import argparse
+import datetime
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+
+from validation_engine import (
+    BATCH_SIZE, MAX_SAMPLES, SPILL_ROWS, bind_params, connect, key_positions, normalize, query_rows
+)
+
+HIGH_DATE = datetime.datetime(4712, 12, 31)
+OPEN = datetime.datetime.max
+CURRENT_VALUES = ('Y', 'YES', '1', 'T', 'TRUE', 'CURRENT')
+ISSUE_TYPES = ('invalid', 'overlap', 'gap', 'current')
+RUN_CHUNK = 10000
+
+def to_datetime(value):
+    """datetime for a date, datetime or ISO text value; None stays None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    return datetime.datetime.fromisoformat(str(value).strip().replace('Z', ''))
+
+def is_current(value):
+    return value is not None and str(value).strip().upper() in CURRENT_VALUES
+
+def sort_key(key):
+    """Orders NULL key parts first, then numbers, then text, without comparing across types"""
+    return tuple((-1, '') if v is None else (0, v) if isinstance(v, (int, float)) else (1, str(v)) for v in key)
+
+def show(moment):
+    return 'open' if moment == OPEN else normalize(moment)
+
+def records(rows, positions, start, end, current, invalid):
+    """(sort key, start, end, current, key) per row; rows with bad dates go to invalid(key, start, end)"""
+    for row in rows:
+        key = tuple(normalize(row[i]) for i in positions)
+        try:
+            begins, ends = to_datetime(row[start]), to_datetime(row[end])
+        except (TypeError, ValueError):
+            invalid(key, row[start], row[end])
+            continue
+        if ends is None or ends >= HIGH_DATE:
+            ends = OPEN
+        if begins is None or ends < begins:
+            invalid(key, row[start], row[end])
+            continue
+        flag = is_current(row[current]) if current is not None else ends == OPEN
+        yield sort_key(key), begins, ends, flag, key
+
+def _write_run(directory, number, rows):
+    path = os.path.join(directory, f"run-{number}.pkl")
+    with open(path, 'wb') as f:
+        for i in range(0, len(rows), RUN_CHUNK):
+            pickle.dump(rows[i:i + RUN_CHUNK], f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+def external_sort(items, directory, sort_rows=SPILL_ROWS):
+    """Yield `items` in order, spilling sorted runs of `sort_rows` to `directory` and merging them"""
+    runs = []
+    buffer = []
+    for item in items:
+        buffer.append(item)
+        if len(buffer) >= sort_rows:
+            buffer.sort()
+            runs.append(_write_run(directory, len(runs), buffer))
+            buffer = []
+    buffer.sort()
+    if not runs:
+        yield from buffer
+        return
+    yield from heapq.merge(*(_read_run(path) for path in runs), buffer)
+
+def sweep(ordered, end_inclusive=True, flagged=False, on_issue=None):
+    """Check intervals ordered by (key, start) in one pass; calls on_issue(type, key, intervals)
+
+    `flagged` means the current flags come from a column rather than from
+    open ends, so a current row that is not the latest one is also reported.
+    Returns the number of keys seen.
+    """
+    step = datetime.timedelta(days=1) if end_inclusive else datetime.timedelta(0)
+    keys = 0
+    group = None
+    latest = None           # interval with the latest end so far for this key
+    last = None
+    currents = []
+
+    def finish():
+        if len(currents) > 1:
+            on_issue('current', group[1], [(show(b), show(e)) for b, e in currents])
+        elif flagged and currents and currents[0] != last:
+            on_issue('current', group[1], [(show(b), show(e)) for b, e in (currents[0], last)])
+
+    previous = None
+    for record in ordered:
+        order, begins, ends, flag, key = record
+        if previous is not None and (order, begins) < previous:
+            raise ValueError(f"Rows are not sorted by key and start date at {list(key)} {show(begins)}")
+        previous = (order, begins)
+        if group is None or group[0] != order:
+            if group is not None:
+                finish()
+            group = (order, key)
+            keys += 1
+            latest = None
+            currents = []
+        interval = (begins, ends)
+        if latest is not None:
+            expected = OPEN if latest[1] == OPEN else latest[1] + step
+            if begins < expected:
+                on_issue('overlap', key, [(show(b), show(e)) for b, e in (latest, interval)])
+            elif begins > expected:
+                on_issue('gap', key, [(show(b), show(e)) for b, e in (latest, interval)])
+        if latest is None or ends >= latest[1]:
+            latest = interval
+        last = interval
+        if flag:
+            currents.append(interval)
+    if group is not None:
+        finish()
+    return keys
+
+def check_scd2(rows, columns, key_columns, start, end, current=None, end_inclusive=True,
+               sort_rows=SPILL_ROWS, presorted=False, max_samples=MAX_SAMPLES):
+    """Check the effective-dated `rows` (with column names `columns`); returns a result dict"""
+    positions = key_positions(key_columns, columns)
+    start, end = key_positions([start, end], columns)
+    current = key_positions([current], columns)[0] if current is not None else None
+    result = {'rows': 0, 'keys': 0, 'counts': dict.fromkeys(ISSUE_TYPES, 0), 'issues': []}
+
+    def on_issue(kind, key, intervals):
+        result['counts'][kind] += 1
+        if len(result['issues']) < max_samples:
+            result['issues'].append({'type': kind, 'key': list(key), 'intervals': intervals})
+
+    def counted(rows):
+        for row in rows:
+            result['rows'] += 1
+            yield row
+
+    items = records(counted(rows), positions, start, end, current,
+                    lambda key, begins, ends: on_issue('invalid', key, [(normalize(begins), normalize(ends))]))
+    if presorted:
+        result['keys'] = sweep(items, end_inclusive, current is not None, on_issue)
+    else:
+        with tempfile.TemporaryDirectory(prefix='scd2-') as directory:
+            result['keys'] = sweep(external_sort(items, directory, sort_rows), end_inclusive,
+                                   current is not None, on_issue)
+    result['status'] = 'failed' if any(result['counts'].values()) else 'passed'
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Find overlapping, gapped and multiply-current SCD2 rows")
+    parser.add_argument('--source', required=True, help="database holding the dimension")
+    parser.add_argument('--query', required=True, help="query returning the key, start, end (and current) columns")
+    parser.add_argument('--key', action='append', required=True, help="business key column name or position")
+    parser.add_argument('--start', required=True, help="effective start column")
+    parser.add_argument('--end', required=True, help="effective end column")
+    parser.add_argument('--current', help="current flag column (Y/1/true); default: rows with an open end")
+    parser.add_argument('--end-exclusive', action='store_true', help="the end date equals the next row's start")
+    parser.add_argument('--presorted', action='store_true', help="the query already orders by key and start date")
+    parser.add_argument('--sort-rows', type=int, default=SPILL_ROWS, help="rows sorted in memory per spilled run")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows per fetchmany() call")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="offending keys to report")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in (('start_date', args.start_date), ('end_date', args.end_date)) if v}
+    connection = connect(args.source)
+    rows = None
+    try:
+        sql, values = bind_params(args.query, params)
+        columns, rows = query_rows(connection, sql, values, args.batch_size)
+        result = check_scd2(rows, columns, args.key, args.start, args.end, args.current, not args.end_exclusive,
+                            args.sort_rows, args.presorted, args.max_samples)
+    finally:
+        if rows is not None:
+            rows.close()
+        connection.close()
+
+    icon = '✓' if result['status'] == 'passed' else '✗'
+    counts = ', '.join(f"{count} {kind}" for kind, count in result['counts'].items())
+    print(f"{icon} {result['rows']:,} rows, {result['keys']:,} keys: {counts}")
+    for issue in result['issues']:
+        intervals = '; '.join(f"{begins} .. {ends}" for begins, ends in issue['intervals'])
+        print(f"    {issue['type']} {', '.join(str(k) for k in issue['key'])}: {intervals}")
+    return 0 if result['status'] == 'passed' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
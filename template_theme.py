@@ -0,0 +1,152 @@
+"""
+Read slide size, theme colours and theme fonts straight from a .pptx template.
+
+Only ppt/presentation.xml, the first slide master's relationships and its
+theme part are parsed, so the template never goes through Presentation().
+Results are cached on disk under the SHA-256 of the template file, so a warm
+run costs one hash of the file and a small JSON read.
+
+    theme = load_template_theme('SamplePPT.pptx')
+    theme['slide_width'], theme['colors']['accent1'], theme['fonts']['minor']
+
+apply_theme_fonts() writes the template's fonts into a python-pptx deck's own
+theme, which every text box the generators draw inherits its font from;
+theme_fonts() reads them back.
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from checklist import write_atomic
+
+CACHE_DIR = os.environ.get(
+    'REPORT_THEME_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'report-validation-standards', 'themes')
+)
+CACHE_VERSION = 1
+
+NS = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'
+}
+RT_SLIDE_MASTER = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideMaster'
+RT_THEME = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme'
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _rels_path(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, '_rels', name + '.rels')
+
+def _related_part(zf, part_name, rel_type):
+    """Return the part name of the first `rel_type` relationship of `part_name`"""
+    rels = ET.fromstring(zf.read(_rels_path(part_name)))
+    for rel in rels.findall('rel:Relationship', NS):
+        if rel.get('Type') == rel_type:
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join(posixpath.dirname(part_name), target))
+    return None
+
+def _scheme_color(element):
+    """Hex RGB of a clrScheme entry (srgbClr, or a sysClr's lastClr)"""
+    for child in element:
+        if child.tag == '{%s}srgbClr' % NS['a']:
+            return child.get('val').upper()
+        if child.tag == '{%s}sysClr' % NS['a'] and child.get('lastClr'):
+            return child.get('lastClr').upper()
+    return None
+
+def parse_template_theme(path):
+    """Parse slide size, colour scheme and font scheme from the template's XML"""
+    with zipfile.ZipFile(path) as zf:
+        presentation = ET.fromstring(zf.read('ppt/presentation.xml'))
+        size = presentation.find('p:sldSz', NS)
+        theme = {
+            'slide_width': int(size.get('cx')),
+            'slide_height': int(size.get('cy')),
+            'colors': {},
+            'fonts': {}
+        }
+
+        master = _related_part(zf, 'ppt/presentation.xml', RT_SLIDE_MASTER)
+        theme_part = _related_part(zf, master, RT_THEME) if master else None
+        if theme_part is None:
+            return theme
+        root = ET.fromstring(zf.read(theme_part))
+
+    scheme = root.find('.//a:clrScheme', NS)
+    if scheme is not None:
+        for element in scheme:
+            color = _scheme_color(element)
+            if color:
+                theme['colors'][element.tag.split('}')[1]] = color
+    for name in ('major', 'minor'):
+        latin = root.find(f'.//a:fontScheme/a:{name}Font/a:latin', NS)
+        if latin is not None:
+            theme['fonts'][name] = latin.get('typeface')
+    return theme
+
+def load_template_theme(path, cache_dir=CACHE_DIR):
+    """Return the template's theme, from the content-hash cache when possible"""
+    key = file_sha256(path)
+    cache_file = os.path.join(cache_dir, f"{key}.json")
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == CACHE_VERSION:
+            return cached['theme']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    theme = parse_template_theme(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        payload = json.dumps({'version': CACHE_VERSION, 'template': os.path.basename(path), 'theme': theme})
+        write_atomic(cache_file, lambda f: f.write(payload.encode('utf-8')))
+    except OSError:
+        # A read-only cache location only costs us the warm-run speed-up
+        pass
+    return theme
+
+def _deck_theme(prs):
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+    return prs.slide_master.part.part_related_by(RT.THEME)
+
+def theme_fonts(prs):
+    """{'major', 'minor'} Latin typefaces of a python-pptx Presentation's theme"""
+    from lxml import etree
+
+    root = etree.fromstring(_deck_theme(prs).blob)
+    fonts = {}
+    for name in ('major', 'minor'):
+        latin = root.find(f'.//a:fontScheme/a:{name}Font/a:latin', NS)
+        if latin is not None:
+            fonts[name] = latin.get('typeface')
+    return fonts
+
+def apply_theme_fonts(prs, fonts):
+    """Set the major/minor Latin typefaces of a python-pptx Presentation's theme to `fonts`"""
+    from lxml import etree
+
+    if not fonts:
+        return
+    part = _deck_theme(prs)
+    root = etree.fromstring(part.blob)
+    for name, typeface in fonts.items():
+        latin = root.find(f'.//a:fontScheme/a:{name}Font/a:latin', NS)
+        if latin is not None and typeface:
+            latin.set('typeface', typeface)
+    # The theme is a plain Part; python-pptx has no public way to replace its XML
+    part._blob = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
@@ -0,0 +1,38 @@
+"""
+Grid measures and grand totals of aggregation_check against source facts.
+
+    python -m pytest test_aggregation_check.py
+"""
+
+import numpy as np
+import pytest
+
+from aggregation_check import check_aggregations, parse_measure
+
+MEASURES = [parse_measure('Amount=SUM(amount)')]
+GROUPS = [('Supplier', 'supplier')]
+SOURCE = {'supplier': np.array(['A', 'A', 'B', None, None], dtype=object),
+          'amount': np.array([4.0, 6.0, 20.0, 2.0, 3.0])}
+
+def grid(rows):
+    return {'Supplier': np.array([key for key, _ in rows], dtype=object),
+            'Amount': np.array([amount for _, amount in rows], dtype=object)}
+
+@pytest.mark.parametrize('blank', ['', '(Blank)'])
+def test_blank_group_is_the_null_group(blank):
+    result = check_aggregations(grid([('A', '10'), ('B', '20'), (blank, '5'), ('Total', '35')]),
+                                GROUPS, SOURCE, MEASURES)
+    assert result['status'] == 'passed'
+    assert result['groups']['missing_in_grid'] == []
+    assert [(total['grid'], total['source']) for total in result['totals']] == [(35.0, 35.0)]
+
+def test_wrong_grand_total_fails():
+    result = check_aggregations(grid([('A', '10'), ('B', '20'), ('', '5'), ('Grand Total', '36')]),
+                                GROUPS, SOURCE, MEASURES)
+    assert result['status'] == 'failed'
+    assert not result['totals'][0]['rows_ok'] and not result['totals'][0]['source_ok']
+
+def test_accounting_dash_is_zero():
+    source = {'supplier': np.array(['A', 'B'], dtype=object), 'amount': np.array([10.0, 0.0])}
+    result = check_aggregations(grid([('A', '$ 10.00'), ('B', '$ -')]), GROUPS, source, MEASURES)
+    assert result['status'] == 'passed'
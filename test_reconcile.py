@@ -0,0 +1,55 @@
+"""
+Ledger -> month -> day drill-down of reconcile() on small SQLite tables.
+
+    python -m pytest test_reconcile.py
+"""
+
+import datetime
+import sqlite3
+
+import pytest
+
+from reconcile import reconcile
+
+SIDE = {'table': 'invoices', 'ledger': 'ledger_id', 'date': 'invoice_date', 'id': 'invoice_id',
+        'amounts': ['amount']}
+SPEC = {'source': SIDE, 'target': SIDE}
+
+def database(rows):
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE invoices (invoice_id, ledger_id, invoice_date, amount)')
+    connection.executemany('INSERT INTO invoices VALUES (?, ?, ?, ?)', rows)
+    return connection
+
+def daily_rows(days, amount, ledger=1):
+    start = datetime.date(2024, 1, 1)
+    return [(day, ledger, (start + datetime.timedelta(days=day)).isoformat(), amount) for day in range(days)]
+
+@pytest.fixture
+def source():
+    connection = database(daily_rows(100, 10.0))
+    yield connection
+    connection.close()
+
+def test_matching_tables_pass(source):
+    target = database(daily_rows(100, 10.0))
+    result = reconcile(source, target, SPEC, {})
+    assert result['status'] == 'passed'
+    assert [level['level'] for level in result['levels']] == ['ledger']
+
+def test_transaction_differences_are_found(source):
+    rows = daily_rows(100, 10.0)
+    rows[40] = rows[40][:3] + (12.5,)
+    result = reconcile(source, database(rows), SPEC, {})
+    assert result['status'] == 'failed'
+    assert result['transactions']['mismatched'] == 1
+    assert result['transactions']['samples'][0]['key'] == [40]
+
+def test_differences_below_partition_tolerance_add_up(source):
+    # 0.004 a day is within the half-cent tolerance of every day, but 0.40 on the ledger
+    result = reconcile(source, database(daily_rows(100, 10.004)), SPEC, {})
+    assert result['status'] == 'failed'
+    assert [level['differing'] for level in result['levels']] == [1, 4, 0]
+    assert [item['partition'][1] for item in result['differing']] == ['2024-01', '2024-02', '2024-03', '2024-04']
+    assert 'below per-partition tolerance' in result['message']
+    assert result['transactions']['mismatched'] == 0
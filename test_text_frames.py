@@ -0,0 +1,75 @@
+"""
+The consolidated text frames of both generator scripts must put every line
+where the per-line text boxes of the original output put it. The expected
+positions are read from the geometry of those boxes, not from the line
+height model text_positions() uses for the consolidated frames.
+
+    python -m pytest test_text_frames.py
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('pptx')
+
+import create_presentation
+import create_presentation_enhanced
+from text_frames import (
+    DEFAULT_INSETS, EMU_PER_INCH, NS, PARITY_TOLERANCE, _paragraph_size, leading_indent, shape_counts, text_positions
+)
+
+def line_boxes(path):
+    """Per slide, (text, x, y) in inches of every text box holding a single line, from its offset and insets"""
+    slides = []
+    with zipfile.ZipFile(path) as zf:
+        names = sorted((n for n in zf.namelist() if n.startswith('ppt/slides/slide') and n.endswith('.xml')),
+                       key=lambda n: int(n[len('ppt/slides/slide'):-len('.xml')]))
+        for name in names:
+            boxes = []
+            for sp in ET.fromstring(zf.read(name)).iter('{%s}sp' % NS['p']):
+                off = sp.find('p:spPr/a:xfrm/a:off', NS)
+                body = sp.find('p:txBody', NS)
+                if off is None or body is None:
+                    continue
+                paragraphs = body.findall('a:p', NS)
+                text = ''.join(t.text or '' for t in paragraphs[0].iter('{%s}t' % NS['a']))
+                if len(paragraphs) != 1 or not text.strip():
+                    continue
+                bodyPr = body.find('a:bodyPr', NS)
+                x = int(off.get('x')) + int(bodyPr.get('lIns', DEFAULT_INSETS[0])) \
+                    + leading_indent(text, _paragraph_size(paragraphs[0]))
+                y = int(off.get('y')) + int(bodyPr.get('tIns', DEFAULT_INSETS[1]))
+                boxes.append((text.strip(), x / EMU_PER_INCH, y / EMU_PER_INCH))
+            slides.append(boxes)
+    return slides
+
+@pytest.mark.parametrize('module', [create_presentation, create_presentation_enhanced],
+                         ids=lambda module: module.__name__)
+def test_consolidated_lines_start_where_line_boxes_did(module, tmp_path):
+    shapes_file = str(tmp_path / 'shapes.pptx')
+    frames_file = str(tmp_path / 'frames.pptx')
+    module.create_validation_presentation(output_file=shapes_file)
+    module.create_validation_presentation(output_file=frames_file, consolidated=True)
+
+    expected = line_boxes(shapes_file)
+    actual = text_positions(frames_file)
+    assert len(actual) == len(expected)
+    problems = []
+    for index, (boxes, positions) in enumerate(zip(expected, actual), 1):
+        missing = Counter(t for t, _, _ in boxes) - Counter(t for t, _, _ in positions)
+        if missing:
+            problems.append(f"slide {index}: missing {sorted(missing)}")
+            continue
+        found = {}
+        for text, x, y in positions:
+            found.setdefault(text, []).append((x, y))
+        for text, x, y in boxes:
+            if not any(abs(x - fx) <= PARITY_TOLERANCE and abs(y - fy) <= PARITY_TOLERANCE
+                       for fx, fy in found[text]):
+                problems.append(f"slide {index}: {text[:50]!r} at ({x:.3f}, {y:.3f}), "
+                                f"consolidated at {found[text]}")
+    assert not problems, '\n'.join(problems)
+    assert sum(shape_counts(frames_file)) < sum(shape_counts(shapes_file))
@@ -0,0 +1,169 @@
+"""
+Consolidated text frames: one text box per block of lines instead of one
+text box per line.
+
+add_text_block() draws a list of lines as paragraphs of a single text frame.
+Each paragraph gets a space-before that keeps it on the same pitch the
+per-line text boxes used, blank spacer lines become extra space instead of
+empty shapes, and indented lines ("   • ...") become level-1 paragraphs whose
+left margin matches the stripped leading spaces.
+
+text_positions() reads a saved deck and works out where each line of text
+starts, so two decks can be compared (test_text_frames.py checks the
+consolidated decks against the per-line boxes of the original ones):
+
+    python text_frames.py shapes.pptx frames.pptx
+"""
+
+import argparse
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+EMU_PER_INCH = 914400
+EMU_PER_PT = 12700
+LINE_HEIGHT_EM = 1.2        # single-spaced line height of the theme font
+SPACE_EM = 0.25             # width of a space, used to turn leading spaces into a margin
+DEFAULT_FONT_SIZE = 18
+DEFAULT_INSETS = (91440, 45720)     # text frame left/top insets in EMU
+PARITY_TOLERANCE = 0.02             # inches
+
+NS = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'
+}
+
+def line(text, size, bold=False, italic=False, color=None, indent=None):
+    """One line of a text block; `indent` (EMU) defaults to the width of its leading spaces"""
+    return {'text': text, 'size': size, 'bold': bold, 'italic': italic, 'color': color, 'indent': indent}
+
+def leading_indent(text, size):
+    """EMU width of the leading spaces of `text` at `size` points"""
+    spaces = len(text) - len(text.lstrip(' '))
+    return int(spaces * size * SPACE_EM * EMU_PER_PT)
+
+def add_text_block(slide, left, top, width, pitch, lines):
+    """Add `lines` as paragraphs of one text box, one line every `pitch` EMU"""
+    from pptx.util import Pt
+
+    if not any(l['text'].strip() for l in lines):
+        return None
+    txBox = slide.shapes.add_textbox(left, top, width, pitch * max(len(lines), 1))
+    tf = txBox.text_frame
+    gap = 0
+    previous = None
+    for l in lines:
+        if not l['text'].strip():
+            gap += pitch
+            continue
+        p = tf.paragraphs[0] if previous is None else tf.add_paragraph()
+        p.text = l['text'].lstrip(' ')
+        indent = l['indent'] if l['indent'] is not None else leading_indent(l['text'], l['size'])
+        if indent:
+            p.level = 1
+            pPr = p._p.get_or_add_pPr()
+            pPr.set('marL', str(indent))
+            pPr.set('indent', '0')
+        space_before = gap if previous is None else max(0, gap + pitch - Pt(previous['size'] * LINE_HEIGHT_EM))
+        if space_before:
+            p.space_before = space_before
+        p.font.size = Pt(l['size'])
+        if l['bold']:
+            p.font.bold = True
+        if l['italic']:
+            p.font.italic = True
+        if l['color'] is not None:
+            p.font.color.rgb = l['color']
+        gap = 0
+        previous = l
+    return txBox
+
+def _paragraph_size(p):
+    for path in ('a:pPr/a:defRPr', 'a:r/a:rPr', 'a:endParaRPr'):
+        rPr = p.find(path, NS)
+        if rPr is not None and rPr.get('sz'):
+            return int(rPr.get('sz')) / 100
+    return DEFAULT_FONT_SIZE
+
+def shape_text_positions(sp):
+    """(text, x, y) in inches for each non-empty paragraph of one p:sp element"""
+    off = sp.find('p:spPr/a:xfrm/a:off', NS)
+    body = sp.find('p:txBody', NS)
+    if off is None or body is None:
+        return []
+    bodyPr = body.find('a:bodyPr', NS)
+    left_inset = int(bodyPr.get('lIns', DEFAULT_INSETS[0]))
+    top_inset = int(bodyPr.get('tIns', DEFAULT_INSETS[1]))
+    x0 = int(off.get('x')) + left_inset
+    y = int(off.get('y')) + top_inset
+    positions = []
+    for p in body.findall('a:p', NS):
+        size = _paragraph_size(p)
+        pPr = p.find('a:pPr', NS)
+        spcPts = p.find('a:pPr/a:spcBef/a:spcPts', NS)
+        if spcPts is not None:
+            y += int(spcPts.get('val')) * EMU_PER_PT // 100
+        text = ''.join(t.text or '' for t in p.iter('{%s}t' % NS['a']))
+        if text.strip():
+            margin = int(pPr.get('marL', 0)) if pPr is not None else 0
+            x = x0 + margin + leading_indent(text, size)
+            positions.append((text.strip(), round(x / EMU_PER_INCH, 3), round(y / EMU_PER_INCH, 3)))
+        y += int(size * LINE_HEIGHT_EM * EMU_PER_PT)
+    return positions
+
+def text_positions(path):
+    """Per slide, the sorted (text, x, y) start positions of every line of text in a deck"""
+    slides = []
+    with zipfile.ZipFile(path) as zf:
+        names = [n for n in zf.namelist() if n.startswith('ppt/slides/slide') and n.endswith('.xml')]
+        names.sort(key=lambda n: int(n[len('ppt/slides/slide'):-len('.xml')]))
+        for name in names:
+            root = ET.fromstring(zf.read(name))
+            positions = []
+            for sp in root.iter('{%s}sp' % NS['p']):
+                positions.extend(shape_text_positions(sp))
+            slides.append(sorted(positions))
+    return slides
+
+def compare_text_positions(expected_path, actual_path, tolerance=PARITY_TOLERANCE):
+    """Return mismatch messages between the text positions of two decks"""
+    expected = text_positions(expected_path)
+    actual = text_positions(actual_path)
+    problems = []
+    if len(expected) != len(actual):
+        return [f"slide count differs: {len(expected)} vs {len(actual)}"]
+    for index, (want, got) in enumerate(zip(expected, actual), 1):
+        if [t for t, _, _ in want] != [t for t, _, _ in got]:
+            problems.append(f"slide {index}: text differs")
+            continue
+        for (text, x1, y1), (_, x2, y2) in zip(want, got):
+            if abs(x1 - x2) > tolerance or abs(y1 - y2) > tolerance:
+                problems.append(f"slide {index}: {text[:50]!r} at ({x1}, {y1}) vs ({x2}, {y2})")
+    return problems
+
+def shape_counts(path):
+    """Number of shapes on each slide of a saved deck"""
+    counts = []
+    with zipfile.ZipFile(path) as zf:
+        names = sorted((n for n in zf.namelist() if n.startswith('ppt/slides/slide') and n.endswith('.xml')),
+                       key=lambda n: int(n[len('ppt/slides/slide'):-len('.xml')]))
+        for name in names:
+            root = ET.fromstring(zf.read(name))
+            counts.append(len(root.find('p:cSld/p:spTree', NS)) - 2)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect text positions of rendered decks")
+    parser.add_argument('expected', help="deck with the reference text positions")
+    parser.add_argument('actual', help="deck to compare with it")
+    args = parser.parse_args()
+
+    problems = compare_text_positions(args.expected, args.actual)
+    for problem in problems:
+        print(f"✗ {problem}")
+    if not problems:
+        print(f"✓ Text of {args.actual} starts where it does in {args.expected}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""
+Run the source and target queries of a checklist export and diff the results.
+
+Every test case carries a sourceQuery (EBS/Fusion) and a target query for the
+selected reporting tool (see checklist.target_query). Both are executed
+through DB-API connections, with the :start_date / :end_date placeholders
+bound to the dates given on the command line, and the two result sets are
+compared row by row on their key columns (the first column by default, or
+the test case's keyColumns). Columns are compared by position, since source
+and target rarely agree on column names.
+
+Rows are streamed with fetchmany() and hash-partitioned into spill files on
+disk, then each partition is diffed on its own, so memory use is bounded by
+one partition rather than by the size of the result sets.
+
+With --cache, result sets are kept in a persistent cache (result_cache.py)
+keyed by the normalised query, the bind values and a snapshot token per
+system, so re-running a checklist only queries what may have changed.
+
+With --trace / --metrics, connect, execute, fetch, query and compare are
+timed per test case and side (see instrumentation.py), and --update also
+stores each test case's totals in the export.
+
+SQLite is the local stand-in; DuckDB is used when installed:
+
+    python validation_engine.py Validation_Checklist_Top10.json \\
+        --source sqlite:///ebs.db --target duckdb:///lakehouse.duckdb \\
+        --start-date 2024-01-01 --end-date 2024-12-31
+"""
+
+import argparse
+import contextlib
+import datetime
+import decimal
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+import instrumentation
+from checklist import load_checklist, save_checklist, target_query
+
+BATCH_SIZE = 10000
+PARTITIONS = 64
+SPILL_ROWS = 100000         # rows buffered in memory before partitions are flushed to disk
+MAX_SAMPLES = 20
+FLOAT_DIGITS = 6
+DEFAULT_SOURCE_SYSTEM = 'ebs'
+TARGET_SYSTEMS = {'powerbi': 'lakehouse', 'oac': 'adw'}
+
+# Quoted strings and comments are matched first so their contents are left alone
+PARAM_RE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/|(?<![:\w]):([A-Za-z_]\w*)", re.S)
+
+def connect(url):
+    """Open a DB-API connection from sqlite:///path, duckdb:///path or a plain file path"""
+    if url.startswith('duckdb://') or url.endswith('.duckdb'):
+        import duckdb
+        path = _strip_root(url[len('duckdb://'):]) if url.startswith('duckdb://') else url
+        with instrumentation.span('connect', engine='duckdb'):
+            return duckdb.connect(path or ':memory:')
+    path = _strip_root(url[len('sqlite://'):]) if url.startswith('sqlite://') else url
+    # Connections may be handed between threads by a pool (see checklist_runner.py),
+    # which only ever lets one thread use a connection at a time
+    with instrumentation.span('connect', engine='sqlite'):
+        return sqlite3.connect(path or ':memory:', check_same_thread=False)
+
+def _strip_root(path):
+    # Only for the part after sqlite:// or duckdb://: /rel.db -> rel.db, //abs.db -> /abs.db
+    return path[1:] if path.startswith('/') else path
+
+def bind_params(sql, params):
+    """Rewrite :name placeholders to qmark style; returns (sql, values)"""
+    names = []
+
+    def replace(match):
+        if match.group(1) is None:
+            return match.group(0)
+        names.append(match.group(1))
+        return '?'
+
+    sql = PARAM_RE.sub(replace, sql).strip().rstrip(';')
+    missing = sorted(set(names) - set(params))
+    if missing:
+        raise ValueError(f"No value given for {', '.join(':' + name for name in missing)}")
+    return sql, [params[name] for name in names]
+
+def normalize(value):
+    """Make values from different drivers comparable (numbers, dates, padded strings)"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (float, decimal.Decimal)):
+        value = round(float(value), FLOAT_DIGITS)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.rstrip()
+    return value
+
+def iter_rows(cursor, batch_size=BATCH_SIZE):
+    """Yield normalised rows from a cursor, fetching `batch_size` at a time"""
+    fetch = instrumentation.span('fetch')
+    try:
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(batch_size)
+            if fetch.enabled:
+                fetch.add(time.perf_counter() - start, batches=1, rows=len(rows),
+                          bytes=instrumentation.row_bytes(rows[0]) * len(rows) if rows else 0)
+            if not rows:
+                return
+            for row in rows:
+                yield tuple(normalize(value) for value in row)
+    finally:
+        fetch.close()
+
+def query_rows(connection, sql, values, batch_size=BATCH_SIZE):
+    """Execute `sql`; returns (column names, generator of normalised rows)"""
+    cursor = connection.cursor()
+    try:
+        with instrumentation.span('execute'):
+            cursor.execute(sql, values)
+        columns = [column[0] for column in cursor.description]
+    except BaseException:
+        cursor.close()
+        raise
+
+    def rows():
+        try:
+            yield from iter_rows(cursor, batch_size)
+        finally:
+            cursor.close()
+    return columns, rows()
+
+def key_positions(key_columns, columns):
+    """Resolve key columns given as positions or names against the result column names"""
+    names = [column.lower() for column in columns]
+    positions = []
+    for column in key_columns:
+        if isinstance(column, int) or str(column).isdigit():
+            position = int(column)
+        elif str(column).lower() in names:
+            position = names.index(str(column).lower())
+        else:
+            raise ValueError(f"Key column {column!r} not in result columns {names}")
+        if position >= len(names):
+            raise ValueError(f"Key column {position} out of range for {len(names)} columns")
+        positions.append(position)
+    return positions
+
+class HashSpill:
+    """Rows of one result set split into hash partitions on their key, spilled to disk"""
+
+    def __init__(self, directory, name, partitions=PARTITIONS, spill_rows=SPILL_ROWS):
+        self.paths = [os.path.join(directory, f"{name}-{i}.pkl") for i in range(partitions)]
+        self.buffers = [[] for _ in range(partitions)]
+        self.spill_rows = spill_rows
+        self.buffered = 0
+        self.rows = 0
+
+    def add(self, key, row):
+        self.buffers[hash(key) % len(self.buffers)].append((key, row))
+        self.buffered += 1
+        self.rows += 1
+        if self.buffered >= self.spill_rows:
+            self.flush()
+
+    def flush(self):
+        for path, buffer in zip(self.paths, self.buffers):
+            if buffer:
+                with open(path, 'ab') as f:
+                    pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+                buffer.clear()
+        self.buffered = 0
+
+    def partition(self, index):
+        """Yield the (key, row) pairs of one partition, spilled ones first"""
+        if os.path.exists(self.paths[index]):
+            with open(self.paths[index], 'rb') as f:
+                while True:
+                    try:
+                        yield from pickle.load(f)
+                    except EOFError:
+                        break
+        yield from self.buffers[index]
+
+def spill_query(connection, sql, params, key_columns, spill, batch_size=BATCH_SIZE, cache=None):
+    """Execute `sql` (or read it from `cache`) and partition its rows into `spill`; returns the column names"""
+    sql, values = bind_params(sql, params)
+    columns, rows = (cache.rows if cache is not None else query_rows)(connection, sql, values, batch_size)
+    positions = key_positions(key_columns, columns)
+    for row in rows:
+        spill.add(tuple(row[i] for i in positions), row)
+    return columns
+
+def diff_partition(source_pairs, target_pairs, result, max_samples):
+    """Diff one partition and add its counts and samples to `result`"""
+    source = {}
+    for key, row in source_pairs:
+        source.setdefault(key, []).append(row)
+
+    def sample(kind, key, source_row=None, target_row=None):
+        if len(result['samples']) < max_samples:
+            result['samples'].append({'type': kind, 'key': list(key), 'source': source_row, 'target': target_row})
+
+    for key, row in target_pairs:
+        candidates = source.get(key)
+        if not candidates:
+            result['target_only'] += 1
+            sample('target_only', key, target_row=list(row))
+            continue
+        match = row if row in candidates else candidates[0]
+        candidates.remove(match)
+        if match == row:
+            result['matched'] += 1
+        else:
+            result['mismatched'] += 1
+            sample('mismatch', key, list(match), list(row))
+    for key, rows in source.items():
+        for row in rows:
+            result['source_only'] += 1
+            sample('source_only', key, source_row=list(row))
+
+def compare_queries(source_conn, target_conn, source_sql, target_sql, params, key_columns=(0,),
+                    batch_size=BATCH_SIZE, partitions=PARTITIONS, max_samples=MAX_SAMPLES,
+                    source_cache=None, target_cache=None):
+    """Run both queries and diff them on `key_columns`; returns a result dict
+
+    `source_cache` / `target_cache` are result_cache views for the system
+    each query runs against, or None to always query.
+    """
+    result = {
+        'status': 'failed', 'source_rows': 0, 'target_rows': 0, 'matched': 0, 'mismatched': 0,
+        'source_only': 0, 'target_only': 0, 'samples': [], 'message': ''
+    }
+    with tempfile.TemporaryDirectory(prefix='validation-') as directory:
+        source = HashSpill(directory, 'source', partitions)
+        target = HashSpill(directory, 'target', partitions)
+        with instrumentation.labels(side='source'), instrumentation.span('query'):
+            source_columns = spill_query(source_conn, source_sql, params, key_columns, source, batch_size, source_cache)
+        with instrumentation.labels(side='target'), instrumentation.span('query'):
+            target_columns = spill_query(target_conn, target_sql, params, key_columns, target, batch_size, target_cache)
+        result['source_rows'] = source.rows
+        result['target_rows'] = target.rows
+        if len(source_columns) != len(target_columns):
+            result['message'] = (f"Column count differs: {len(source_columns)} in source, "
+                                 f"{len(target_columns)} in target")
+            return result
+        with instrumentation.span('compare') as compare:
+            for index in range(partitions):
+                diff_partition(source.partition(index), target.partition(index), result, max_samples)
+            compare.add(rows=source.rows + target.rows)
+
+    differences = result['mismatched'] + result['source_only'] + result['target_only']
+    result['status'] = 'passed' if not differences else 'failed'
+    result['message'] = (f"{result['matched']} rows match" if not differences else
+                         f"{result['mismatched']} mismatched, {result['source_only']} only in source, "
+                         f"{result['target_only']} only in target")
+    return result
+
+def run_test_case(test_case, tool, source_conn, target_conn, params, key_columns=None, **options):
+    """Validate one test case; queries without SQL on both sides are skipped"""
+    start = time.perf_counter()
+    source_sql = test_case.get('sourceQuery') or ''
+    target_sql = target_query(test_case, tool)
+    if not source_sql.strip() or not target_sql.strip():
+        result = {'status': 'skipped', 'message': 'no source/target query to run'}
+    else:
+        try:
+            key_columns = test_case.get('keyColumns') or key_columns or [0]
+            with instrumentation.labels(test_case=test_case.get('id') or None):
+                result = compare_queries(source_conn, target_conn, source_sql, target_sql, params, key_columns,
+                                         **options)
+        except Exception as e:
+            result = {'status': 'error', 'message': f"{type(e).__name__}: {e}"}
+    result['id'] = test_case.get('id', '')
+    result['title'] = test_case.get('title', '')
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    metrics = instrumentation.test_case_metrics(result['id'])
+    if metrics is not None:
+        result['metrics'] = dict(seconds=result['seconds'], **metrics)
+    return result
+
+def validate_checklist(checklist, source_conn, target_conn, params, tool=None, **options):
+    """Run every test case of a checklist export; returns the list of results"""
+    tool = tool or checklist.get('reportingTool') or 'powerbi'
+    return [run_test_case(tc, tool, source_conn, target_conn, params, **options) for tc in checklist['testCases']]
+
+def update_statuses(path, results):
+    """Write passed/failed results, and the run metrics of instrumented runs, into the checklist export at `path`"""
+    data = load_checklist(path)
+    statuses = {r['id']: r['status'] for r in results if r['status'] in ('passed', 'failed')}
+    metrics = {r['id']: r['metrics'] for r in results if r.get('metrics')}
+    for tc in data['testCases']:
+        tc['status'] = statuses.get(tc.get('id'), tc.get('status', 'pending'))
+        if tc.get('id') in metrics:
+            tc['metrics'] = metrics[tc['id']]
+    save_checklist(data, path)
+    return len(statuses)
+
+def print_result(result):
+    icon = {'passed': '✓', 'failed': '✗', 'error': '✗', 'skipped': '–', 'cancelled': '–'}[result['status']]
+    print(f"{icon} {result['id']} {result['title']}: {result['message']} ({result['seconds']:.2f}s)")
+    for sample in result.get('samples', []):
+        print(f"    {sample['type']} key={sample['key']} source={sample['source']} target={sample['target']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run checklist source/target queries and diff the results")
+    parser.add_argument('checklist', help="exported checklist JSON")
+    parser.add_argument('--source', required=True, help="source database (sqlite:///path, duckdb:///path)")
+    parser.add_argument('--target', required=True, help="target database (sqlite:///path, duckdb:///path)")
+    parser.add_argument('--start-date', help="value bound to :start_date")
+    parser.add_argument('--end-date', help="value bound to :end_date")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help="extra query parameter (repeatable)")
+    parser.add_argument('--tool', choices=['powerbi', 'oac'], help="target query to run (default: from the export)")
+    parser.add_argument('--key', action='append', help="key column name or position (default: first column)")
+    parser.add_argument('--test-case', action='append', help="only run these test case ids")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows per fetchmany() call")
+    parser.add_argument('--partitions', type=int, default=PARTITIONS, help="hash partitions for the diff")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="mismatched rows to report per test")
+    parser.add_argument('--update', action='store_true', help="write passed/failed back into the checklist")
+    parser.add_argument('--source-system', default=DEFAULT_SOURCE_SYSTEM, help="system name of --source for the cache")
+    parser.add_argument('--target-system', help="system name of --target for the cache (default: from the tool)")
+    from result_cache import add_cache_arguments, open_cache, snapshot_tokens
+    add_cache_arguments(parser)
+    instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    params = dict(param.split('=', 1) for param in args.param)
+    if args.start_date:
+        params['start_date'] = args.start_date
+    if args.end_date:
+        params['end_date'] = args.end_date
+
+    checklist = load_checklist(args.checklist)
+    if args.test_case:
+        checklist = dict(checklist, testCases=[tc for tc in checklist['testCases'] if tc.get('id') in args.test_case])
+    tool = args.tool or checklist.get('reportingTool') or 'powerbi'
+    source_system = args.source_system
+    target_system = args.target_system or TARGET_SYSTEMS.get(tool, tool)
+    recorder = instrumentation.open_recorder(args)
+    with instrumentation.labels(side='source', system=source_system):
+        source_conn = connect(args.source)
+    with instrumentation.labels(side='target', system=target_system):
+        target_conn = connect(args.target)
+    cache = open_cache(args)
+    try:
+        options = {}
+        if cache is not None:
+            connections = {source_system: source_conn, target_system: target_conn}
+            tokens = snapshot_tokens(args, lambda system: contextlib.nullcontext(connections[system]))
+            options = {'source_cache': cache.view(source_system, tokens.get(source_system, '')),
+                       'target_cache': cache.view(target_system, tokens.get(target_system, ''))}
+        with instrumentation.labels(sides={'source': source_system, 'target': target_system}):
+            results = validate_checklist(
+                checklist, source_conn, target_conn, params, tool, key_columns=args.key,
+                batch_size=args.batch_size, partitions=args.partitions, max_samples=args.max_samples, **options
+            )
+    finally:
+        source_conn.close()
+        target_conn.close()
+        if cache is not None:
+            print(f"Result cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+
+    for result in results:
+        print_result(result)
+    instrumentation.close_recorder(recorder, args)
+    if args.update:
+        updated = update_statuses(args.checklist, results)
+        print(f"✓ Updated {updated} test case statuses in {args.checklist}")
+    return 1 if any(r['status'] in ('failed', 'error') for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())